@@ -0,0 +1,124 @@
+"""Benchmark of the equation extraction for every example definition, on the truth tables of their behavioural models"""
+
+# pylint: disable=wrong-import-position
+
+import sys
+sys.path.insert(1, './src')
+
+import argparse
+import glob
+import json
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from dppeeper.analysis.equation_extraction import EquationExtractor, OutputEquation
+from dppeeper.analysis.truth_table_analysis import TruthTable
+from dppeeper.board.pld_model import PLDEvaluation, PLDModel
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.ic_loader import ICLoader
+
+def _build_argsparser() -> argparse.ArgumentParser:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Benchmark the equation extraction on the example devices')
+
+    parser.add_argument('-d', '--definitions', nargs='+', default=sorted(glob.glob('examples/*.toml')),
+                        help='Definition files to benchmark')
+    parser.add_argument('--random_terms', type=int, default=8,
+                        help='Product terms of the random functions of the 20 input synthetic device, 0 to skip it')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Seed of the random functions')
+    parser.add_argument('--json', metavar='output file', default=None,
+                        help='Save the results in JSON format')
+
+    return parser
+
+def model_table(ic_definition: ICDefinition) -> TruthTable:
+    """Truth table of the behavioural model of a definition, over its inputs that are not clocks"""
+    model: PLDModel = PLDModel.from_definition(ic_definition)
+    input_pins: list[int] = [pin for pin in ic_definition.in_pins if pin not in ic_definition.clk_pins]
+
+    written: list[int] = []
+    read: list[int] = []
+    hiz: list[int] = []
+    for step in range(1 << len(input_pins)):
+        val: int = sum(1 << (pin - 1) for idx, pin in enumerate(input_pins) if (step >> idx) & 0x01)
+        evaluation: PLDEvaluation = model.evaluate(val, 0)
+        written.append(val)
+        read.append(evaluation.read)
+        hiz.append(ic_definition.hiz_o_mask & ~evaluation.driven)
+
+    return TruthTable(np.array(written, dtype=np.uint64), np.array(read, dtype=np.uint64), np.array(hiz, dtype=np.uint64), np.zeros(len(written), dtype=np.uint64))
+
+def synthetic_table(ic_definition: ICDefinition, input_pins: list[int], output_pins: list[int], terms: int, seed: int) -> TruthTable:
+    """Truth table of random sums of products over 20 inputs, with 3 to 6 literals per term"""
+    rng: random.Random = random.Random(seed)
+
+    steps: np.ndarray = np.arange(1 << len(input_pins), dtype=np.uint64)
+    written: np.ndarray = np.zeros_like(steps)
+    for idx, pin in enumerate(input_pins):
+        written |= ((steps >> np.uint64(idx)) & np.uint64(1)) << np.uint64(pin - 1)
+
+    read: np.ndarray = written.copy()
+    for out_pin in output_pins:
+        value: np.ndarray = np.zeros(len(steps), dtype=bool)
+        for _ in range(terms):
+            term_pins: list[int] = rng.sample(input_pins, rng.randint(3, 6))
+            mask: int = sum(1 << (pin - 1) for pin in term_pins)
+            level: int = sum(1 << (pin - 1) for pin in term_pins if rng.random() < 0.5)
+            value |= (written & np.uint64(mask)) == np.uint64(level)
+        read |= value.astype(np.uint64) << np.uint64(out_pin - 1)
+
+    return TruthTable(written, read, np.zeros_like(written), np.zeros_like(written))
+
+def bench_table(ic_definition: ICDefinition, table: TruthTable) -> dict[str, float]:
+    extractor: EquationExtractor = EquationExtractor(ic_definition)
+
+    tracemalloc.start()
+    start: float = time.perf_counter()
+    equations: list[OutputEquation] = extractor.extract(table)
+    elapsed: float = time.perf_counter() - start
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    extracted: list[OutputEquation] = [equation for equation in equations if equation.terms is not None]
+    return {
+        'inputs': len(table.input_pins),
+        'outputs': len(equations),
+        'not_extracted': len(equations) - len(extracted),
+        'terms': sum(len(equation.terms or ()) + len(equation.enable or ()) for equation in equations),
+        'literals': sum(term.literals for equation in equations for term in (equation.terms or ()) + (equation.enable or ())),
+        'mismatches': extractor.check(table, extracted),
+        'ms': elapsed * 1000,
+        'peak_kib': peak / 1024
+    }
+
+def main() -> int:
+    args = _build_argsparser().parse_args()
+
+    results: dict[str, dict[str, float]] = {}
+    for def_path in args.definitions:
+        with open(def_path, 'rb') as def_file:
+            ic_definition: ICDefinition = ICLoader.extract_definition_from_buffered_reader(def_file)
+        results[ic_definition.name] = bench_table(ic_definition, model_table(ic_definition))
+
+    if args.random_terms > 0:
+        with open('examples/GAL22V10.toml', 'rb') as def_file:
+            gal_definition: ICDefinition = ICLoader.extract_definition_from_buffered_reader(def_file)
+        table: TruthTable = synthetic_table(gal_definition, list(range(1, 12)) + list(range(13, 22)), [22, 23], args.random_terms, args.seed)
+        results['SYNTH20'] = bench_table(gal_definition, table)
+
+    print(f'{"device":<16}{"inputs":>7}{"outputs":>8}{"terms":>7}{"literals":>9}{"failed":>7}{"errors":>7}{"ms":>10}{"peak KiB":>10}')
+    for device, res in results.items():
+        print(f'{device:<16}{res["inputs"]:>7}{res["outputs"]:>8}{res["terms"]:>7}{res["literals"]:>9}'
+              f'{res["not_extracted"]:>7}{res["mismatches"]:>7}{res["ms"]:>10.1f}{res["peak_kib"]:>10.1f}')
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Benchmark of the peeper operations for every example definition, run against the fake board"""
+
+# pylint: disable=wrong-import-position
+
+import sys
+sys.path.insert(1, './src')
+
+import argparse
+import glob
+import json
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from dppeeper.board.fake_board_commands import FakeBoardCommands, FakeLatency
+from dppeeper.board.hiz_detection import HiZStrategy
+from dppeeper.board.osc_detection import OscPolicy, OscStrategy
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.ic_loader import ICLoader
+from dppeeper.peeper_session import PeeperSession
+
+def _build_argsparser() -> argparse.ArgumentParser:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Benchmark peeper operations against the fake board')
+
+    parser.add_argument('-d', '--definitions', nargs='+', default=sorted(glob.glob('examples/*.toml')),
+                        help='Definition files to benchmark')
+    parser.add_argument('-n', '--iterations', type=int, default=20,
+                        help='Repetitions of each operation')
+    parser.add_argument('--link', type=float, default=0.002,
+                        help='Emulated link round trip, in seconds')
+    parser.add_argument('--command', type=float, default=0.0001,
+                        help='Emulated firmware time per command, in seconds')
+    parser.add_argument('--osc_sample', type=float, default=0.00001,
+                        help='Emulated firmware time per oscillation sample, in seconds')
+    parser.add_argument('--hiz_strategy', choices=[strategy.value for strategy in HiZStrategy], default=HiZStrategy.PER_PIN.value)
+    parser.add_argument('--osc_strategy', choices=[strategy.value for strategy in OscStrategy], default=OscStrategy.FIXED.value)
+    parser.add_argument('--osc_samples', type=int, default=OscPolicy().samples,
+                        help='Reads of an oscillation scan')
+    parser.add_argument('--json', metavar='output file', default=None,
+                        help='Save the results in JSON format')
+    parser.add_argument('--baseline', metavar='baseline file', default=None,
+                        help='JSON results of a previous run to compare against')
+
+    return parser
+
+def _measure(operation: Callable[[], Any], board: type[FakeBoardCommands], iterations: int) -> dict[str, float]:
+    # Warm up, so one-time costs do not end up in the numbers
+    operation()
+
+    board.reset_stats()
+    start: float = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    elapsed: float = time.perf_counter() - start
+    stats: dict[str, int] = dict(board.stats)
+
+    # Allocations are measured on a separate pass, tracing would skew the timings
+    tracemalloc.start()
+    snap_before = tracemalloc.take_snapshot()
+    for _ in range(iterations):
+        operation()
+    snap_after = tracemalloc.take_snapshot()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    allocs: int = sum(stat.count_diff for stat in snap_after.compare_to(snap_before, 'filename') if stat.count_diff > 0)
+
+    return {
+        'ms_per_op': (elapsed / iterations) * 1000,
+        'round_trips_per_op': stats.get(FakeBoardCommands.STAT_ROUND_TRIPS, 0) / iterations,
+        'writes_per_op': stats.get('write_pins', 0) / iterations,
+        'osc_scans_per_op': stats.get('detect_osc_pins', 0) / iterations,
+        'retained_blocks': allocs,
+        'peak_kib': peak / 1024
+    }
+
+def bench_definition(ic_definition: ICDefinition, latency: FakeLatency, iterations: int, hiz_strategy: HiZStrategy,
+                     osc_policy: OscPolicy = OscPolicy()) -> dict[str, dict[str, float]]:
+    board: type[FakeBoardCommands] = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition), ic_definition, latency)
+    board.set_power(True)
+
+    session: PeeperSession = PeeperSession(ic_definition, board, power_delay=0, osc_policy=osc_policy)
+    hiz_session: PeeperSession = PeeperSession(ic_definition, board, check_hiz=True, hiz_strategy=hiz_strategy, power_delay=0, osc_policy=osc_policy)
+
+    set_val: int = 0
+    for pin in ic_definition.in_pins:
+        set_val = set_val | (1 << (pin - 1))
+
+    operations: dict[str, Callable[[], Any]] = {
+        'set': lambda: session.set_pins(set_val),
+        'clear': lambda: session.set_pins(0),
+        'set_hiz': lambda: hiz_session.set_pins(set_val),
+        'powercycle': lambda: session.power_cycle(0)
+    }
+    for clk_pin in ic_definition.clk_pins:
+        operations[f'clock_{clk_pin}'] = (lambda pin: lambda: hiz_session.clock(0, pin))(clk_pin)
+
+    return {name: _measure(operation, board, iterations) for name, operation in operations.items()}
+
+def _print_results(results: dict[str, dict[str, dict[str, float]]], baseline: dict[str, Any] | None) -> None:
+    print(f'{"device":<16}{"operation":<12}{"ms/op":>10}{"trips/op":>10}{"writes/op":>11}{"retained":>10}{"peak KiB":>10}')
+    for device, operations in results.items():
+        for name, res in operations.items():
+            line: str = (f'{device:<16}{name:<12}{res["ms_per_op"]:>10.3f}{res["round_trips_per_op"]:>10.1f}'
+                         f'{res["writes_per_op"]:>11.1f}{res["retained_blocks"]:>10}{res["peak_kib"]:>10.1f}')
+
+            base: dict[str, float] | None = baseline.get(device, {}).get(name) if baseline else None
+            if base and base['ms_per_op'] > 0:
+                line += f'  ({(res["ms_per_op"] / base["ms_per_op"] - 1) * 100:+.1f}% time, {res["round_trips_per_op"] - base["round_trips_per_op"]:+.1f} trips)'
+            print(line)
+
+def main() -> int:
+    args = _build_argsparser().parse_args()
+
+    latency: FakeLatency = FakeLatency(link=args.link, command=args.command, osc_sample=args.osc_sample)
+    osc_policy: OscPolicy = OscPolicy(OscStrategy(args.osc_strategy), args.osc_samples)
+    results: dict[str, dict[str, dict[str, float]]] = {}
+
+    for def_path in args.definitions:
+        with open(def_path, 'rb') as def_file:
+            ic_definition: ICDefinition = ICLoader.extract_definition_from_buffered_reader(def_file)
+        results[ic_definition.name] = bench_definition(ic_definition, latency, args.iterations, HiZStrategy(args.hiz_strategy), osc_policy)
+
+    baseline: dict[str, Any] | None = None
+    if args.baseline:
+        with open(args.baseline, 'r') as base_file:
+            baseline = json.load(base_file)
+
+    _print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,25 @@
 """Module entry point"""
 
-import importlib.metadata
+from typing import TYPE_CHECKING
 
 __name__: str = 'dppeeper'
-__version__: str = '0.0.0'
 
-try:
-    __version__ = importlib.metadata.version(__name__)
-except:
-    print('Could not fetch the version. Probably package not installed???')
\ No newline at end of file
+if TYPE_CHECKING:
+    __version__: str # Looked up on first access, see __getattr__
+
+def __getattr__(name: str) -> str:
+    # Looking up the version loads importlib.metadata, which is slow: only do it when the version is asked for
+    if name == '__version__':
+        import importlib.metadata
+
+        global __version__
+        __version__ = '0.0.0'
+
+        try:
+            __version__ = importlib.metadata.version(__name__)
+        except:
+            print('Could not fetch the version. Probably package not installed???')
+
+        return __version__
+
+    raise AttributeError(f'module {__name__} has no attribute {name}')
@@ -0,0 +1,285 @@
+"""This module contains the extraction of minimized sum-of-products equations from a truth table"""
+
+import logging
+import re
+from typing import NamedTuple, final
+
+import numpy as np
+
+from dppeeper.analysis.truth_table_analysis import TableAnalysis, TruthTable, TruthTableAnalyzer
+from dppeeper.ic.ic_definition import ICDefinition
+
+class Cube(NamedTuple):
+    """A product term: the pins in mask must be at the levels in value. Bit 0 is pin 1 of the IC"""
+    mask: int
+    value: int
+
+    @property
+    def literals(self) -> int:
+        return self.mask.bit_count()
+
+    def covers(self, val: int) -> bool:
+        return (val & self.mask) == self.value
+
+class OutputEquation(NamedTuple):
+    pin: int
+    inverted: bool # The terms give the complement of the output, as for active low outputs
+    terms: tuple[Cube, ...] | None # None if the output is always Hi-Z, or needs too many terms
+    enable: tuple[Cube, ...] | None # Terms enabling the output, None if it is always enabled
+    pure: bool # See `OutputAnalysis`
+
+@final
+class CubeMinimizer:
+    """
+    Heuristic two-level minimization over the minterms of k inputs, in the spirit of Espresso:
+    every uncovered minterm of the ON-set is expanded into a prime cube by dropping the literals
+    that do not make it intersect the OFF-set, then the cubes covered by the others are removed.
+    Cubes are bitsets (mask of the inputs in the term, levels of those inputs) and the intersection tests
+    run on NumPy arrays of minterms, so the cost grows with the number of terms times the size of the table.
+    Minterms that are in neither set are don't cares.
+    """
+
+    @staticmethod
+    def _irredundant(cover: list[tuple[int, int]], on: np.ndarray, minterms: np.ndarray) -> list[tuple[int, int]]:
+        coverage: np.ndarray = np.zeros(len(on), dtype=np.int32)
+        for mask, value in cover:
+            coverage += (minterms & mask) == value
+
+        # The smallest cubes are the most likely to be covered by the others, try to drop them first
+        kept: list[tuple[int, int]] = []
+        for mask, value in sorted(cover, key=lambda cube: -cube[0].bit_count()):
+            covered: np.ndarray = (minterms & mask) == value
+            if np.all(coverage[covered & on] >= 2):
+                coverage -= covered
+            else:
+                kept.append((mask, value))
+
+        return sorted(kept, key=lambda cube: (cube[0].bit_count(), cube[0], cube[1]))
+
+    @classmethod
+    def minimize(cls, on: np.ndarray, off: np.ndarray, max_terms: int) -> list[tuple[int, int]] | None:
+        """
+        Find a small cover of the ON-set not intersecting the OFF-set
+
+        Args:
+            on (np.ndarray): bool, minterms where the function is 1, indexed by the value of the inputs
+            off (np.ndarray): bool, minterms where the function is 0
+            max_terms (int): give up after finding this many terms
+
+        Returns:
+            list[tuple[int, int]] | None: mask and value of the terms, None if more terms were needed
+        """
+        inputs: int = len(on).bit_length() - 1
+        full_mask: int = len(on) - 1
+        minterms: np.ndarray = np.arange(len(on), dtype=np.uint32)
+        off_minterms: np.ndarray = minterms[off]
+
+        uncovered: np.ndarray = on.copy()
+        cover: list[tuple[int, int]] = []
+        while (seed_idx := int(np.argmax(uncovered))) or uncovered[0]:
+            if len(cover) >= max_terms:
+                return None
+
+            mask: int = full_mask
+            for bit in range(inputs):
+                candidate: int = mask & ~(1 << bit)
+                if not np.any((off_minterms & candidate) == (seed_idx & candidate)):
+                    mask = candidate
+
+            cover.append((mask, seed_idx & mask))
+            uncovered &= (minterms & mask) != (seed_idx & mask)
+
+        return cls._irredundant(cover, on, minterms)
+
+@final
+class EquationExtractor:
+    """
+    Extracts the equations of the outputs of a combinational device from a `TruthTable`.
+    Each function is first projected on the inputs it depends on, as found by `TruthTableAnalyzer`, then minimized
+    in both polarities, keeping the smaller one. Outputs in `hiz_o_pins` that are not always enabled also get
+    the equation of their output enable, and their Hi-Z rows are don't cares for the output equation.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _NAME_CLEANUP = re.compile(r'[^A-Za-z0-9]+')
+
+    _ic_definition: ICDefinition
+    _max_terms: int
+
+    def __init__(self, ic_definition: ICDefinition, max_terms: int = 64) -> None:
+        self._ic_definition = ic_definition
+        self._max_terms = max_terms
+
+    @staticmethod
+    def _project(rows: np.ndarray, positions: list[int], size: int) -> np.ndarray:
+        """Bool array over the combinations of the inputs at the positions, set where any of the rows projects"""
+        index: np.ndarray = np.zeros(len(rows), dtype=np.int64)
+        for bit, pos in enumerate(positions):
+            index |= ((rows >> pos) & 1) << bit
+
+        projected: np.ndarray = np.zeros(size, dtype=bool)
+        projected[index] = True
+        return projected
+
+    @staticmethod
+    def _to_ic_space(cover: list[tuple[int, int]], input_pins: list[int]) -> tuple[Cube, ...]:
+        terms: list[Cube] = []
+
+        for mask, value in cover:
+            ic_mask: int = 0
+            ic_value: int = 0
+            for bit, pin in enumerate(input_pins):
+                if (mask >> bit) & 0x01:
+                    ic_mask = ic_mask | (1 << (pin - 1))
+                    if (value >> bit) & 0x01:
+                        ic_value = ic_value | (1 << (pin - 1))
+            terms.append(Cube(ic_mask, ic_value))
+
+        return tuple(terms)
+
+    def _minimize(self, table: TruthTable, on: np.ndarray, off: np.ndarray, support: tuple[int, ...], pin: int,
+                  polarities: tuple[bool, ...] = (False, True)) -> tuple[bool, tuple[Cube, ...]] | None:
+        """Minimize a function in the polarity needing fewer terms, as (inverted, terms in IC space)"""
+        positions: list[int] = [table.input_pins.index(in_pin) for in_pin in support]
+        on_rows: np.ndarray = np.flatnonzero(on)
+        off_rows: np.ndarray = np.flatnonzero(off)
+
+        on_k: np.ndarray = self._project(on_rows, positions, 1 << len(positions))
+        off_k: np.ndarray = self._project(off_rows, positions, 1 << len(positions))
+        if np.any(on_k & off_k): # Inputs missing from the support, e.g. hidden by missing rows: use all of them
+            self._LOGGER.warning(f'Pin {pin} depends on more inputs than the ones found, minimizing over all of them')
+            positions = [pos for pos, in_pin in enumerate(table.input_pins) if in_pin != pin]
+            on_k = self._project(on_rows, positions, 1 << len(positions))
+            off_k = self._project(off_rows, positions, 1 << len(positions))
+
+        best: tuple[bool, list[tuple[int, int]]] | None = None
+        for inverted in polarities:
+            cover: list[tuple[int, int]] | None = CubeMinimizer.minimize(off_k, on_k, self._max_terms) if inverted else CubeMinimizer.minimize(on_k, off_k, self._max_terms)
+            if cover is not None and (best is None or self._cost(cover) < self._cost(best[1])):
+                best = (inverted, cover)
+
+        if best is None:
+            return None
+        elif best[0] and not best[1]: # Constant high, better written as such
+            best = (False, [(0, 0)])
+
+        return (best[0], self._to_ic_space(best[1], [table.input_pins[pos] for pos in positions]))
+
+    @staticmethod
+    def _cost(cover: list[tuple[int, int]]) -> tuple[int, int]:
+        return (len(cover), sum(mask.bit_count() for mask, _ in cover))
+
+    def extract(self, table: TruthTable, analysis: TableAnalysis | None = None) -> list[OutputEquation]:
+        """
+        Extract the equations of all the outputs
+
+        Args:
+            table (TruthTable): table of the device
+            analysis (TableAnalysis | None, optional): analysis of the same table, computed if not given. Defaults to None.
+        """
+        if analysis is None:
+            analysis = TruthTableAnalyzer(self._ic_definition).analyze(table)
+
+        equations: list[OutputEquation] = []
+        for output in analysis.outputs:
+            bit: np.uint64 = np.uint64(output.pin - 1)
+            hiz: np.ndarray = table.present & (((table.hiz >> bit) & np.uint64(1)) == 1)
+            driven: np.ndarray = table.present & ~hiz
+
+            if output.always_hiz:
+                equations.append(OutputEquation(output.pin, False, None, (), output.pure))
+                continue
+
+            enable: tuple[Cube, ...] | None = None
+            if output.hiz_inputs: # Output enables are always written in positive form
+                enable_result: tuple[bool, tuple[Cube, ...]] | None = self._minimize(table, driven, hiz, output.hiz_inputs, output.pin, (False,))
+                if enable_result is None:
+                    self._LOGGER.warning(f'Output enable of pin {output.pin} needs more than {self._max_terms} terms')
+                enable = enable_result[1] if enable_result is not None else None
+
+            level: np.ndarray = ((table.read >> bit) & np.uint64(1)) == 1
+            result: tuple[bool, tuple[Cube, ...]] | None = self._minimize(table, driven & level, driven & ~level, output.inputs, output.pin)
+            if result is None:
+                self._LOGGER.warning(f'Pin {output.pin} needs more than {self._max_terms} terms')
+
+            equations.append(OutputEquation(output.pin, result[0] if result else False, result[1] if result else None, enable, output.pure))
+
+        return equations
+
+    def check(self, table: TruthTable, equations: list[OutputEquation]) -> int:
+        """Count the rows of the table where the equations disagree with the levels or the Hi-Z states read"""
+        rows: np.ndarray = np.flatnonzero(table.present)
+        written: np.ndarray = np.zeros(len(rows), dtype=np.uint64)
+        for pos, pin in enumerate(table.input_pins):
+            written |= ((rows >> pos) & 1).astype(np.uint64) << np.uint64(pin - 1)
+
+        def evaluate(terms: tuple[Cube, ...]) -> np.ndarray:
+            result: np.ndarray = np.zeros(len(rows), dtype=bool)
+            for term in terms:
+                result |= (written & np.uint64(term.mask)) == np.uint64(term.value)
+            return result
+
+        mismatches: np.ndarray = np.zeros(len(rows), dtype=bool)
+        for equation in equations:
+            bit: np.uint64 = np.uint64(equation.pin - 1)
+            hiz: np.ndarray = ((table.hiz[rows] >> bit) & np.uint64(1)) == 1
+            level: np.ndarray = ((table.read[rows] >> bit) & np.uint64(1)) == 1
+
+            enabled: np.ndarray = np.ones(len(rows), dtype=bool) if equation.enable is None else evaluate(equation.enable)
+            mismatches |= enabled == hiz
+            if equation.terms is not None:
+                mismatches |= enabled & ((evaluate(equation.terms) != equation.inverted) != level)
+
+        return int(np.count_nonzero(mismatches))
+
+    def _pin_name(self, pin: int) -> str:
+        bit: int = 1 << (pin - 1)
+        if self._ic_definition.gnd_mask & bit:
+            return 'GND'
+        elif self._ic_definition.pwr_mask & bit:
+            return 'VCC'
+
+        # Composite names like I1/CLK or I13/!OE use characters that have a meaning in the equations
+        name: str = self._NAME_CLEANUP.sub('_', self._ic_definition.pin_names[pin - 1]).strip('_')
+        return name if name and not self._ic_definition.nc_mask & bit else 'NC'
+
+    def _format_sum(self, lhs: str, terms: tuple[Cube, ...]) -> str:
+        if not terms:
+            return f'{lhs} = GND'
+
+        products: list[str] = []
+        for term in terms:
+            literals: list[str] = [('' if (term.value >> (pin - 1)) & 0x01 else '/') + self._pin_name(pin)
+                                   for pin in range(1, len(self._ic_definition.zif_map) + 1) if (term.mask >> (pin - 1)) & 0x01]
+            products.append(' * '.join(literals) if literals else 'VCC')
+
+        return f'{lhs} = ' + f'\n{" " * (len(lhs) + 1)}+ '.join(products)
+
+    def format_palasm(self, table: TruthTable, equations: list[OutputEquation]) -> str:
+        """PALASM-like source: chip declaration, pin list and the equations, with the outputs that could not be extracted as comments"""
+        pin_count: int = len(self._ic_definition.zif_map)
+        name: str = self._NAME_CLEANUP.sub('_', self._ic_definition.name)
+        lines: list[str] = [f'; {self._ic_definition.name}, extracted by dppeeper from {table.rows} of {1 << len(table.input_pins)} input combinations',
+                            '',
+                            f'CHIP {name} {name}',
+                            '']
+
+        pin_names: list[str] = [self._pin_name(pin) for pin in range(1, pin_count + 1)]
+        half: int = (pin_count + 1) // 2
+        lines.extend((' '.join(pin_names[:half]), ' '.join(pin_names[half:]), '', 'EQUATIONS', ''))
+
+        for equation in equations:
+            out_name: str = self._pin_name(equation.pin)
+            if not equation.pure:
+                lines.append(f'; {out_name} is not a pure function of the inputs, the equation may not match the device')
+
+            if equation.enable is not None:
+                lines.append(self._format_sum(f'{out_name}.TRST', equation.enable))
+            if equation.terms is not None:
+                lines.append(self._format_sum(('/' if equation.inverted else '') + out_name, equation.terms))
+            elif equation.enable != ():
+                lines.append(f'; {out_name} needs more than {self._max_terms} product terms, not extracted')
+            lines.append('')
+
+        return '\n'.join(lines)
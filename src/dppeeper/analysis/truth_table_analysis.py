@@ -0,0 +1,224 @@
+"""This module contains the analysis of the dependencies between the pins of an IC, over a truth table dump"""
+
+import logging
+from typing import NamedTuple, final
+
+import numpy as np
+
+from dppeeper.board.dump_file import DumpFile, DumpReader, DumpRecordKind
+from dppeeper.ic.ic_definition import ICDefinition
+
+class OutputAnalysis(NamedTuple):
+    pin: int
+    inputs: tuple[int, ...] # Inputs that change the level of the output while it is driven, an I/O is not listed among its own
+    hiz_inputs: tuple[int, ...] # Inputs that change whether the output is Hi-Z
+    constant: int | None # Level of an output that never changes while driven, None if it does
+    always_hiz: bool
+    pure: bool # Never oscillating, and always read the same for the same inputs
+    duplicate_of: int | None # First output with the same (or inverted) levels and Hi-Z states
+    inverted: bool # The duplicate has the opposite levels
+
+class TableAnalysis(NamedTuple):
+    input_pins: tuple[int, ...]
+    rows: int # Input combinations present in the dump
+    outputs: tuple[OutputAnalysis, ...]
+
+    @property
+    def complete(self) -> bool:
+        return self.rows == 1 << len(self.input_pins)
+
+@final
+class TruthTable:
+    """
+    A truth table loaded from the RESULT records of a dump, as dense NumPy arrays indexed by the combination of the inputs:
+    bit n of the index is the level of the n-th input pin. Values are in IC space, bit 0 is pin 1.
+
+    Inputs are the pins written with both levels in the dump. When an input combination appears more than once
+    (e.g. a recording of a session), the last one is kept and the others are only used to find the outputs that are not pure.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    MAX_INPUTS: int = 24
+
+    RECORD_DTYPE = np.dtype([('kind', 'u1'), ('timestamp', '<u8'), ('written', '<u8'), ('read', '<u8'), ('hiz', '<u8'), ('osc', '<u8')])
+
+    input_pins: tuple[int, ...]
+    present: np.ndarray # bool, the combination is in the dump
+    read: np.ndarray # uint64
+    hiz: np.ndarray # uint64
+    osc: int # Pins found oscillating in any record
+    unstable: int # Pins read differently for the same inputs
+    overridden: int # Pins read, while not Hi-Z, at a level other than the one written: driven by the IC
+
+    def __init__(self, written: np.ndarray, read: np.ndarray, hiz: np.ndarray, osc: np.ndarray) -> None:
+        """
+        Args:
+            written (np.ndarray): values written, one for every result
+            read (np.ndarray): values read back
+            hiz (np.ndarray): masks of the Hi-Z pins
+            osc (np.ndarray): masks of the oscillating pins
+        """
+        if len(written) == 0:
+            raise ValueError('No results to analyze')
+
+        varying: int = int(np.bitwise_or.reduce(written) & ~np.bitwise_and.reduce(written))
+        self.input_pins = tuple(bit + 1 for bit in range(64) if (varying >> bit) & 0x01)
+        if len(self.input_pins) > self.MAX_INPUTS:
+            raise ValueError(f'{len(self.input_pins)} inputs are too many to build a table')
+
+        # Gather the input bits of every value in a dense index
+        index: np.ndarray = np.zeros(len(written), dtype=np.int64)
+        for pos, pin in enumerate(self.input_pins):
+            index |= ((written >> np.uint64(pin - 1)) & np.uint64(1)).astype(np.int64) << pos
+
+        size: int = 1 << len(self.input_pins)
+        self.present = np.zeros(size, dtype=bool)
+        self.read = np.zeros(size, dtype=np.uint64)
+        self.hiz = np.zeros(size, dtype=np.uint64)
+        self.present[index] = True
+        self.read[index] = read
+        self.hiz[index] = hiz
+
+        # Compare every result with the one kept for its combination
+        level_diff: np.ndarray = (read ^ self.read[index]) & ~(hiz | self.hiz[index])
+        self.unstable = int(np.bitwise_or.reduce(level_diff | (hiz ^ self.hiz[index])))
+        self.osc = int(np.bitwise_or.reduce(osc))
+        self.overridden = int(np.bitwise_or.reduce((read ^ written) & ~hiz))
+
+    @classmethod
+    def from_dump(cls, path: str) -> 'TruthTable':
+        with DumpReader(path) as reader: # Validates the header
+            rec_count: int = len(reader)
+
+        records: np.ndarray = np.fromfile(path, dtype=cls.RECORD_DTYPE, count=rec_count, offset=DumpFile.HEADER.size)
+
+        results: np.ndarray = records[records['kind'] == DumpRecordKind.RESULT]
+        cls._LOGGER.info(f'Loaded {len(results)} results out of {len(records)} records')
+
+        return cls(results['written'], results['read'], results['hiz'], results['osc'])
+
+    @property
+    def rows(self) -> int:
+        return int(np.count_nonzero(self.present))
+
+    def _pairs(self, pos: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Views of the rows with the input at pos low and high, as (valid, read low, read high, hi-z low, hi-z high)"""
+        shape: tuple[int, int, int] = (-1, 2, 1 << pos)
+        present: np.ndarray = self.present.reshape(shape)
+        read: np.ndarray = self.read.reshape(shape)
+        hiz: np.ndarray = self.hiz.reshape(shape)
+
+        return (present[:, 0, :] & present[:, 1, :], read[:, 0, :], read[:, 1, :], hiz[:, 0, :], hiz[:, 1, :])
+
+    def sensitivity(self) -> tuple[list[int], list[int]]:
+        """
+        For every input, the pins whose level (while driven) and whose Hi-Z state change when the input is flipped
+
+        Returns:
+            tuple[list[int], list[int]]: masks of the pins changing level and changing Hi-Z state, in the order of the inputs
+        """
+        level_masks: list[int] = []
+        hiz_masks: list[int] = []
+
+        for pos in range(len(self.input_pins)):
+            valid, read_lo, read_hi, hiz_lo, hiz_hi = self._pairs(pos)
+            level_masks.append(int(np.bitwise_or.reduce(((read_lo ^ read_hi) & ~(hiz_lo | hiz_hi))[valid])))
+            hiz_masks.append(int(np.bitwise_or.reduce((hiz_lo ^ hiz_hi)[valid])))
+
+        return (level_masks, hiz_masks)
+
+    def column(self, pin: int) -> tuple[bytes, bytes, bytes]:
+        """Packed bits of a pin over the present rows, as (level while driven, inverted level while driven, Hi-Z)"""
+        bit: np.uint64 = np.uint64(pin - 1)
+        hiz: np.ndarray = ((self.hiz[self.present] >> bit) & np.uint64(1)).astype(bool)
+        level: np.ndarray = ((self.read[self.present] >> bit) & np.uint64(1)).astype(bool)
+
+        return (np.packbits(level & ~hiz).tobytes(), np.packbits(~level & ~hiz).tobytes(), np.packbits(hiz).tobytes())
+
+@final
+class TruthTableAnalyzer:
+    """
+    Finds which inputs every output of an IC depends on, with vectorized operations over a `TruthTable`:
+    for each input, the rows are paired with the ones where only that input is flipped and the outputs XORed.
+    Pairs with a missing row are skipped, so partial tables give partial (but never wrong) dependencies.
+    """
+
+    _ic_definition: ICDefinition
+
+    def __init__(self, ic_definition: ICDefinition) -> None:
+        self._ic_definition = ic_definition
+
+    def output_pins(self, table: TruthTable) -> list[int]:
+        """Outputs, I/Os and registered outputs. Pins that were swept as inputs are outputs only if the IC drove them at some point"""
+        ic_definition: ICDefinition = self._ic_definition
+        outputs: int = ((ic_definition.o_mask | ic_definition.io_mask | ic_definition.q_mask) &
+                        (~ICDefinition.pins_to_mask(table.input_pins) | table.overridden))
+        return [pin for pin in range(1, len(ic_definition.zif_map) + 1) if (outputs >> (pin - 1)) & 0x01]
+
+    def analyze(self, table: TruthTable) -> TableAnalysis:
+        level_masks, hiz_masks = table.sensitivity()
+
+        driven: np.ndarray = table.read[table.present] & ~table.hiz[table.present]
+        driven_or: int = int(np.bitwise_or.reduce(driven))
+        driven_and: int = int(np.bitwise_and.reduce(table.read[table.present] | table.hiz[table.present]))
+        hiz_and: int = int(np.bitwise_and.reduce(table.hiz[table.present]))
+
+        outputs: list[OutputAnalysis] = []
+        columns: dict[tuple[bytes, bytes], int] = {} # Level and Hi-Z columns -> first output having them
+        for pin in self.output_pins(table):
+            bit: int = 1 << (pin - 1)
+
+            always_hiz: bool = bool(hiz_and & bit)
+            constant: int | None = None
+            if not always_hiz and not (table.osc & bit):
+                if not driven_or & bit:
+                    constant = 0
+                elif driven_and & bit:
+                    constant = 1
+
+            # Outputs that are stuck are trivially equal, they are not reported as duplicates
+            duplicate_of: int | None = None
+            inverted: bool = False
+            if constant is None and not always_hiz:
+                level, inv_level, hiz = table.column(pin)
+                if (level, hiz) in columns:
+                    duplicate_of = columns[(level, hiz)]
+                elif (inv_level, hiz) in columns:
+                    duplicate_of = columns[(inv_level, hiz)]
+                    inverted = True
+                else:
+                    columns[(level, hiz)] = pin
+
+            outputs.append(OutputAnalysis(pin,
+                                          tuple(in_pin for in_pin, mask in zip(table.input_pins, level_masks) if mask & bit and in_pin != pin),
+                                          tuple(in_pin for in_pin, mask in zip(table.input_pins, hiz_masks) if mask & bit and in_pin != pin),
+                                          constant, always_hiz, not ((table.osc | table.unstable) & bit), duplicate_of, inverted))
+
+        return TableAnalysis(table.input_pins, table.rows, tuple(outputs))
+
+    def _pin_name(self, pin: int) -> str:
+        return self._ic_definition.pin_names[pin - 1] or str(pin)
+
+    def format_report(self, analysis: TableAnalysis) -> str:
+        total: int = 1 << len(analysis.input_pins)
+        lines: list[str] = [f'{len(analysis.input_pins)} inputs: {" ".join(self._pin_name(pin) for pin in analysis.input_pins)}',
+                            f'{analysis.rows} of {total} input combinations present{"" if analysis.complete else ", dependencies may be missing"}']
+
+        for output in analysis.outputs:
+            line: str = f'{self._pin_name(output.pin):<8}'
+            if output.always_hiz:
+                line += ' always Hi-Z'
+            elif output.constant is not None:
+                line += f' constant {output.constant}'
+            else:
+                line += f' depends on {" ".join(self._pin_name(pin) for pin in output.inputs) or "nothing"}'
+            if output.hiz_inputs:
+                line += f', Hi-Z controlled by {" ".join(self._pin_name(pin) for pin in output.hiz_inputs)}'
+            if output.duplicate_of is not None:
+                line += f', {"inverse" if output.inverted else "copy"} of {self._pin_name(output.duplicate_of)}'
+            if not output.pure:
+                line += ', not a pure function of the inputs'
+            lines.append(line)
+
+        return '\n'.join(lines)
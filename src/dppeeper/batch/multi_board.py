@@ -0,0 +1,175 @@
+"""This module contains the execution of batch jobs on several boards at the same time"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Generic, NamedTuple, TypeVar, final
+
+from dppeeper.batch.truth_table_sweep import TruthTableSweep
+from dppeeper.board.dump_file import DumpFile, DumpReader, DumpWriter
+from dppeeper.peeper_session import PeeperSession
+
+T = TypeVar('T')
+
+class BoardSpec(NamedTuple):
+    port: str
+    definition: str | None # Path or library name, None for the one given with -d
+
+    @staticmethod
+    def parse(spec: str) -> 'BoardSpec':
+        """Parse a board given as `port` or `port=definition`"""
+        port, sep, definition = spec.partition('=')
+        if not port or (sep and not definition):
+            raise ValueError(f'Invalid board "{spec}", expected port or port=definition')
+
+        return BoardSpec(port, definition if sep else None)
+
+class BoardThroughput(NamedTuple):
+    port: str
+    steps: int
+    elapsed: float # Seconds
+
+    @property
+    def rate(self) -> float:
+        return self.steps / self.elapsed if self.elapsed > 0 else 0.0
+
+class BoardOutcome(NamedTuple, Generic[T]):
+    port: str
+    result: T | None
+    error: Exception | None
+    elapsed: float
+
+@final
+class BoardPool:
+    """
+    Runs one job per board, each on its own thread. Boards talk over separate serial ports and the
+    threads spend their time waiting on them, so the throughput grows with the number of boards.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    @classmethod
+    def run(cls, jobs: list[tuple[str, Callable[[], T]]]) -> list[BoardOutcome[T]]:
+        """
+        Run the jobs and wait for all of them, a failure does not stop the other boards
+
+        Args:
+            jobs (list[tuple[str, Callable[[], T]]]): port of the board and job to run on it
+
+        Returns:
+            list[BoardOutcome[T]]: result or error of each job, in the same order
+        """
+        outcomes: list[BoardOutcome[T] | None] = [None] * len(jobs)
+
+        def run_job(idx: int, port: str, job: Callable[[], T]) -> None:
+            start: float = time.perf_counter()
+            try:
+                outcomes[idx] = BoardOutcome(port, job(), None, time.perf_counter() - start)
+            except Exception as ex:
+                cls._LOGGER.error(f'Board on {port} failed: {ex}')
+                outcomes[idx] = BoardOutcome(port, None, ex, time.perf_counter() - start)
+
+        threads: list[threading.Thread] = [threading.Thread(target=run_job, args=(idx, port, job), name=f'Board-{port}', daemon=True)
+                                           for idx, (port, job) in enumerate(jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return [outcome for outcome in outcomes if outcome is not None]
+
+    @staticmethod
+    def raise_first_error(outcomes: list[BoardOutcome[T]]) -> None:
+        for outcome in outcomes:
+            if outcome.error is not None:
+                raise outcome.error
+
+@final
+class ShardedSweep:
+    """
+    Splits a truth table sweep in contiguous shards of steps, one per board, and merges the shards in a single output.
+    Each shard is written to a part file next to the output with its own checkpoint, so an interrupted sweep is resumed
+    by every board from where it stopped, as long as the same number of boards is used.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _sessions: list[PeeperSession]
+    _sweeps: list[TruthTableSweep]
+
+    def __init__(self, sessions: list[PeeperSession], pins: list[int], check_osc: bool = False) -> None:
+        """
+        Args:
+            sessions (list[PeeperSession]): sessions of the boards, reading ICs of the same type
+            pins (list[int]): pins to sweep, see `TruthTableSweep.sweep_pins`
+            check_osc (bool, optional): also check for oscillating pins at every step. Defaults to False.
+        """
+        if not sessions:
+            raise ValueError('At least one board is needed')
+        if len({session.ic_definition.name for session in sessions}) > 1:
+            raise ValueError('All the boards of a sweep must read the same IC type')
+
+        total_steps: int = 1 << len(set(pins))
+        self._sessions = sessions
+        self._sweeps = [TruthTableSweep(session, pins, check_osc, first, stop)
+                        for session, (first, stop) in zip(sessions, TruthTableSweep.shard_bounds(total_steps, len(sessions)))]
+
+    @property
+    def total_steps(self) -> int:
+        return self._sweeps[0].total_steps
+
+    @staticmethod
+    def part_path(output: str, idx: int) -> str:
+        return f'{output}.part{idx}'
+
+    def _merge(self, output: str) -> None:
+        ic_name: str = self._sessions[0].ic_definition.name
+        pin_count: int = len(self._sessions[0].ic_definition.zif_map)
+
+        for idx, sweep in enumerate(self._sweeps):
+            with DumpReader(self.part_path(output, idx)) as part:
+                if len(part) != sweep.shard_steps:
+                    raise ValueError(f'Shard {idx} has {len(part)} records instead of {sweep.shard_steps}')
+
+        with DumpWriter(output + '.tmp', ic_name, pin_count) as writer:
+            for idx in range(len(self._sweeps)):
+                with open(self.part_path(output, idx), 'rb') as part_file:
+                    part_file.seek(DumpFile.HEADER.size)
+                    while chunk := part_file.read(DumpFile.RECORD.size * 4096):
+                        writer.write_raw(chunk)
+            writer.sync()
+
+        if os.path.exists(output + '.idx'):
+            os.remove(output + '.idx')
+        os.replace(output + '.tmp', output)
+
+        for idx in range(len(self._sweeps)):
+            part_path: str = self.part_path(output, idx)
+            for path in (part_path, part_path + '.ckpt'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def run(self, output: str, resume: bool = False) -> list[BoardThroughput]:
+        """
+        Run the shards on all the boards at the same time, then merge them in the output
+
+        Args:
+            output (str): dump file receiving the results
+            resume (bool, optional): continue from the checkpoints of a previous run. Defaults to False.
+
+        Returns:
+            list[BoardThroughput]: steps performed and time taken by each board
+        """
+        jobs: list[tuple[str, Callable[[], int]]] = []
+        for idx, (session, sweep) in enumerate(zip(self._sessions, self._sweeps)):
+            port: str = str(getattr(session.ser, 'port', idx))
+            jobs.append((port, (lambda sweep, part: lambda: sweep.run(part, resume))(sweep, self.part_path(output, idx))))
+
+        outcomes: list[BoardOutcome[int]] = BoardPool.run(jobs)
+        BoardPool.raise_first_error(outcomes) # The parts stay on disk, with their checkpoints
+
+        self._LOGGER.info(f'Merging {len(self._sweeps)} shards into {output}')
+        self._merge(output)
+
+        return [BoardThroughput(outcome.port, outcome.result or 0, outcome.elapsed) for outcome in outcomes]
@@ -0,0 +1,204 @@
+"""This module contains the replay of a recorded session on a board, comparing the results with the recording"""
+
+import logging
+from typing import Iterable, Iterator, NamedTuple, final
+
+from dppeeper.board.dump_file import DumpReader, DumpRecordKind
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.peeper_session import PeeperSession, PinState
+
+class ReplayStep(NamedTuple):
+    """An operation of a recorded session, rebuilt from the records preceding one of its RESULT records"""
+    rec_no: int # Number of the RESULT record in the dump
+    written: int # Value of the pins, the clock pin is low
+    clock_pin: int # Clock pin pulsed before reading, 0 if none
+    power_cycle: bool # The IC was powered off and on before setting the pins
+    check_osc: bool # The oscillating pins were checked
+    expected: PinState
+    pulses: int = 1 # Times the clock pin was pulsed, a burst records a CLOCK record for every pulse
+
+class ReplayDiff(NamedTuple):
+    step: ReplayStep
+    actual: PinState
+    level: int # Pins read at a different level
+    hiz: int # Pins that differ in being Hi-Z
+    osc: int # Pins that differ in oscillating
+
+    @property
+    def diverged(self) -> bool:
+        return bool(self.level | self.hiz | self.osc)
+
+@final
+class SessionReplay:
+    """
+    Executes a recorded session again, as fast as the board allows, and compares every state with the recorded one.
+
+    The operations are rebuilt from the RESULT records: CLOCK records before a result make it as many clock pulses, POWER records make it
+    follow a power cycle and OSC records mean that the oscillating pins were checked, and are checked again.
+    The raw WRITE records are not replayed one by one: the session repeats the writes it needs, including the Hi-Z probes.
+    Hi-Z pins are compared only if the replay session checks them, so the Hi-Z check must be enabled as it was while recording.
+
+    Steps without Hi-Z or oscillation checks are sent as pipelined batches, and power cycles wait only for the power delay
+    of the session. Levels are not compared on pins that are Hi-Z or oscillating in either the recording or the replay.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _session: PeeperSession
+    _batch_size: int
+    _signal_mask: int
+    _hiz_mask: int
+
+    def __init__(self, session: PeeperSession, batch_size: int = 64) -> None:
+        self._session = session
+        self._batch_size = batch_size
+        self._signal_mask = session.ic_definition.signal_mask # Power, ground and unconnected pins are not compared
+        self._hiz_mask = ICDefinition.pins_to_mask(session.hiz_check_list)
+
+    @staticmethod
+    def steps(reader: DumpReader) -> Iterator[ReplayStep]:
+        """Rebuild the operations of a recorded session"""
+        clock_pin: int = 0
+        pulses: int = 0
+        power_off: bool = False
+        power_cycle: bool = False
+        check_osc: bool = False
+
+        for rec_no, record in enumerate(reader):
+            match record.kind:
+                case DumpRecordKind.CLOCK:
+                    clock_pin = record.written
+                    pulses = pulses + 1
+                case DumpRecordKind.POWER if record.written == 0:
+                    power_off = True
+                case DumpRecordKind.POWER:
+                    power_cycle = power_cycle or power_off
+                    power_off = False
+                case DumpRecordKind.OSC:
+                    check_osc = True
+                case DumpRecordKind.RESULT:
+                    yield ReplayStep(rec_no, record.written, clock_pin, power_cycle, check_osc, PinState(record.read, record.hiz, record.osc),
+                                     max(pulses, 1))
+                    clock_pin = 0
+                    pulses = 0
+                    power_cycle = False
+                    check_osc = False
+
+    def _compare(self, step: ReplayStep, actual: PinState) -> ReplayDiff:
+        hiz: int = (step.expected.hiz ^ actual.hiz) & self._hiz_mask
+        osc: int = (step.expected.osc ^ actual.osc) & self._signal_mask if step.check_osc else 0
+
+        undriven: int = step.expected.hiz | actual.hiz | step.expected.osc | actual.osc
+        level: int = (step.expected.read ^ actual.read) & self._signal_mask & ~undriven
+
+        return ReplayDiff(step, actual, level, hiz, osc)
+
+    def _flush(self, batch: list[tuple[ReplayStep, int]], vals: list[int]) -> Iterator[ReplayDiff]:
+        reads: list[int] = self._session.write_vals(vals) if vals else []
+
+        for step, writes in batch:
+            yield self._compare(step, PinState(reads[writes - 1], 0, 0))
+
+    def run(self, steps: Iterable[ReplayStep]) -> Iterator[ReplayDiff]:
+        """
+        Execute the steps, yielding their comparison with the recording as soon as it is available
+
+        Returns:
+            Iterator[ReplayDiff]: comparison of every step, including the ones that match
+        """
+        batched: bool = not self._session.hiz_check_list
+        batch: list[tuple[ReplayStep, int]] = [] # Step and number of writes in the batch up to the step
+        vals: list[int] = []
+
+        for step in steps:
+            if batched and not step.check_osc and not step.power_cycle:
+                if step.clock_pin:
+                    clk_val: int = step.written | (1 << (step.clock_pin - 1))
+                    vals.append(step.written)
+                    vals.extend((clk_val, step.written) * step.pulses)
+                else:
+                    vals.append(step.written)
+                batch.append((step, len(vals)))
+
+                if len(vals) >= self._batch_size:
+                    yield from self._flush(batch, vals)
+                    batch, vals = [], []
+                continue
+
+            yield from self._flush(batch, vals)
+            batch, vals = [], []
+
+            if step.power_cycle:
+                self._session.restart_power()
+
+            actual: PinState
+            if step.clock_pin and step.pulses > 1:
+                actual = self._session.clock_burst(step.written, step.clock_pin, step.pulses, step.check_osc).state
+            elif step.clock_pin:
+                actual = self._session.clock(step.written, step.clock_pin, step.check_osc)
+            else:
+                actual = self._session.set_pins(step.written, step.check_osc)
+            yield self._compare(step, actual)
+
+        yield from self._flush(batch, vals)
+
+@final
+class ReplayReport:
+    """Summary of the differences found by a replay"""
+
+    steps: int
+    diverged: int
+    first: ReplayDiff | None
+
+    _pin_counts: dict[int, list[int]] # Pin -> counts of level, Hi-Z and oscillation differences
+
+    def __init__(self) -> None:
+        self.steps = 0
+        self.diverged = 0
+        self.first = None
+        self._pin_counts = {}
+
+    def add(self, diff: ReplayDiff) -> None:
+        self.steps = self.steps + 1
+        if not diff.diverged:
+            return
+
+        self.diverged = self.diverged + 1
+        if self.first is None:
+            self.first = diff
+
+        for kind, mask in enumerate((diff.level, diff.hiz, diff.osc)):
+            while mask:
+                bit: int = (mask & -mask).bit_length()
+                self._pin_counts.setdefault(bit, [0, 0, 0])[kind] += 1
+                mask = mask & (mask - 1)
+
+    def pin_counts(self) -> dict[int, tuple[int, int, int]]:
+        """Level, Hi-Z and oscillation differences of every pin that diverged, by pin number"""
+        return {pin: (counts[0], counts[1], counts[2]) for pin, counts in sorted(self._pin_counts.items())}
+
+    @staticmethod
+    def _pin_list(mask: int, ic_definition: ICDefinition) -> str:
+        return ' '.join(ic_definition.pin_names[bit] or str(bit + 1) for bit in range(len(ic_definition.zif_map)) if (mask >> bit) & 0x01)
+
+    def format_report(self, ic_definition: ICDefinition) -> str:
+        width: int = (len(ic_definition.zif_map) + 3) // 4
+        lines: list[str] = [f'{self.steps} steps replayed, {self.diverged} diverged']
+
+        if self.first is not None:
+            step: ReplayStep = self.first.step
+            action: str = f'clock {ic_definition.pin_names[step.clock_pin - 1] or step.clock_pin}' if step.clock_pin else 'set'
+            if step.pulses > 1:
+                action = f'{action} x{step.pulses}'
+            lines.append(f'First divergence at record {step.rec_no} ({action}{", after a power cycle" if step.power_cycle else ""}) W:{step.written:0{width}X}')
+            for name, state in (('expected', step.expected), ('actual', self.first.actual)):
+                lines.append(f'  {name:<8} R:{state.read:0{width}X} Z:{state.hiz:0{width}X} O:{state.osc:0{width}X}')
+            for name, mask in (('level', self.first.level), ('Hi-Z', self.first.hiz), ('osc', self.first.osc)):
+                if mask:
+                    lines.append(f'  {name:<8} {self._pin_list(mask, ic_definition)}')
+
+            lines.append('Differences by pin (level/Hi-Z/osc):')
+            for pin, (level, hiz, osc) in self.pin_counts().items():
+                lines.append(f'  {ic_definition.pin_names[pin - 1] or str(pin):<8} {level:>8} {hiz:>8} {osc:>8}')
+
+        return '\n'.join(lines)
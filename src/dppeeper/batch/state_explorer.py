@@ -0,0 +1,386 @@
+"""This module contains the headless exploration of the register states of an IC with registered outputs"""
+
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from typing import BinaryIO, Callable, Literal, NamedTuple, final
+
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.peeper_session import PeeperSession
+
+@final
+class StateGraph:
+    """
+    Transition graph of the registers of an IC, stored as a memory-mapped dense table.
+
+    The table has an entry for every (state, input) pair, holding the state reached when clocking that input
+    in that state, or UNEXPLORED. States and inputs are packed: bit N is the Nth pin, in ascending order, of
+    the state (registered) and input pin lists stored in the header.
+    Every entry is written in place, so the file doubles as the checkpoint of an exploration.
+    """
+
+    MAGIC: bytes = b'DPPG'
+    VERSION: int = 1
+
+    # Magic, version, state bits, input bits, state pin mask, input pin mask, root state, IC name, padded to 64 bytes
+    HEADER: struct.Struct = struct.Struct('<4sHBBQQQ32s')
+    HEADER_SIZE: int = 64
+    _ROOT_OFFSET: int = struct.calcsize('<4sHBBQQ')
+
+    MAX_BITS: int = 24
+    _FILL_CHUNK: int = 1 << 20
+
+    ic_name: str
+    state_pins: list[int]
+    input_pins: list[int]
+    state_bits: int
+    input_bits: int
+    unexplored: int
+
+    _file: BinaryIO
+    _map: mmap.mmap
+    _table: memoryview
+
+    @staticmethod
+    def _pins_to_mask(pins: list[int]) -> int:
+        return sum(1 << (pin - 1) for pin in pins)
+
+    @staticmethod
+    def _encode_name(name: str) -> bytes:
+        # Encoded as in dump files, cut on a character boundary so that it decodes back to what was stored
+        return name.encode('utf-8')[:32].decode('utf-8', errors='ignore').encode('utf-8')
+
+    @staticmethod
+    def _mask_to_pins(mask: int) -> list[int]:
+        return [bit + 1 for bit in range(mask.bit_length()) if (mask >> bit) & 0x01]
+
+    def __init__(self, path: str, ic_name: str, state_pins: list[int], input_pins: list[int], resume: bool = False) -> None:
+        """
+        Create a graph file, or open an existing one if resuming
+
+        Raises:
+            ValueError: if the table would be too large, or the existing file belongs to a different exploration
+        """
+        self.ic_name = ic_name
+        self.state_pins = sorted(state_pins)
+        self.input_pins = sorted(input_pins)
+        self.state_bits = len(self.state_pins)
+        self.input_bits = len(self.input_pins)
+
+        if self.state_bits + self.input_bits > self.MAX_BITS:
+            raise ValueError(f'{self.state_bits} state bits and {self.input_bits} input bits exceed the supported {self.MAX_BITS}, exclude some inputs')
+
+        # Narrowest entry that can hold every state plus the UNEXPLORED marker
+        type_code: Literal['B', 'H', 'I'] = 'B' if self.state_bits < 8 else ('H' if self.state_bits < 16 else 'I')
+        self.unexplored = (1 << (struct.calcsize(type_code) * 8)) - 1
+        size: int = self.HEADER_SIZE + (struct.calcsize(type_code) << (self.state_bits + self.input_bits))
+
+        if resume and os.path.exists(path):
+            self._file = open(path, 'r+b')
+            header: tuple = self.HEADER.unpack(self._file.read(self.HEADER.size))
+            if (header[0] != self.MAGIC or header[1] != self.VERSION or
+                header[4] != self._pins_to_mask(self.state_pins) or header[5] != self._pins_to_mask(self.input_pins) or
+                header[7].rstrip(b'\0') != self._encode_name(ic_name) or os.path.getsize(path) != size):
+                self._file.close()
+                raise ValueError(f'Graph {path} belongs to a different exploration')
+        else:
+            self._file = open(path, 'w+b')
+            self._file.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.state_bits, self.input_bits,
+                                              self._pins_to_mask(self.state_pins), self._pins_to_mask(self.input_pins), 0,
+                                              self._encode_name(ic_name)))
+            self._file.seek(self.HEADER_SIZE)
+            for offset in range(self.HEADER_SIZE, size, self._FILL_CHUNK):
+                self._file.write(b'\xFF' * min(self._FILL_CHUNK, size - offset))
+            self._file.flush()
+
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._table = memoryview(self._map)[self.HEADER_SIZE:].cast(type_code)
+
+    @classmethod
+    def open(cls, path: str) -> 'StateGraph':
+        """Open an existing graph file"""
+        with open(path, 'rb') as graph_file:
+            header: tuple = cls.HEADER.unpack(graph_file.read(cls.HEADER.size))
+
+        if header[0] != cls.MAGIC or header[1] != cls.VERSION:
+            raise ValueError(f'{path} is not a state graph')
+
+        return cls(path, header[7].rstrip(b'\0').decode('utf-8'), cls._mask_to_pins(header[4]), cls._mask_to_pins(header[5]), True)
+
+    @property
+    def root(self) -> int:
+        """State found after powering up the IC"""
+        return self.HEADER.unpack_from(self._map)[6]
+
+    @root.setter
+    def root(self, state: int) -> None:
+        struct.pack_into('<Q', self._map, self._ROOT_OFFSET, state)
+
+    def get(self, state: int, inputs: int) -> int:
+        """State reached from `state` clocking `inputs`, or `unexplored`"""
+        return self._table[(state << self.input_bits) | inputs]
+
+    def set(self, state: int, inputs: int, next_state: int) -> None:
+        self._table[(state << self.input_bits) | inputs] = next_state
+
+    def row(self, state: int) -> memoryview:
+        """Entries for every input from a state"""
+        return self._table[state << self.input_bits:(state + 1) << self.input_bits]
+
+    def flush(self) -> None:
+        self._map.flush()
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._table.release()
+            self._map.close()
+            self._file.close()
+
+    def __enter__(self) -> 'StateGraph':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+class ExplorationStats(NamedTuple):
+    states: int # Distinct states discovered
+    transitions: int # Transitions recorded in the graph, including those of previous runs
+    clocks: int # Clock pulses issued by this run, including the ones needed to move between states
+    power_cycles: int
+    elapsed: float # Seconds
+
+@final
+class RegisteredStateExplorer:
+    """
+    Explores the register states of an IC reachable from power-up: every input combination is clocked in every
+    state discovered, breadth first, recording the transitions in a StateGraph.
+
+    States are expanded in the order they were discovered. Before every input the board is moved back to the state
+    being expanded, following the shortest path through the transitions known so far, and the IC is power cycled
+    only when that state cannot be reached from the current one.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _REPORT_INTERVAL: float = 10.0 # Seconds between progress reports and checkpoints
+
+    _session: PeeperSession
+    _graph: StateGraph
+    _clk_pin: int
+
+    _base_val: int # Value of the pins that are neither inputs nor the clock: OEs enabled, everything else low
+    _input_masks: list[int]
+    _state_masks: list[int]
+
+    _visited: bytearray # Bitset of discovered states
+    _next_input: list[int] # Inputs below this have been tried, per state
+    _successors: list[dict[int, int]] # Known successor -> input that reaches it, per state
+    _transitions: int
+
+    _clocks: int
+    _power_cycles: int
+
+    def __init__(self, session: PeeperSession, graph: StateGraph, clk_pin: int) -> None:
+        self._session = session
+        self._graph = graph
+        self._clk_pin = clk_pin
+
+        ic_definition: ICDefinition = session.ic_definition
+        self._base_val = sum(1 << (pin - 1) for pin in ic_definition.oe_h_pins if pin not in graph.input_pins)
+        self._input_masks = [1 << (pin - 1) for pin in graph.input_pins]
+        self._state_masks = [1 << (pin - 1) for pin in graph.state_pins]
+
+        states: int = 1 << graph.state_bits
+        self._visited = bytearray((states + 7) // 8)
+        self._next_input = [0] * states
+        self._successors = [{} for _ in range(states)]
+        self._transitions = 0
+        self._clocks = 0
+        self._power_cycles = 0
+
+        self._load_graph()
+
+    @staticmethod
+    def explore_pins(ic_definition: ICDefinition, clk_pin: int, exclude: list[int] = []) -> tuple[list[int], list[int]]:
+        """
+        Default pins for an exploration
+
+        Returns:
+            tuple[list[int], list[int]]: the registered pins holding the state, and the input pins to combine
+        """
+        fixed: set[int] = set(ic_definition.oe_l_pins + ic_definition.oe_h_pins + ic_definition.q_pins + tuple(exclude) + (clk_pin,))
+        return (sorted(ic_definition.q_pins), sorted(set(ic_definition.in_pins) - fixed))
+
+    def _is_visited(self, state: int) -> bool:
+        return (self._visited[state >> 3] >> (state & 0x07)) & 0x01 == 1
+
+    def _visit(self, state: int) -> None:
+        self._visited[state >> 3] = self._visited[state >> 3] | (1 << (state & 0x07))
+
+    def _load_graph(self) -> None:
+        """Rebuild the in-memory indexes from the transitions already in the graph"""
+        unexplored: int = self._graph.unexplored
+
+        for state in range(1 << self._graph.state_bits):
+            row: memoryview = self._graph.row(state)
+            for inputs, next_state in enumerate(row):
+                if next_state == unexplored:
+                    break
+                self._successors[state].setdefault(next_state, inputs)
+                self._visit(state)
+                self._visit(next_state)
+                self._next_input[state] = inputs + 1
+                self._transitions = self._transitions + 1
+            row.release()
+
+    def _pack_inputs(self, inputs: int) -> int:
+        val: int = self._base_val
+
+        for idx, mask in enumerate(self._input_masks):
+            if (inputs >> idx) & 0x01:
+                val = val | mask
+
+        return val
+
+    def _unpack_state(self, read: int) -> int:
+        state: int = 0
+
+        for idx, mask in enumerate(self._state_masks):
+            if read & mask:
+                state = state | (1 << idx)
+
+        return state
+
+    def _clock_path(self, path: list[int]) -> int:
+        """Clock a sequence of inputs as a single pipelined batch, returning the state after the last one"""
+        clk_mask: int = 1 << (self._clk_pin - 1)
+
+        vals: list[int] = []
+        for inputs in path:
+            set_val: int = self._pack_inputs(inputs)
+            vals.extend((set_val, set_val | clk_mask, set_val))
+
+        self._clocks = self._clocks + len(path)
+        return self._unpack_state(self._session.write_vals(vals)[-1])
+
+    def _power_up_state(self) -> int:
+        self._power_cycles = self._power_cycles + 1
+        return self._unpack_state(self._session.power_cycle(self._base_val).read)
+
+    def _shortest_path(self, start: int, goal: Callable[[int], bool]) -> tuple[list[int], int] | None:
+        """Inputs to clock to get from a state to the nearest one satisfying goal, and that state, or None if there is none"""
+        parents: dict[int, tuple[int, int]] = {start: (start, 0)}
+        queue: deque[int] = deque([start])
+
+        while queue:
+            state: int = queue.popleft()
+            if goal(state):
+                found: int = state
+                path: list[int] = []
+                while state != start:
+                    state, inputs = parents[state]
+                    path.append(inputs)
+                path.reverse()
+                return (path, found)
+
+            for next_state, inputs in self._successors[state].items():
+                if next_state not in parents:
+                    parents[next_state] = (state, inputs)
+                    queue.append(next_state)
+
+        return None
+
+    def _move_to(self, current: int, target: int) -> int:
+        """Clock the board from the current state to the target one, power cycling if needed, returning the state reached"""
+        found: tuple[list[int], int] | None = self._shortest_path(current, lambda state: state == target)
+        if found is None:
+            current = self._power_up_state()
+            found = self._shortest_path(current, lambda state: state == target)
+            if found is None:
+                return current
+
+        path: list[int] = found[0]
+        if not path:
+            return current
+
+        current = self._clock_path(path)
+        if current != target:
+            self._LOGGER.warning(f'Expected to reach state {target:X}, got {current:X} instead: transitions depend on more than the registered pins')
+        return current
+
+    def _frontier(self, root: int) -> deque[int]:
+        """States with inputs still to try, nearest to the root first"""
+        inputs_count: int = 1 << self._graph.input_bits
+        frontier: deque[int] = deque()
+        seen: set[int] = {root}
+        queue: deque[int] = deque([root])
+
+        while queue:
+            state: int = queue.popleft()
+            if self._next_input[state] < inputs_count:
+                frontier.append(state)
+            for next_state in self._successors[state]:
+                if next_state not in seen:
+                    seen.add(next_state)
+                    queue.append(next_state)
+
+        # States of a previous run that the transitions known do not lead to from this root
+        frontier.extend(state for state in range(1 << self._graph.state_bits)
+                        if state not in seen and self._is_visited(state) and self._next_input[state] < inputs_count)
+        return frontier
+
+    def run(self) -> ExplorationStats:
+        """Explore every state reachable from power-up, or from the states already in the graph when resuming"""
+        start_time: float = time.monotonic()
+        last_report: float = start_time
+        last_states: int = self.states_count()
+
+        inputs_count: int = 1 << self._graph.input_bits
+        current: int = self._power_up_state()
+
+        if self._transitions and current != self._graph.root:
+            self._LOGGER.warning(f'Power-up state {current:X} differs from the one in the graph ({self._graph.root:X})')
+        self._graph.root = current
+        self._visit(current)
+
+        frontier: deque[int] = self._frontier(current)
+        while frontier:
+            state: int = frontier[0]
+            if self._next_input[state] >= inputs_count:
+                frontier.popleft()
+                continue
+
+            current = self._move_to(current, state)
+            if current != state:
+                self._LOGGER.warning(f'State {state:X} cannot be reached anymore, leaving its inputs unexplored')
+                frontier.popleft()
+                continue
+
+            inputs: int = self._next_input[state]
+            next_state: int = self._clock_path([inputs])
+
+            self._graph.set(state, inputs, next_state)
+            self._successors[state].setdefault(next_state, inputs)
+            self._next_input[state] = inputs + 1
+            self._transitions = self._transitions + 1
+            if not self._is_visited(next_state):
+                self._visit(next_state)
+                frontier.append(next_state)
+            current = next_state
+
+            now: float = time.monotonic()
+            if now - last_report >= self._REPORT_INTERVAL:
+                self._graph.flush()
+                states: int = self.states_count()
+                self._LOGGER.info(f'{states} states, {self._transitions} transitions ({(states - last_states) / (now - last_report):.2f} states/s, {self._clocks / (now - start_time):.1f} clocks/s)')
+                last_report = now
+                last_states = states
+
+        self._graph.flush()
+        return ExplorationStats(self.states_count(), self._transitions, self._clocks, self._power_cycles, time.monotonic() - start_time)
+
+    def states_count(self) -> int:
+        return sum(byte.bit_count() for byte in self._visited)
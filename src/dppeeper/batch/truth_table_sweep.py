@@ -0,0 +1,197 @@
+"""This module contains the headless, resumable sweep of all the input combinations of an IC"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Iterator, final
+
+from dppeeper.board.dump_file import DumpFile, DumpReader, DumpRecordKind, DumpWriter
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.peeper_session import PeeperSession
+
+@final
+class TruthTableSweep:
+    """
+    Walks every combination of the input pins of an IC in Gray-code order, so only one pin changes between steps,
+    and streams a RESULT record for each one to a dump file.
+
+    Progress is saved in a checkpoint file next to the output, so an interrupted sweep can be resumed.
+    Records written after the last checkpoint are discarded on resume and the corresponding steps repeated.
+
+    A sweep can be limited to a range of steps (a shard), so the input space can be split across several boards:
+    the outputs of consecutive shards, concatenated, are the same as the output of a whole sweep.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _CHECKPOINT_INTERVAL: float = 10.0 # Seconds between checkpoints
+    _BATCH_SIZE: int = 64 # Vectors per pipelined batch when Hi-Z checks are off
+
+    _session: PeeperSession
+    _pins: list[int]
+    _pin_masks: list[int]
+    _check_osc: bool
+    _first_step: int
+    _stop_step: int
+
+    def __init__(self, session: PeeperSession, pins: list[int], check_osc: bool = False, first_step: int = 0, stop_step: int | None = None) -> None:
+        """
+        Args:
+            session (PeeperSession): session of the board reading the IC
+            pins (list[int]): pins to sweep, see `sweep_pins`
+            check_osc (bool, optional): also check for oscillating pins at every step. Defaults to False.
+            first_step (int, optional): first step of the shard to sweep. Defaults to 0.
+            stop_step (int | None, optional): step following the last one of the shard. Defaults to the end of the sweep.
+        """
+        if len(pins) > 32:
+            raise ValueError(f'Sweeping {len(pins)} pins is not supported')
+
+        self._session = session
+        self._pins = sorted(set(pins))
+        self._pin_masks = [1 << (pin - 1) for pin in self._pins]
+        self._check_osc = check_osc
+
+        self._first_step = first_step
+        self._stop_step = self.total_steps if stop_step is None else stop_step
+        if not 0 <= self._first_step <= self._stop_step <= self.total_steps:
+            raise ValueError(f'Invalid range of steps {first_step}-{stop_step}')
+
+    @staticmethod
+    def sweep_pins(ic_definition: ICDefinition, exclude: list[int] = []) -> list[int]:
+        """Input pins of a definition to be swept: inputs and I/Os"""
+        return sorted(set(ic_definition.in_pins + ic_definition.io_pins) - set(exclude))
+
+    @property
+    def total_steps(self) -> int:
+        return 1 << len(self._pins)
+
+    @property
+    def shard_steps(self) -> int:
+        return self._stop_step - self._first_step
+
+    @staticmethod
+    def shard_bounds(total_steps: int, shards: int) -> list[tuple[int, int]]:
+        """Split the steps in contiguous ranges of nearly the same size, as (first step, stop step)"""
+        return [((total_steps * idx) // shards, (total_steps * (idx + 1)) // shards) for idx in range(shards)]
+
+    def vector(self, step: int) -> int:
+        """Value written at a given step of the sweep"""
+        gray: int = step ^ (step >> 1)
+        val: int = 0
+
+        for idx, mask in enumerate(self._pin_masks):
+            if (gray >> idx) & 0x01:
+                val = val | mask
+
+        return val
+
+    def vectors(self, start: int = 0, stop: int | None = None) -> Iterator[int]:
+        """Values to write, from a given step up to the stop one excluded. Each one differs from the previous by a single pin."""
+        stop = self.total_steps if stop is None else stop
+        if start >= stop:
+            return
+
+        val: int = self.vector(start)
+        yield val
+        for step in range(start + 1, stop):
+            # Going from step - 1 to step in Gray code flips the bit at the position of the lowest set bit of step
+            val = val ^ self._pin_masks[(step & -step).bit_length() - 1]
+            yield val
+
+    @staticmethod
+    def _checkpoint_path(output: str) -> str:
+        return output + '.ckpt'
+
+    def _save_checkpoint(self, output: str, next_step: int, writer: DumpWriter) -> None:
+        writer.sync()
+
+        checkpoint: dict[str, Any] = {
+            'ic_name': self._session.ic_definition.name,
+            'pins': self._pins,
+            'first_step': self._first_step,
+            'stop_step': self._stop_step,
+            'next_step': next_step
+        }
+
+        tmp_path: str = self._checkpoint_path(output) + '.tmp'
+        with open(tmp_path, 'w') as ckpt_file:
+            json.dump(checkpoint, ckpt_file)
+        os.replace(tmp_path, self._checkpoint_path(output))
+
+    def _load_checkpoint(self, output: str) -> int:
+        ckpt_path: str = self._checkpoint_path(output)
+        if not os.path.exists(ckpt_path) or not os.path.exists(output):
+            return self._first_step
+
+        with open(ckpt_path, 'r') as ckpt_file:
+            checkpoint: dict[str, Any] = json.load(ckpt_file)
+
+        if (checkpoint['ic_name'] != self._session.ic_definition.name or checkpoint['pins'] != self._pins or
+            checkpoint.get('first_step', 0) != self._first_step or checkpoint.get('stop_step', self.total_steps) != self._stop_step):
+            raise ValueError(f'Checkpoint {ckpt_path} belongs to a different sweep')
+
+        next_step: int = checkpoint['next_step']
+        with DumpReader(output) as reader:
+            if len(reader) < next_step - self._first_step:
+                raise ValueError(f'Output {output} has fewer records ({len(reader)}) than the checkpoint ({next_step - self._first_step})')
+
+        return next_step
+
+    def run(self, output: str, resume: bool = False) -> int:
+        """
+        Run the sweep
+
+        Args:
+            output (str): dump file receiving the results
+            resume (bool, optional): continue from the checkpoint of a previous run. Defaults to False.
+
+        Returns:
+            int: number of steps performed by this run
+        """
+        start_step: int = self._load_checkpoint(output) if resume else self._first_step
+
+        if start_step == self._first_step: # Start from scratch
+            for path in (output, output + '.idx', self._checkpoint_path(output)):
+                if os.path.exists(path):
+                    os.remove(path)
+        else:
+            self._LOGGER.info(f'Resuming sweep at step {start_step} of {self._stop_step}')
+            with open(output, 'r+b') as out_file: # Drop what was written after the checkpoint
+                out_file.truncate(DumpFile.HEADER.size + (start_step - self._first_step) * DumpFile.RECORD.size)
+
+        ic_definition: ICDefinition = self._session.ic_definition
+        check_hiz: bool = bool(self._session.hiz_check_list)
+
+        with DumpWriter(output, ic_definition.name, len(ic_definition.zif_map)) as writer:
+            step: int = start_step
+            last_ckpt_time: float = time.monotonic()
+            last_ckpt_step: int = start_step
+
+            # Hi-Z and oscillation checks need the IC to sit on a vector, so they go one at a time
+            batch_size: int = 1 if (check_hiz or self._check_osc) else self._BATCH_SIZE
+
+            vectors: Iterator[int] = self.vectors(start_step, self._stop_step)
+            while step < self._stop_step:
+                batch: list[int] = [next(vectors) for _ in range(min(batch_size, self._stop_step - step))]
+
+                if batch_size == 1:
+                    read, hiz = self._session.set_and_check_pins(batch[0])
+                    osc: int = self._session.check_osc_pins(batch[0], read) if self._check_osc else 0
+                    writer.write(DumpRecordKind.RESULT, batch[0], read, hiz, osc)
+                else:
+                    for val, read in zip(batch, self._session.write_vals(batch)):
+                        writer.write(DumpRecordKind.RESULT, val, read)
+
+                step += len(batch)
+
+                now: float = time.monotonic()
+                if now - last_ckpt_time >= self._CHECKPOINT_INTERVAL:
+                    self._save_checkpoint(output, step, writer)
+                    self._LOGGER.info(f'Step {step}/{self._stop_step} ({(step - last_ckpt_step) / (now - last_ckpt_time):.1f} vectors/s)')
+                    last_ckpt_time = now
+                    last_ckpt_step = step
+
+            self._save_checkpoint(output, step, writer)
+
+        return step - start_step
@@ -0,0 +1,290 @@
+"""This module contains the parser and the runner for files of test vectors"""
+
+import logging
+import re
+from array import array
+from enum import Enum
+from typing import Iterable, Iterator, NamedTuple, final
+
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.peeper_session import BurstResult, PeeperSession, PinState
+
+class VectorAction(Enum):
+    SET = 'set'
+    CLOCK = 'clock'
+    POWERCYCLE = 'powercycle'
+    EXPECT = 'expect'
+
+class VectorStep(NamedTuple):
+    """A line of a vector file. Bit 0 of the masks corresponds to pin 1 of the IC"""
+    line_no: int
+    action: VectorAction
+    mask: int = 0 # Pins assigned (SET) or checked for a level (EXPECT)
+    value: int = 0 # Levels of the pins in mask
+    hiz: int = 0 # Pins expected to be Hi-Z (EXPECT)
+    pin: int = 0 # Clock pin (CLOCK)
+    pulses: int = 1 # Number of pulses (CLOCK)
+
+class VectorResult(NamedTuple):
+    step: VectorStep
+    written: int # Value of the pins when the step was executed
+    state: PinState # State of the pins after the step, or after the previous one for EXPECT
+    mismatch: int | None # Pins not matching the expectation, None if the step is not an EXPECT
+    pulses: array | None = None # Pins read after every pulse of a CLOCK step, if the runner captures them
+
+@final
+class VectorFile:
+    """
+    Parser for vector files: one action per line, with arguments separated by spaces or commas (so CSV files work too).
+    Text after a `#` is ignored. Pins are referred to by number or by name, as shown in the UI.
+
+        set I2=1 I3=0       # Assign levels to pins, the others keep their previous level
+        clock CLK1          # Pulse a clock pin low-high-low, it stays low afterwards
+        clock CLK1 200      # Pulse it 200 times, only the state after the last pulse is checked
+        powercycle
+        expect O12=1 IO13=Z # Compare the state after the last action, Z requires the Hi-Z check
+    """
+
+    _SEPARATORS = re.compile(r'[\s,;]+')
+
+    _pin_names: dict[str, int]
+    _pin_count: int
+
+    def __init__(self, ic_definition: ICDefinition) -> None:
+        self._pin_count = len(ic_definition.zif_map)
+        self._pin_names = {}
+
+        # Composite names (e.g. "I1/CLK") can also be referred to by any of their unambiguous parts
+        part_pins: dict[str, set[int]] = {}
+        for idx, name in enumerate(ic_definition.pin_names):
+            for part in name.upper().split('/'):
+                if part:
+                    part_pins.setdefault(part, set()).add(idx + 1)
+        for part, pins in part_pins.items():
+            if len(pins) == 1:
+                self._pin_names[part] = pins.pop()
+
+        for idx, name in enumerate(ic_definition.pin_names):
+            if name:
+                self._pin_names[name.upper()] = idx + 1
+
+    def resolve_pin(self, token: str) -> int:
+        """Pin number from its number or name, case insensitive"""
+        if token.isdigit():
+            pin: int = int(token)
+            if pin < 1 or pin > self._pin_count:
+                raise ValueError(f'Pin {pin} is out of range')
+            return pin
+
+        named_pin: int | None = self._pin_names.get(token.upper())
+        if named_pin is None:
+            raise ValueError(f'Unknown pin "{token}"')
+        return named_pin
+
+    def parse_line(self, line_no: int, line: str) -> VectorStep | None:
+        """Parse a line, returns None if it has no action"""
+        tokens: list[str] = [token for token in self._SEPARATORS.split(line.split('#', 1)[0]) if token]
+        if not tokens:
+            return None
+
+        try:
+            action: VectorAction = VectorAction(tokens[0].lower())
+        except ValueError:
+            raise ValueError(f'Line {line_no}: unknown action "{tokens[0]}"')
+
+        try:
+            match action:
+                case VectorAction.SET | VectorAction.EXPECT:
+                    mask: int = 0
+                    value: int = 0
+                    hiz: int = 0
+                    for token in tokens[1:]:
+                        name, _, level = token.partition('=')
+                        bit: int = 1 << (self.resolve_pin(name) - 1)
+                        match level.upper():
+                            case '1' | 'H':
+                                mask = mask | bit
+                                value = value | bit
+                            case '0' | 'L':
+                                mask = mask | bit
+                            case 'Z' if action == VectorAction.EXPECT:
+                                hiz = hiz | bit
+                            case _:
+                                raise ValueError(f'Invalid level in "{token}"')
+                    return VectorStep(line_no, action, mask, value, hiz)
+                case VectorAction.CLOCK:
+                    if len(tokens) not in (2, 3):
+                        raise ValueError('clock takes a pin and an optional count')
+                    pulses: int = 1
+                    if len(tokens) == 3:
+                        if not tokens[2].isdigit() or int(tokens[2]) < 1:
+                            raise ValueError(f'Invalid pulse count "{tokens[2]}"')
+                        pulses = int(tokens[2])
+                    return VectorStep(line_no, action, pin=self.resolve_pin(tokens[1]), pulses=pulses)
+                case _:
+                    if len(tokens) != 1:
+                        raise ValueError(f'{action.value} takes no arguments')
+                    return VectorStep(line_no, action)
+        except ValueError as ex:
+            raise ValueError(f'Line {line_no}: {ex}')
+
+    def parse(self, lines: Iterable[str]) -> Iterator[VectorStep]:
+        """Parse lines lazily, so a file is read while it is being executed"""
+        for line_no, line in enumerate(lines, 1):
+            step: VectorStep | None = self.parse_line(line_no, line)
+            if step is not None:
+                yield step
+
+@final
+class VectorRunner:
+    """
+    Executes vector steps on a session, stopping at the first failed expectation.
+
+    Without Hi-Z and oscillation checks, consecutive SET and CLOCK steps are sent as pipelined batches and their results,
+    and the checks of the EXPECT steps among them, are reported once the batch has been read back. Steps following a
+    failed expectation in the same batch have already reached the IC, but are not reported.
+    With the checks enabled, every step is executed on its own, with the Hi-Z check and the oscillation check if requested.
+    The pulses of a CLOCK step with a count are always pipelined, the checks are made only after the last one.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _session: PeeperSession
+    _check_osc: bool
+    _batched: bool
+    _batch_size: int
+    _capture: bool
+
+    _value: int
+    _state: PinState
+
+    def __init__(self, session: PeeperSession, check_osc: bool = False, batch_size: int = 64, capture: bool = False) -> None:
+        """
+        Args:
+            session (PeeperSession): session driving the IC
+            check_osc (bool, optional): check the oscillating pins after every step. Defaults to False.
+            batch_size (int, optional): writes gathered before a pipelined batch is sent. Defaults to 64.
+            capture (bool, optional): report the pins read after every pulse of the CLOCK steps. Defaults to False.
+        """
+        self._session = session
+        self._check_osc = check_osc
+        self._batched = not check_osc and not session.hiz_check_list
+        self._batch_size = batch_size
+        self._capture = capture
+
+        self._value = 0
+        self._state = PinState(0, 0, 0)
+
+    @staticmethod
+    def _check(step: VectorStep, state: PinState) -> int:
+        level_mismatch: int = ((state.read ^ step.value) | state.hiz) & step.mask
+        return level_mismatch | (step.hiz & ~state.hiz)
+
+    def _expect(self, step: VectorStep) -> VectorResult:
+        return VectorResult(step, self._value, self._state, self._check(step, self._state))
+
+    def _flush(self, batch: list[tuple[VectorStep, int, int]], vals: list[int]) -> Iterator[VectorResult]:
+        reads: list[int] = self._session.write_vals(vals) if vals else []
+
+        for step, written, writes in batch:
+            if step.action == VectorAction.EXPECT:
+                result: VectorResult = VectorResult(step, written, self._state, self._check(step, self._state))
+                yield result
+                if result.mismatch:
+                    return
+            else:
+                self._state = PinState(reads[writes - 1], 0, 0)
+                pulses: array | None = None
+                if self._capture and step.action == VectorAction.CLOCK:
+                    pulses = array('Q', reads[writes - 2 * step.pulses + 1:writes:2])
+                yield VectorResult(step, written, self._state, None, pulses)
+
+    def run(self, steps: Iterable[VectorStep]) -> Iterator[VectorResult]:
+        """
+        Execute the steps, yielding their results as soon as they are available
+
+        Returns:
+            Iterator[VectorResult]: results of the steps, the last one is a failed EXPECT if execution stopped early
+        """
+        batch: list[tuple[VectorStep, int, int]] = [] # Step, value written, number of writes in the batch up to the step
+        vals: list[int] = []
+
+        for step in steps:
+            match step.action:
+                case VectorAction.SET:
+                    self._value = (self._value & ~step.mask) | step.value
+                case VectorAction.CLOCK:
+                    self._value = self._value & ~(1 << (step.pin - 1))
+
+            if self._batched and step.action != VectorAction.POWERCYCLE:
+                if step.action == VectorAction.SET:
+                    vals.append(self._value)
+                elif step.action == VectorAction.CLOCK:
+                    clk_val: int = self._value | (1 << (step.pin - 1))
+                    vals.append(self._value)
+                    vals.extend((clk_val, self._value) * step.pulses)
+                batch.append((step, self._value, len(vals)))
+
+                if len(vals) >= self._batch_size:
+                    for result in self._flush(batch, vals):
+                        yield result
+                        if result.mismatch:
+                            return
+                    batch, vals = [], []
+                continue
+
+            for result in self._flush(batch, vals):
+                yield result
+                if result.mismatch:
+                    return
+            batch, vals = [], []
+
+            match step.action:
+                case VectorAction.SET:
+                    self._state = self._session.set_pins(self._value, self._check_osc)
+                case VectorAction.CLOCK if step.pulses == 1 and not self._capture:
+                    self._state = self._session.clock(self._value, step.pin, self._check_osc)
+                case VectorAction.CLOCK:
+                    burst: BurstResult = self._session.clock_burst(self._value, step.pin, step.pulses, self._check_osc, self._capture)
+                    self._state = burst.state
+                    yield VectorResult(step, self._value, self._state, None, burst.reads)
+                    continue
+                case VectorAction.POWERCYCLE:
+                    self._state = self._session.power_cycle(self._value)
+                case VectorAction.EXPECT:
+                    result = self._expect(step)
+                    yield result
+                    if result.mismatch:
+                        return
+                    continue
+
+            yield VectorResult(step, self._value, self._state, None)
+
+        for result in self._flush(batch, vals):
+            yield result
+            if result.mismatch:
+                return
+
+    @staticmethod
+    def format_result(result: VectorResult, ic_definition: ICDefinition) -> str:
+        """One line description of a result"""
+        width: int = (len(ic_definition.zif_map) + 3) // 4
+        line: str = (f'{result.step.line_no:>6} {result.step.action.value:<10} W:{result.written:0{width}X} '
+                     f'R:{result.state.read:0{width}X} Z:{result.state.hiz:0{width}X} O:{result.state.osc:0{width}X}')
+
+        if result.mismatch is None:
+            return line
+        elif result.mismatch == 0:
+            return line + ' PASS'
+        else:
+            pins: list[str] = [ic_definition.pin_names[bit] or str(bit + 1) for bit in range(len(ic_definition.zif_map)) if (result.mismatch >> bit) & 0x01]
+            return line + f' FAIL {" ".join(pins)}'
+
+    @staticmethod
+    def format_pulses(result: VectorResult, ic_definition: ICDefinition) -> list[str]:
+        """One line for every pulse captured by a CLOCK step"""
+        if result.pulses is None:
+            return []
+
+        width: int = (len(ic_definition.zif_map) + 3) // 4
+        return [f'{"":>6} {f"pulse {idx}":<10} R:{read:0{width}X}' for idx, read in enumerate(result.pulses, 1)]
@@ -0,0 +1,309 @@
+"""This module contains a daemon keeping a board open and powered, shared with other processes over a Unix socket"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, final
+
+import serial
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+
+from dppeeper.board.pin_pipeline import PinWritePipeline
+from dppeeper.ic.ic_definition import ICDefinition
+
+class _DaemonHandler(socketserver.BaseRequestHandler):
+    """
+    Serves one connection. Every request line received in the same chunk is executed as a group,
+    so the requests a client sends without waiting for the answers can be batched together.
+    """
+
+    server: '_DaemonServer'
+
+    def handle(self) -> None:
+        daemon: BoardDaemon = self.server.daemon
+        conn_id: int = id(self)
+        buffer: bytes = b''
+
+        try:
+            while True:
+                data: bytes = self.request.recv(65536)
+                if not data:
+                    break
+
+                lines: list[bytes] = (buffer + data).split(b'\n')
+                buffer = lines.pop()
+                if not lines:
+                    continue
+
+                responses: list[dict[str, Any]] = daemon.execute(conn_id, [line for line in lines if line.strip()])
+                self.request.sendall(b''.join(json.dumps(response).encode() + b'\n' for response in responses))
+        except OSError as ex:
+            BoardDaemon._LOGGER.debug(f'Connection dropped: {ex}')
+        finally:
+            daemon.release(conn_id)
+
+class _DaemonServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    daemon: 'BoardDaemon'
+
+@final
+class BoardDaemon:
+    """
+    Holds a board connection and the powered IC for as long as it runs, so that other processes can use it
+    through `DaemonBoardCommands` without opening the port, initializing the board and power cycling the IC every time.
+
+    Requests are newline-delimited JSON objects with an `op` field, answered in order with `{"ok": true, "result": ...}`
+    or `{"ok": false, "error": ...}`. Access to the board is serialized: requests from all the connections are executed
+    one at a time, and a connection can claim the board to be the only one served until it releases it or disconnects.
+    Consecutive pin writes received together, even from separate requests, are sent to the board as one pipelined batch.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    ZIF_PINS: int = 42
+
+    _path: str
+    _ic_definition: ICDefinition
+    _board_commands: type[BoardCommandsInterface]
+    _ser: serial.Serial | None
+    _pipeline: PinWritePipeline
+    _server: _DaemonServer
+
+    _board: threading.Condition # Held while using the board, and to wait for a claim to be released
+    _owner: int | None # Connection that claimed the board
+    _powered: bool
+
+    def __init__(self, path: str, ic_definition: ICDefinition, board_commands: type[BoardCommandsInterface], ser: serial.Serial | None = None,
+                 powered: bool = True) -> None:
+        """
+        Args:
+            path (str): path of the Unix socket, a stale one left by a daemon that did not exit cleanly is replaced
+            ic_definition (ICDefinition): IC the board was prepared for
+            board_commands (type[BoardCommandsInterface]): command class of the board
+            ser (serial.Serial | None, optional): opened port of the board. Defaults to None.
+            powered (bool, optional): the IC was already powered up. Defaults to True.
+        """
+        self._path = path
+        self._ic_definition = ic_definition
+        self._board_commands = board_commands
+        self._ser = ser
+        self._pipeline = PinWritePipeline(board_commands, ser)
+
+        self._board = threading.Condition()
+        self._owner = None
+        self._powered = powered
+
+        if os.path.exists(path):
+            if self.is_running(path):
+                raise RuntimeError(f'A daemon is already listening on {path}')
+            self._LOGGER.warning(f'Removing stale socket {path}')
+            os.unlink(path)
+
+        self._server = _DaemonServer(path, _DaemonHandler)
+        self._server.daemon = self
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @staticmethod
+    def is_running(path: str) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(path)
+                return True
+            except OSError:
+                return False
+
+    def serve_forever(self) -> None:
+        self._LOGGER.info(f'Serving {self._ic_definition.name} on {self._path}')
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self._path):
+                os.unlink(self._path)
+
+    def shutdown(self) -> None:
+        """Stop serving, must not be called from the thread running `serve_forever`"""
+        self._server.shutdown()
+
+    def release(self, conn_id: int) -> None:
+        with self._board:
+            if self._owner == conn_id:
+                self._owner = None
+                self._board.notify_all()
+
+    def execute(self, conn_id: int, lines: list[bytes]) -> list[dict[str, Any]]:
+        """Execute a group of requests of a connection, returning their responses in order"""
+        requests: list[dict[str, Any] | None] = []
+        for line in lines:
+            try:
+                request: Any = json.loads(line)
+                requests.append(request if isinstance(request, dict) else None)
+            except ValueError:
+                requests.append(None)
+
+        responses: list[dict[str, Any]] = []
+        idx: int = 0
+        while idx < len(requests):
+            request = requests[idx]
+
+            # Gather the pin writes that follow each other in a single batch
+            batch: list[dict[str, Any]] = []
+            while idx + len(batch) < len(requests):
+                following: dict[str, Any] | None = requests[idx + len(batch)]
+                if following is None or following.get('op') != 'write_pins':
+                    break
+                batch.append(following)
+            if batch:
+                responses.extend(self._write_pins(conn_id, [req.get('values', []) for req in batch]))
+                idx += len(batch)
+                continue
+
+            if request is None:
+                responses.append({'ok': False, 'error': 'Malformed request'})
+            else:
+                try:
+                    responses.append({'ok': True, 'result': self._dispatch(conn_id, request)})
+                except Exception as ex:
+                    self._LOGGER.error(f'Request {request.get("op")} failed: {ex}')
+                    responses.append({'ok': False, 'error': str(ex)})
+            idx += 1
+
+        return responses
+
+    @contextmanager
+    def _access(self, conn_id: int) -> Iterator[None]:
+        with self._board:
+            self._board.wait_for(lambda: self._owner is None or self._owner == conn_id)
+            yield
+
+    def _write_pins(self, conn_id: int, batches: list[list[int]]) -> list[dict[str, Any]]:
+        values: list[int] = [val for batch in batches for val in batch]
+
+        try:
+            with self._access(conn_id):
+                reads: list[int | None] = self._pipeline.write_batch(values)
+        except Exception as ex:
+            self._LOGGER.error(f'Pin write failed: {ex}')
+            return [{'ok': False, 'error': str(ex)}] * len(batches)
+
+        responses: list[dict[str, Any]] = []
+        start: int = 0
+        for batch in batches:
+            responses.append({'ok': True, 'result': reads[start:start + len(batch)]})
+            start += len(batch)
+
+        return responses
+
+    def _dispatch(self, conn_id: int, request: dict[str, Any]) -> Any:
+        match request.get('op'):
+            case 'hello':
+                return {'ic': self._ic_definition.name,
+                        'zif_map': list(self._ic_definition.zif_map),
+                        'adapter_hi_pins': list(self._ic_definition.adapter_hi_pins),
+                        'board': self._board_commands.__name__,
+                        'powered': self._powered,
+                        'pins': [self._board_commands.map_value_to_pins([pin], 1) for pin in range(self.ZIF_PINS + 1)]}
+            case 'read_pins':
+                with self._access(conn_id):
+                    return self._board_commands.read_pins(self._ser)
+            case 'set_power':
+                with self._access(conn_id):
+                    result: bool | None = self._board_commands.set_power(bool(request['state']), self._ser)
+                    self._powered = bool(request['state'])
+                    return result
+            case 'detect_osc_pins':
+                with self._access(conn_id):
+                    return self._board_commands.detect_osc_pins(int(request['reads']), self._ser)
+            case 'claim':
+                with self._access(conn_id):
+                    self._owner = conn_id
+                return True
+            case 'release':
+                self.release(conn_id)
+                return True
+            case 'shutdown':
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return True
+            case op:
+                raise ValueError(f'Unsupported operation {op}')
+
+@final
+class DaemonClient:
+    """
+    Connection to a `BoardDaemon`. It is passed to `DaemonBoardCommands` where a serial port would be,
+    and can be closed like one.
+    """
+
+    _path: str
+    _sock: socket.socket
+    _rfile: Any
+    _lock: threading.Lock
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.connect(path)
+        except OSError as ex:
+            self._sock.close()
+            raise ConnectionError(f'No daemon listening on {path}: {ex}') from ex
+        self._rfile = self._sock.makefile('rb')
+        self._lock = threading.Lock()
+
+    @property
+    def port(self) -> str:
+        return self._path
+
+    @property
+    def closed(self) -> bool:
+        return self._sock.fileno() < 0
+
+    def requests(self, requests: list[dict[str, Any]]) -> list[Any]:
+        """
+        Send several requests at once, then wait for all the answers
+
+        Returns:
+            list[Any]: results of the requests, in order
+        """
+        with self._lock:
+            self._sock.sendall(b''.join(json.dumps(request).encode() + b'\n' for request in requests))
+
+            responses: list[dict[str, Any]] = []
+            for _ in requests:
+                line: bytes = self._rfile.readline()
+                if not line:
+                    raise ConnectionError(f'Daemon on {self._path} closed the connection')
+                responses.append(json.loads(line))
+
+        for response in responses:
+            if not response.get('ok'):
+                raise RuntimeError(f'Daemon error: {response.get("error")}')
+
+        return [response.get('result') for response in responses]
+
+    def request(self, op: str, **args: Any) -> Any:
+        return self.requests([{'op': op, **args}])[0]
+
+    def claim(self) -> None:
+        """Become the only connection served, waiting for any other claim to be released"""
+        self.request('claim')
+
+    def release(self) -> None:
+        self.request('release')
+
+    def shutdown(self) -> None:
+        self.request('shutdown')
+
+    def close(self) -> None:
+        if not self.closed:
+            self._rfile.close()
+            self._sock.close()
@@ -0,0 +1,181 @@
+"""This module contains the instrumentation of board commands and session operations"""
+
+import time
+from typing import Any, Callable, final
+
+@final
+class LatencyHistogram:
+    """
+    Latencies on a logarithmic scale: bucket N counts the samples between 2^(N-1) and 2^N microseconds.
+    Recording a sample costs a handful of integer operations and no allocation.
+    """
+
+    _BUCKETS: int = 40
+
+    count: int
+    items: int # For batches, the number of commands they carried
+    total: float # Seconds
+    min: float
+    max: float
+    buckets: list[int]
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.items = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * self._BUCKETS
+
+    def record(self, elapsed: float, items: int = 1) -> None:
+        self.count = self.count + 1
+        self.items = self.items + items
+        self.total = self.total + elapsed
+        if elapsed < self.min:
+            self.min = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.buckets[min(int(elapsed * 1_000_000).bit_length(), self._BUCKETS - 1)] += 1
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        self.count = self.count + other.count
+        self.items = self.items + other.items
+        self.total = self.total + other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound, in seconds, of the bucket holding the given fraction of the samples"""
+        target: float = fraction * self.count
+        seen: int = 0
+
+        for idx, bucket in enumerate(self.buckets):
+            seen = seen + bucket
+            if bucket and seen >= target:
+                return min((1 << idx) / 1_000_000, self.max)
+
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summary in milliseconds, with the non-empty buckets keyed by their upper bound in microseconds"""
+        if not self.count:
+            return {'count': 0}
+
+        return {
+            'count': self.count,
+            'items': self.items,
+            'total_ms': self.total * 1000,
+            'mean_ms': (self.total / self.count) * 1000,
+            'per_item_ms': (self.total / self.items) * 1000,
+            'min_ms': self.min * 1000,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p90_ms': self.percentile(0.9) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self.max * 1000,
+            'buckets_us': {f'<{1 << idx}': bucket for idx, bucket in enumerate(self.buckets) if bucket}
+        }
+
+@final
+class CommandStats:
+    """
+    Latency histograms of the commands sent to a board, and of the operations performed on an IC (set, clock...).
+    Comparing commands that are cheap for the firmware (e.g. read_pins) with expensive ones (e.g. detect_osc_pins)
+    tells the link latency apart from the firmware time.
+    Not thread safe: boards driven concurrently get their own statistics, merged at the end.
+    """
+
+    commands: dict[str, LatencyHistogram]
+    operations: dict[str, LatencyHistogram]
+
+    def __init__(self) -> None:
+        self.commands = {}
+        self.operations = {}
+
+    def record_command(self, name: str, elapsed: float, items: int = 1) -> None:
+        histogram: LatencyHistogram | None = self.commands.get(name)
+        if histogram is None:
+            histogram = self.commands[name] = LatencyHistogram()
+        histogram.record(elapsed, items)
+
+    def record_operation(self, name: str, elapsed: float) -> None:
+        histogram: LatencyHistogram | None = self.operations.get(name)
+        if histogram is None:
+            histogram = self.operations[name] = LatencyHistogram()
+        histogram.record(elapsed)
+
+    def merge(self, other: 'CommandStats') -> None:
+        """Add the samples of other statistics, e.g. of another board, to these"""
+        for mine, theirs in ((self.commands, other.commands), (self.operations, other.operations)):
+            for name, histogram in theirs.items():
+                mine.setdefault(name, LatencyHistogram()).merge(histogram)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'commands': {name: histogram.to_dict() for name, histogram in sorted(self.commands.items())},
+            'operations': {name: histogram.to_dict() for name, histogram in sorted(self.operations.items())}
+        }
+
+    def format_report(self) -> str:
+        """Human readable table of the statistics"""
+        lines: list[str] = [f'{"":<28}{"count":>8}{"mean ms":>10}{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}{"max ms":>10}']
+
+        for title, histograms in (('Commands', self.commands), ('Operations', self.operations)):
+            lines.append(title)
+            for name, histogram in sorted(histograms.items()):
+                lines.append(f'  {name:<26}{histogram.count:>8}{(histogram.total / histogram.count) * 1000:>10.3f}'
+                             f'{histogram.percentile(0.5) * 1000:>10.3f}{histogram.percentile(0.9) * 1000:>10.3f}'
+                             f'{histogram.percentile(0.99) * 1000:>10.3f}{histogram.max * 1000:>10.3f}')
+
+        return '\n'.join(lines)
+
+@final
+class InstrumentedCommands:
+    """
+    Wraps a board command class to time every command sent to the board.
+    The original class is left untouched, so without instrumentation there is no overhead at all.
+
+    Pipelined pin writes (see `PinWritePipeline`) go through the command class once to capture the command
+    and once to parse the response, neither of which is a round trip: those calls are not timed, the pipeline
+    reports the whole batch as `write_pins_pipelined` instead.
+    """
+
+    _TIMED_COMMANDS: tuple[str, ...] = ('write_pins', 'write_pins_batch', 'read_pins', 'set_power', 'detect_osc_pins')
+
+    @staticmethod
+    def _timed(name: str, command: Callable[..., Any], stats: CommandStats) -> Callable[..., Any]:
+        def timed_command(*args: Any, **kwargs: Any) -> Any:
+            if any(getattr(arg, 'PIPELINE_PROXY', False) for arg in args) or getattr(kwargs.get('ser'), 'PIPELINE_PROXY', False):
+                return command(*args, **kwargs)
+
+            start: float = time.perf_counter()
+            result: Any = command(*args, **kwargs)
+            stats.record_command(name, time.perf_counter() - start, len(args[0]) if name == 'write_pins_batch' else 1)
+            return result
+
+        return timed_command
+
+    @classmethod
+    def wrap(cls, command_class: type, stats: CommandStats) -> type:
+        """
+        Build an instrumented subclass of a board command class
+
+        Args:
+            command_class (type): class to instrument, e.g. the one returned by `BoardCommandClassFactory.get_command_class`
+            stats (CommandStats): where the latencies are recorded
+
+        Returns:
+            type: the instrumented class, to be used in place of the original one
+        """
+        attrs: dict[str, Any] = {'command_stats': stats}
+
+        for name in cls._TIMED_COMMANDS:
+            command: Callable[..., Any] | None = getattr(command_class, name, None)
+            if command is not None:
+                attrs[name] = staticmethod(cls._timed(name, command, stats))
+
+        def record_pipelined(count: int, elapsed: float) -> None:
+            stats.record_command('write_pins_pipelined', elapsed, count)
+        attrs['record_pipelined'] = staticmethod(record_pipelined)
+
+        return type(f'Instrumented[{command_class.__name__}]', (command_class,), attrs)
@@ -0,0 +1,96 @@
+"""This module contains a board command class that forwards the commands to a board daemon"""
+
+import logging
+from typing import Any, Sequence
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+
+from dppeeper.board.board_daemon import DaemonClient
+from dppeeper.ic.ic_definition import ICDefinition
+
+class DaemonBoardCommands(BoardCommandsInterface):
+    """
+    Board shared by a `BoardDaemon`. Use `bind` to obtain a command class for a connection to the daemon,
+    which is then passed to the commands in place of the serial port.
+
+    Pins are mapped on the ZIF socket as the board held by the daemon maps them, and batches of pin writes
+    are sent as a single request, pipelined by the daemon.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    KEEPS_POWER: bool = True # The IC is left powered at exit, for the next client
+
+    ic_name: str
+    powered: bool # The IC was powered when the connection was opened
+
+    _zif_masks: list[int] # Bits of every ZIF pin on the board
+
+    @classmethod
+    def bind(cls, client: DaemonClient, ic_definition: ICDefinition) -> type['DaemonBoardCommands']:
+        """
+        Build a command class for the board of a daemon
+
+        Args:
+            client (DaemonClient): connection to the daemon
+            ic_definition (ICDefinition): IC the client will drive, must be wired in the socket as the one the daemon powers
+
+        Raises:
+            ValueError: the daemon powers an IC with a different pinout or adapter
+
+        Returns:
+            type[DaemonBoardCommands]: the command class to be used in place of a hardware one
+        """
+        hello: dict[str, Any] = client.request('hello')
+        if tuple(hello['zif_map']) != ic_definition.zif_map or tuple(hello['adapter_hi_pins']) != ic_definition.adapter_hi_pins:
+            raise ValueError(f'The daemon powers {hello["ic"]} with a different pinout than {ic_definition.name}')
+        if hello['ic'] != ic_definition.name:
+            cls._LOGGER.warning(f'Daemon board was prepared for {hello["ic"]}, which has the same pinout as {ic_definition.name}')
+
+        cls._LOGGER.info(f'Connected to {hello["board"]} on {client.port}, prepared for {hello["ic"]}')
+
+        return type(f'{cls.__name__}[{hello["board"]}]', (cls,), {
+            'ic_name': hello['ic'],
+            'powered': hello['powered'],
+            '_zif_masks': hello['pins']
+        })
+
+    @classmethod
+    def map_value_to_pins(cls, pins: Sequence[int], value: int) -> int:
+        ret_val: int = 0
+
+        for i, pin in enumerate(pins):
+            if (value >> i) & 0x01:
+                ret_val = ret_val | cls._zif_masks[pin]
+
+        return ret_val
+
+    @classmethod
+    def map_pins_to_value(cls, pins: Sequence[int], value: int) -> int:
+        ret_val: int = 0
+
+        for i, pin in enumerate(pins):
+            if value & cls._zif_masks[pin]:
+                ret_val = ret_val | (1 << i)
+
+        return ret_val
+
+    @staticmethod
+    def set_power(state: bool, ser: DaemonClient | None = None) -> bool | None: # type: ignore[override]
+        return ser.request('set_power', state=state) if ser else None
+
+    @staticmethod
+    def write_pins(pins: int, ser: DaemonClient | None = None) -> int | None: # type: ignore[override]
+        return ser.request('write_pins', values=[pins])[0] if ser else None
+
+    @staticmethod
+    def write_pins_batch(values: list[int], ser: DaemonClient | None = None) -> list[int | None]:
+        return ser.request('write_pins', values=values) if ser else [None] * len(values)
+
+    @staticmethod
+    def read_pins(ser: DaemonClient | None = None) -> int | None: # type: ignore[override]
+        return ser.request('read_pins') if ser else None
+
+    @staticmethod
+    def detect_osc_pins(reads: int, ser: DaemonClient | None = None) -> int | None: # type: ignore[override]
+        return ser.request('detect_osc_pins', reads=reads) if ser else None
@@ -0,0 +1,325 @@
+"""This module contains the code to write and read recorded dumps of an IC"""
+
+import logging
+import mmap
+import os
+import struct
+import time
+from enum import IntEnum
+from typing import BinaryIO, Iterator, NamedTuple, final
+
+class DumpRecordKind(IntEnum):
+    WRITE = 1 # Raw pin write: written value and value read back
+    OSC = 2 # Oscillation scan: mask of oscillating pins
+    RESULT = 3 # Consolidated state after an operation: read, hi-z and oscillating pins
+    POWER = 4 # Power state change: written value is 1 for power on, 0 for power off
+    CLOCK = 5 # Clock pulse: written value is the pin number that was toggled
+
+class DumpRecord(NamedTuple):
+    """
+    A single fixed-width record of a dump. All the values are in IC space (bit 0 is pin 1 of the IC).
+    """
+    kind: DumpRecordKind
+    timestamp: int # Nanoseconds since the epoch
+    written: int
+    read: int = 0
+    hiz: int = 0
+    osc: int = 0
+
+@final
+class DumpFile:
+    """
+    Layout of a dump file: a header followed by fixed-width little-endian records.
+    """
+
+    MAGIC: bytes = b'DPPR'
+    VERSION: int = 1
+
+    # magic, version, size of each record, number of pins of the IC, name of the IC
+    HEADER: struct.Struct = struct.Struct('<4sHHB32s')
+    # kind, timestamp, written, read, hi-z, osc
+    RECORD: struct.Struct = struct.Struct('<BQQQQQ')
+
+    @classmethod
+    def pack_header(cls, ic_name: str, pin_count: int) -> bytes:
+        return cls.HEADER.pack(cls.MAGIC, cls.VERSION, cls.RECORD.size, pin_count, ic_name.encode('utf-8')[:32])
+
+    @classmethod
+    def unpack_header(cls, buffer: bytes | mmap.mmap) -> tuple[str, int]:
+        """
+        Validate the header of a dump
+
+        Args:
+            buffer (bytes | mmap.mmap): buffer containing at least the full header
+
+        Returns:
+            tuple[str, int]: name of the IC and number of its pins
+        """
+        if len(buffer) < cls.HEADER.size:
+            raise ValueError('File too short to be a dump')
+
+        magic: bytes; version: int; rec_size: int; pin_count: int; name: bytes
+        magic, version, rec_size, pin_count, name = cls.HEADER.unpack_from(buffer, 0)
+
+        if magic != cls.MAGIC:
+            raise ValueError('File is not a dump')
+        if version != cls.VERSION or rec_size != cls.RECORD.size:
+            raise ValueError(f'Unsupported dump version {version} (record size {rec_size})')
+
+        return (name.rstrip(b'\x00').decode('utf-8', errors='replace'), pin_count)
+
+@final
+class DumpWriter:
+    """
+    Appends records to a dump file. If the file already exists and has a valid header, new records are appended to it.
+    """
+
+    _file: BinaryIO
+
+    def __init__(self, path: str, ic_name: str, pin_count: int) -> None:
+        """
+        Raises:
+            ValueError: if the file exists but is not a dump, or is the dump of a different IC
+        """
+        resume: bool = os.path.exists(path) and os.path.getsize(path) >= DumpFile.HEADER.size
+
+        self._file = open(path, 'r+b' if resume else 'wb')
+        if resume:
+            try:
+                dump_name, dump_pins = DumpFile.unpack_header(self._file.read(DumpFile.HEADER.size))
+                if (dump_name, dump_pins) != (ic_name.encode('utf-8')[:32].decode('utf-8', errors='replace'), pin_count):
+                    raise ValueError(f'{path} is the dump of {dump_name} ({dump_pins} pins), not of {ic_name} ({pin_count} pins)')
+            except ValueError:
+                self._file.close()
+                raise
+            # Drop any partially written trailing record
+            rec_count: int = (os.path.getsize(path) - DumpFile.HEADER.size) // DumpFile.RECORD.size
+            self._file.truncate(DumpFile.HEADER.size + rec_count * DumpFile.RECORD.size)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file.write(DumpFile.pack_header(ic_name, pin_count))
+
+    def write(self, kind: DumpRecordKind, written: int, read: int = 0, hiz: int = 0, osc: int = 0, timestamp: int | None = None) -> None:
+        self._file.write(DumpFile.RECORD.pack(kind, time.time_ns() if timestamp is None else timestamp, written, read, hiz, osc))
+
+    def write_raw(self, data: bytes) -> None:
+        """Write already packed records"""
+        self._file.write(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def sync(self) -> None:
+        """Flush and make sure that the records written so far reached the disk"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> 'DumpWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+@final
+class DumpIndex:
+    """
+    Open-addressing hash table mapping a written value to the number of the record that best describes it.
+    The table is stored in a sidecar file next to the dump and memory-mapped, so lookups are O(1)
+    and do not require loading the dump in memory.
+    """
+
+    MAGIC: bytes = b'DPPI'
+    VERSION: int = 1
+
+    # magic, version, size of the indexed dump, mtime of the indexed dump, number of slots
+    HEADER: struct.Struct = struct.Struct('<4sHQQQ')
+    # key, record number + 1 (0 marks an empty slot)
+    SLOT: struct.Struct = struct.Struct('<QI')
+
+    _HASH_MUL: int = 0x9E3779B97F4A7C15
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _map: mmap.mmap
+    _slot_bits: int
+    _slot_mask: int
+
+    def __init__(self, index_map: mmap.mmap) -> None:
+        self._map = index_map
+        slots: int = self.HEADER.unpack_from(index_map, 0)[4]
+        self._slot_bits = slots.bit_length() - 1
+        self._slot_mask = slots - 1
+
+    @classmethod
+    def _slot_of(cls, key: int, slot_bits: int) -> int:
+        return ((key * cls._HASH_MUL) & 0xFFFFFFFFFFFFFFFF) >> (64 - slot_bits)
+
+    def lookup(self, key: int) -> int | None:
+        """
+        Find the record associated with a written value
+
+        Args:
+            key (int): value written to the IC
+
+        Returns:
+            int | None: number of the record, or None if the value was never recorded
+        """
+        slot: int = self._slot_of(key, self._slot_bits)
+        while True:
+            s_key: int; s_rec: int
+            s_key, s_rec = self.SLOT.unpack_from(self._map, self.HEADER.size + slot * self.SLOT.size)
+            if s_rec == 0:
+                return None
+            elif s_key == key:
+                return s_rec - 1
+            slot = (slot + 1) & self._slot_mask
+
+    def close(self) -> None:
+        self._map.close()
+
+    @classmethod
+    def _is_valid(cls, index_map: mmap.mmap, dump_stat: os.stat_result) -> bool:
+        if len(index_map) < cls.HEADER.size:
+            return False
+
+        magic: bytes; version: int; dump_size: int; dump_mtime: int; slots: int
+        magic, version, dump_size, dump_mtime, slots = cls.HEADER.unpack_from(index_map, 0)
+        return (magic == cls.MAGIC and version == cls.VERSION and
+                dump_size == dump_stat.st_size and dump_mtime == dump_stat.st_mtime_ns and
+                len(index_map) == cls.HEADER.size + slots * cls.SLOT.size)
+
+    @classmethod
+    def _populate(cls, index_map: mmap.mmap, dump_map: mmap.mmap, rec_count: int, slots: int, dump_stat: os.stat_result) -> None:
+        slot_bits: int = slots.bit_length() - 1
+        slot_mask: int = slots - 1
+
+        for rec_no in range(rec_count):
+            rec_off: int = DumpFile.HEADER.size + rec_no * DumpFile.RECORD.size
+            kind: int = dump_map[rec_off]
+            if kind != DumpRecordKind.WRITE and kind != DumpRecordKind.RESULT:
+                continue
+
+            key: int = DumpFile.RECORD.unpack_from(dump_map, rec_off)[2]
+            slot: int = cls._slot_of(key, slot_bits)
+            while True:
+                s_key: int; s_rec: int
+                s_key, s_rec = cls.SLOT.unpack_from(index_map, cls.HEADER.size + slot * cls.SLOT.size)
+                if s_rec == 0 or s_key == key:
+                    break
+                slot = (slot + 1) & slot_mask
+
+            # A consolidated result is more informative than a raw write, never replace it with one
+            if (s_rec != 0 and kind == DumpRecordKind.WRITE and
+                dump_map[DumpFile.HEADER.size + (s_rec - 1) * DumpFile.RECORD.size] == DumpRecordKind.RESULT):
+                continue
+
+            cls.SLOT.pack_into(index_map, cls.HEADER.size + slot * cls.SLOT.size, key, rec_no + 1)
+
+        cls.HEADER.pack_into(index_map, 0, cls.MAGIC, cls.VERSION, dump_stat.st_size, dump_stat.st_mtime_ns, slots)
+
+    @classmethod
+    def open_for_dump(cls, dump_path: str, dump_map: mmap.mmap, rec_count: int) -> 'DumpIndex':
+        """
+        Open the sidecar index for a dump, (re)building it if missing or stale.
+        If the sidecar cannot be written, the index is built in anonymous memory instead.
+        """
+        index_path: str = dump_path + '.idx'
+        dump_stat: os.stat_result = os.stat(dump_path)
+
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as idx_file:
+                if os.path.getsize(index_path) > 0:
+                    index_map = mmap.mmap(idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+                    if cls._is_valid(index_map, dump_stat):
+                        return cls(index_map)
+                    index_map.close()
+
+        slots: int = 1 << max(4, (rec_count * 2).bit_length()) # Keep the load factor under 50%
+        index_size: int = cls.HEADER.size + slots * cls.SLOT.size
+
+        cls._LOGGER.info(f'Building index for {dump_path} ({rec_count} records)')
+        start: float = time.perf_counter()
+        try:
+            with open(index_path, 'w+b') as idx_file:
+                idx_file.truncate(index_size)
+                index_map = mmap.mmap(idx_file.fileno(), index_size)
+        except OSError as ex:
+            cls._LOGGER.warning(f'Unable to write index {index_path} ({ex}), keeping it in memory')
+            index_map = mmap.mmap(-1, index_size)
+
+        cls._populate(index_map, dump_map, rec_count, slots, dump_stat)
+        index_map.flush()
+        cls._LOGGER.info(f'Index built in {time.perf_counter() - start:.2f}s')
+
+        return cls(index_map)
+
+@final
+class DumpReader:
+    """
+    Read-only, memory-mapped access to a dump file.
+    """
+
+    ic_name: str
+    pin_count: int
+
+    _path: str
+    _file: BinaryIO
+    _map: mmap.mmap
+    _rec_count: int
+    _index: DumpIndex | None
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._index = None
+        self._file = open(path, 'rb')
+
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Empty file
+            self._file.close()
+            raise ValueError(f'File {path} is empty')
+
+        self.ic_name, self.pin_count = DumpFile.unpack_header(self._map)
+        self._rec_count = (len(self._map) - DumpFile.HEADER.size) // DumpFile.RECORD.size
+
+    def __len__(self) -> int:
+        return self._rec_count
+
+    def record(self, rec_no: int) -> DumpRecord:
+        if rec_no < 0 or rec_no >= self._rec_count:
+            raise IndexError(f'Record {rec_no} out of range')
+
+        kind: int; timestamp: int; written: int; read: int; hiz: int; osc: int
+        kind, timestamp, written, read, hiz, osc = DumpFile.RECORD.unpack_from(self._map, DumpFile.HEADER.size + rec_no * DumpFile.RECORD.size)
+        return DumpRecord(DumpRecordKind(kind), timestamp, written, read, hiz, osc)
+
+    def __iter__(self) -> Iterator[DumpRecord]:
+        for rec_no in range(self._rec_count):
+            yield self.record(rec_no)
+
+    def lookup(self, written: int) -> DumpRecord | None:
+        """
+        Find the recorded state for a written value, preferring consolidated results over raw writes.
+        The index is opened (or built) on first use.
+        """
+        if self._index is None:
+            self._index = DumpIndex.open_for_dump(self._path, self._map, self._rec_count)
+
+        rec_no: int | None = self._index.lookup(written)
+        return None if rec_no is None else self.record(rec_no)
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'DumpReader':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
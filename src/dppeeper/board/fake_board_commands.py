@@ -0,0 +1,138 @@
+"""This module contains an in-process fake dupico, driven by a behavioural model of a PLD"""
+
+import logging
+import time
+from typing import NamedTuple
+
+import serial
+
+from dppeeper.board.virtual_board_commands import VirtualBoardCommands
+from dppeeper.board.pld_model import PLDEvaluation, PLDModel
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.pin_mapper import PinMapper
+
+class FakeLatency(NamedTuple):
+    """Emulated timings, in seconds"""
+    link: float = 0.0 # Round trip over the serial link, paid once per transaction
+    command: float = 0.0 # Time spent by the firmware on every command
+    osc_sample: float = 0.0 # Time spent by the firmware on every sample while detecting oscillating pins
+
+class FakeBoardCommands(VirtualBoardCommands):
+    """
+    Fake board. Use `bind` to obtain a command class emulating an IC through a PLDModel,
+    which can be used wherever a class returned by `BoardCommandClassFactory.get_command_class` is.
+
+    Pin writes sent as a batch (see `PinWritePipeline`) pay the link latency only once.
+    Every command is counted in `stats`.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    STAT_ROUND_TRIPS: str = 'round_trips'
+
+    stats: dict[str, int]
+
+    _model: PLDModel
+    _mapper: PinMapper
+    _latency: FakeLatency
+
+    _state: int
+    _last_written: int
+    _last_driven: int
+    _osc_phase: bool
+    _powered: bool
+
+    @classmethod
+    def bind(cls, model: PLDModel, ic_definition: ICDefinition, latency: FakeLatency = FakeLatency()) -> type['FakeBoardCommands']:
+        """
+        Build a command class emulating an IC
+
+        Args:
+            model (PLDModel): behavioural model of the IC
+            ic_definition (ICDefinition): definition of the IC, used to map its pins on the ZIF socket
+            latency (FakeLatency, optional): timings to emulate. Defaults to no latency.
+
+        Returns:
+            type[FakeBoardCommands]: the command class to be used in place of a hardware one
+        """
+        return type(f'{cls.__name__}[{ic_definition.name}]', (cls,), {
+            'stats': {},
+            '_model': model,
+            '_mapper': PinMapper(ic_definition.zif_map, cls),
+            '_latency': latency,
+            '_state': model.power_up_state,
+            '_last_written': 0,
+            '_last_driven': 0,
+            '_osc_phase': False,
+            '_powered': False
+        })
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        cls.stats.clear()
+
+    @classmethod
+    def _transaction(cls, commands: dict[str, int], firmware_time: float = 0.0) -> None:
+        cls.stats[cls.STAT_ROUND_TRIPS] = cls.stats.get(cls.STAT_ROUND_TRIPS, 0) + 1
+        for command, count in commands.items():
+            cls.stats[command] = cls.stats.get(command, 0) + count
+
+        delay: float = cls._latency.link + (cls._latency.command * sum(commands.values())) + firmware_time
+        if delay > 0:
+            time.sleep(delay)
+
+    @classmethod
+    def _write(cls, pins: int) -> int:
+        written: int = cls._mapper.to_ic(pins)
+
+        if not cls._powered:
+            cls._last_written = written
+            cls._last_driven = 0
+            return cls._mapper.to_zif(0)
+
+        evaluation: PLDEvaluation = cls._model.evaluate(written, cls._state, cls._osc_phase)
+        if cls._model.clock_edge(cls._last_written, written):
+            # Registers see their own state as feedback, regardless of the output enables
+            reg_mask: int = cls._model.registered_mask
+            cls._state = cls._model.next_state((evaluation.view & ~reg_mask) | (cls._state & reg_mask))
+            evaluation = cls._model.evaluate(written, cls._state, cls._osc_phase)
+
+        cls._osc_phase = not cls._osc_phase
+        cls._last_written = written
+        cls._last_driven = evaluation.driven
+
+        return cls._mapper.to_zif(evaluation.read)
+
+    @classmethod
+    def set_power(cls, state: bool, ser: serial.Serial | None = None) -> bool | None:
+        cls._transaction({'set_power': 1})
+
+        if state and not cls._powered:
+            cls._state = cls._model.power_up_state
+        cls._powered = state
+
+        return state
+
+    @classmethod
+    def write_pins(cls, pins: int, ser: serial.Serial | None = None) -> int | None:
+        cls._transaction({'write_pins': 1})
+        return cls._write(pins)
+
+    @classmethod
+    def write_pins_batch(cls, values: list[int], ser: serial.Serial | None = None) -> list[int | None]:
+        cls._transaction({'write_pins': len(values)})
+        return [cls._write(val) for val in values]
+
+    @classmethod
+    def read_pins(cls, ser: serial.Serial | None = None) -> int | None:
+        cls._transaction({'read_pins': 1})
+        return cls._mapper.to_zif(cls._model.evaluate(cls._last_written, cls._state, cls._osc_phase).read) if cls._powered else 0
+
+    @classmethod
+    def detect_osc_pins(cls, reads: int, ser: serial.Serial | None = None) -> int | None:
+        cls._transaction({'detect_osc_pins': 1}, cls._latency.osc_sample * reads)
+
+        if not cls._powered or reads < 2:
+            return 0
+
+        return cls._mapper.to_zif(cls._model.oscillating_pins(cls._last_driven))
@@ -0,0 +1,222 @@
+"""This module contains the strategies used to detect which outputs of an IC are Hi-Z"""
+
+import logging
+import random
+from collections import OrderedDict
+from enum import Enum
+from typing import Callable, NamedTuple, final
+
+class HiZStrategy(Enum):
+    PER_PIN = 'pin'
+    GROUP = 'group'
+
+class HiZResult(NamedTuple):
+    read: int # Value read back after setting the pins
+    hiz: int # Mask of the pins found Hi-Z
+    suspected_inputs: list[int] # Candidate pins whose toggling changed other pins, probably inputs
+
+class HiZCachePolicy(NamedTuple):
+    size: int = 0 # Maximum number of cached results, 0 disables the cache
+    verify_rate: float = 0.0 # Fraction of the cache hits that are probed anyway, to detect stale entries
+
+@final
+class HiZDetector:
+    """
+    Hi-Z detection by probing: a candidate pin is Hi-Z if it follows the pull we apply on it.
+    The probes are written through a callable that takes a list of values and returns what is read back after each one,
+    so every round of probes can be sent as a single pipelined batch.
+    """
+
+    @staticmethod
+    def _probe_value(val: int, probe_mask: int) -> int:
+        # Invert the probed pins, leave everything else as we set it
+        return val ^ probe_mask
+
+    @staticmethod
+    def _build_mask(pins: list[int]) -> int:
+        mask: int = 0
+
+        for pin in pins:
+            mask = mask | (1 << (pin - 1))
+
+        return mask
+
+    @classmethod
+    def detect(cls, strategy: HiZStrategy, val: int, check_list: list[int], write_vals: Callable[[list[int]], list[int]], preamble: list[int] = []) -> HiZResult:
+        match strategy:
+            case HiZStrategy.PER_PIN:
+                return cls.detect_per_pin(val, check_list, write_vals, preamble)
+            case HiZStrategy.GROUP:
+                return cls.detect_group(val, check_list, write_vals, preamble)
+            case _:
+                raise ValueError(f'Unsupported Hi-Z strategy {strategy}')
+
+    @classmethod
+    def detect_per_pin(cls, val: int, check_list: list[int], write_vals: Callable[[list[int]], list[int]], preamble: list[int] = []) -> HiZResult:
+        """
+        Invert every candidate pin on its own, restoring the value after each probe.
+        Costs two writes per candidate, all sent in a single batch.
+
+        Args:
+            val (int): value to set, bit 0 corresponds to pin 1 of the IC
+            check_list (list[int]): candidate pins, 1-based
+            write_vals (Callable[[list[int]], list[int]]): writes the values and returns what was read after each one
+            preamble (list[int], optional): values to write before setting the pins. Defaults to [].
+
+        Returns:
+            HiZResult: read value, Hi-Z mask and the pins that should not be considered Hi-Z candidates anymore
+        """
+        hiz_pins: int = 0
+        suspected_inputs: list[int] = []
+
+        # For every pin, write it inverted then restore the value
+        batch: list[int] = preamble + [val]
+        for pin in check_list:
+            batch.append(cls._probe_value(val, 1 << (pin - 1)))
+            batch.append(val)
+
+        results: list[int] = write_vals(batch)
+        ret: int = results[len(preamble)]
+
+        for idx, pin in enumerate(check_list):
+            pin_mask: int = 1 << (pin - 1)
+            changed_pins: int = ret ^ results[len(preamble) + 1 + (idx * 2)]
+
+            if changed_pins == pin_mask: # The only pin that changed is the one we are checking. It's hi-z
+                hiz_pins = hiz_pins | pin_mask
+            elif changed_pins != 0: # One or more pins have changed, but it is not our checked pin, means we might have toggled an input!!!
+                suspected_inputs.append(pin)
+
+        return HiZResult(ret, hiz_pins, suspected_inputs)
+
+    @classmethod
+    def detect_group(cls, val: int, check_list: list[int], write_vals: Callable[[list[int]], list[int]], preamble: list[int] = []) -> HiZResult:
+        """
+        Invert groups of candidate pins together, halving a group when the result is mixed. Only the first half is probed:
+        the pins changed by the second one are the ones changed by the whole group and not by the first half.
+        If none of the pins of a group changes they are all driven. A group whose pins all followed the pull may still hide
+        a Hi-Z input feeding the other candidates, so its pins are confirmed one by one, as are the single pins found by difference.
+        Every round of probes is sent as a single batch: a single Hi-Z pin is isolated with one probe per halving.
+
+        Args and return value are the same as `detect_per_pin`.
+        """
+        hiz_pins: int = 0
+        suspected_inputs: set[int] = set()
+
+        # Groups to probe, each with the other half of its parent group and the pins changed by the parent
+        probes: list[tuple[list[int], list[int], int]] = [(list(check_list), [], 0)] if check_list else []
+        ret: int | None = None
+
+        while probes or ret is None:
+            batch: list[int] = (preamble + [val]) if ret is None else []
+            for group, _, _ in probes:
+                batch.append(cls._probe_value(val, cls._build_mask(group)))
+                batch.append(val)
+
+            results: list[int] = write_vals(batch)
+            if ret is None:
+                ret = results[len(preamble)]
+                results = results[len(preamble) + 1:]
+
+            outcomes: list[tuple[list[int], int, bool]] = [] # Group, pins changed by it, whether it was probed directly
+            for idx, (group, sibling, parent_changed) in enumerate(probes):
+                changed_pins: int = ret ^ results[idx * 2]
+                outcomes.append((group, changed_pins, True))
+                if sibling:
+                    outcomes.append((sibling, parent_changed ^ changed_pins, False))
+
+            probes = []
+            for group, changed_pins, probed in outcomes:
+                group_mask: int = cls._build_mask(group)
+
+                if changed_pins == 0: # All driven
+                    continue
+                elif len(group) == 1 and not probed: # Found by difference, confirm it
+                    probes.append((group, [], 0))
+                elif len(group) == 1 and changed_pins == group_mask: # The only pin that changed is the one we are checking. It's hi-z
+                    hiz_pins = hiz_pins | group_mask
+                elif len(group) == 1: # Something else changed: the pin is acting as an input
+                    suspected_inputs.add(group[0])
+                elif changed_pins == group_mask: # Every pin followed us, unless one of them drives the others
+                    probes.extend(([pin], [], 0) for pin in group)
+                else: # Mixed or suspicious group, split it
+                    half: int = len(group) // 2
+                    probes.append((group[:half], group[half:], changed_pins))
+
+        return HiZResult(ret, hiz_pins, [pin for pin in check_list if pin in suspected_inputs])
+
+@final
+class HiZCache:
+    """
+    Results of the Hi-Z detection, keyed by the value of the pins that can drive the output enables
+    (every pin that can be an input or feed back into the array), with least recently used eviction.
+    Output enables may also depend on the registers, so the cache must be invalidated whenever they can change,
+    i.e. after clocks and power cycles.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    policy: HiZCachePolicy
+
+    _key_mask: int
+    _entries: OrderedDict[int, int]
+    _random: random.Random
+
+    hits: int
+    misses: int
+
+    def __init__(self, policy: HiZCachePolicy, key_mask: int, rng: random.Random | None = None) -> None:
+        """
+        Args:
+            policy (HiZCachePolicy): size of the cache and verification rate
+            key_mask (int): pins that can affect the Hi-Z state, bit 0 corresponds to pin 1 of the IC
+            rng (random.Random | None, optional): source for picking the hits to verify. Defaults to a new generator.
+        """
+        if policy.size < 1:
+            raise ValueError('The Hi-Z cache needs room for at least one entry')
+
+        self.policy = policy
+        self._key_mask = key_mask
+        self._entries = OrderedDict()
+        self._random = rng if rng else random.Random()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+    def lookup(self, val: int) -> int | None:
+        """
+        Hi-Z mask cached for the value, None on a miss or when the hit was picked for verification
+        """
+        key: int = val & self._key_mask
+        hiz: int | None = self._entries.get(key)
+
+        if hiz is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if self.policy.verify_rate > 0 and self._random.random() < self.policy.verify_rate:
+            return None
+
+        self.hits += 1
+        return hiz
+
+    def store(self, val: int, hiz: int) -> None:
+        key: int = val & self._key_mask
+        cached: int | None = self._entries.get(key)
+
+        if cached is not None and cached != hiz:
+            # The IC behaves differently than what was cached, something not in the key changed: trust nothing
+            self._LOGGER.warning(f'Stale Hi-Z cache entry for {val:0{16}X}, clearing the cache')
+            self._entries.clear()
+
+        self._entries[key] = hiz
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.policy.size:
+            self._entries.popitem(last=False)
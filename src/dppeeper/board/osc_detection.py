@@ -0,0 +1,74 @@
+"""This module contains the policies used to detect which outputs of an IC are oscillating"""
+
+from enum import Enum
+from typing import Callable, NamedTuple, final
+
+MIN_SAMPLES: int = 2
+MAX_SAMPLES: int = 255 # The board takes the number of reads as a single byte
+
+class OscStrategy(Enum):
+    FIXED = 'fixed'
+    ADAPTIVE = 'adaptive'
+
+class OscPolicy(NamedTuple):
+    strategy: OscStrategy = OscStrategy.FIXED
+    samples: int = 255 # Reads of a full scan
+    probe_samples: int = 16 # Reads of the short probe of the adaptive strategy
+    skip_unchanged: bool = False # Reuse the last result if the pins were written and read the same as the last scan
+    deferred: bool = False # Let the UI show the pin levels before the scan, which runs as a background refresh
+
+@final
+class OscDetector:
+    """
+    Decides how many samples the board takes to find the oscillating pins, and whether a scan is needed at all.
+    The scans are run through a callable that takes the number of reads and returns the mask of oscillating pins.
+
+    With the adaptive strategy a short probe is run first, and a full scan follows only if some pin flickered during it:
+    a quiet probe is taken as no oscillation, so pins flipping slower than the probe can go unnoticed.
+    When skipping unchanged states, a scan is not repeated if the same value was written, the same value was read back
+    and nothing was oscillating the last time. Clocks and power cycles change the internal state: call `invalidate` after them.
+    """
+
+    policy: OscPolicy
+
+    _last_key: tuple[int, int] | None # Written and read values of the last scan that found nothing oscillating
+
+    def __init__(self, policy: OscPolicy = OscPolicy()) -> None:
+        if not all(MIN_SAMPLES <= samples <= MAX_SAMPLES for samples in (policy.samples, policy.probe_samples)):
+            raise ValueError(f'Oscillation detection takes between {MIN_SAMPLES} and {MAX_SAMPLES} samples')
+
+        self.policy = policy
+        self._last_key = None
+
+    def invalidate(self) -> None:
+        self._last_key = None
+
+    def can_skip(self, written: int | None, read: int | None) -> bool:
+        """True if a scan for this state would certainly repeat the last result"""
+        return self.policy.skip_unchanged and written is not None and self._last_key == (written, read)
+
+    def detect(self, scan: Callable[[int], int], written: int | None = None, read: int | None = None) -> int:
+        """
+        Find the oscillating pins
+
+        Args:
+            scan (Callable[[int], int]): takes the number of reads, returns the mask of pins that changed while reading
+            written (int | None, optional): value written to the pins, enables skipping unchanged states. Defaults to None.
+            read (int | None, optional): value read back after writing. Defaults to None.
+
+        Returns:
+            int: mask of oscillating pins
+        """
+        if self.can_skip(written, read):
+            return 0
+
+        osc: int
+        if self.policy.strategy == OscStrategy.ADAPTIVE and self.policy.probe_samples < self.policy.samples:
+            osc = scan(self.policy.probe_samples)
+            if osc:
+                osc = osc | scan(self.policy.samples) # Something flickers: a full scan catches the slower pins too
+        else:
+            osc = scan(self.policy.samples)
+
+        self._last_key = (written, read) if osc == 0 and written is not None and read is not None else None
+        return osc
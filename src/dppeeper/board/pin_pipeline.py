@@ -0,0 +1,184 @@
+"""This module contains a transaction layer that pipelines pin writes over the serial link"""
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any, final
+
+import serial
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+
+if TYPE_CHECKING:
+    from dppeeper.board.board_daemon import DaemonClient
+
+class _CommandCaptured(Exception):
+    pass
+
+class _CaptureSerial:
+    """
+    Stands in for the serial port to capture the bytes of a command without sending them.
+    The command class is interrupted as soon as it tries to read the response.
+    """
+
+    PIPELINE_PROXY: bool = True # Tells instrumentation that no round trip happens through this port
+
+    data: bytearray
+    read_attempted: bool
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.read_attempted = False
+
+    def write(self, data: bytes) -> int:
+        self.data.extend(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        pass
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        # Any other access (read, readline, in_waiting...) means the command was sent and we are waiting for the answer
+        self.read_attempted = True
+        raise _CommandCaptured()
+
+class _ReplaySerial:
+    """
+    Stands in for the serial port while parsing responses to commands that were already sent:
+    writes are dropped, reads go to the real port.
+    """
+
+    PIPELINE_PROXY: bool = True
+
+    _ser: serial.Serial
+
+    def __init__(self, ser: serial.Serial) -> None:
+        self._ser = ser
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        pass # The input buffer holds the responses to the commands still in flight
+
+    def reset_output_buffer(self) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ser, name)
+
+@final
+class PinWritePipeline:
+    """
+    Sends a batch of pin writes back-to-back and collects the responses in order, so a batch costs
+    roughly one link latency instead of one per write.
+
+    Command classes that know how to batch writes themselves (e.g. simulated boards, the board daemon) provide a
+    `write_pins_batch(values, ser)` method, which is used instead.
+
+    The dupicolib command classes have no batch API: their commands are captured by calling `write_pins` on a stand-in
+    for the port, then their responses parsed by calling it again on a port that drops the writes. This relies on how
+    dupicolib drives the port, checked once per command class by `supports_capture` (see the dupicolib versions pinned
+    in the requirements). Classes that fail the check get sequential writes, and an error is logged.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    DEFAULT_MAX_IN_FLIGHT: int = 16
+
+    _capture_support: dict[type[BoardCommandsInterface], bool] = {}
+
+    _board_commands: type[BoardCommandsInterface]
+    _ser: 'serial.Serial | DaemonClient | None'
+    _max_in_flight: int
+
+    def __init__(self, board_commands: type[BoardCommandsInterface], ser: 'serial.Serial | DaemonClient | None' = None, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
+        self._board_commands = board_commands
+        self._ser = ser
+        self._max_in_flight = max(1, max_in_flight)
+
+    @staticmethod
+    def _capture(board_commands: type[BoardCommandsInterface], value: int) -> bytes | None:
+        """Bytes sent by the command writing a value, None if the command did not wait for a response after sending them"""
+        cap_ser: _CaptureSerial = _CaptureSerial()
+        try:
+            board_commands.write_pins(value, cap_ser) # type: ignore[arg-type]
+        except _CommandCaptured:
+            pass
+
+        return bytes(cap_ser.data) if cap_ser.data and cap_ser.read_attempted else None
+
+    @classmethod
+    def supports_capture(cls, board_commands: type[BoardCommandsInterface]) -> bool:
+        """
+        Check that the pin writes of a command class can be pipelined: a command must be sent in full before its response
+        is read, and carry the value written.
+        """
+        supported: bool | None = cls._capture_support.get(board_commands)
+        if supported is None:
+            low: bytes | None = cls._capture(board_commands, 0)
+            high: bytes | None = cls._capture(board_commands, 0xFFFFFFFFFF)
+            supported = low is not None and high is not None and low != high
+            cls._capture_support[board_commands] = supported
+
+            if not supported:
+                cls._LOGGER.error(f'Pin writes of {board_commands.__name__} cannot be captured with this version of dupicolib, they will not be pipelined')
+
+        return supported
+
+    def _capture_command(self, value: int) -> bytes:
+        return self._capture(self._board_commands, value) or b''
+
+    def write_batch(self, values: list[int]) -> list[int | None]:
+        """
+        Write a list of values to the pins, in order
+
+        Args:
+            values (list[int]): values to write, already mapped to the board pins
+
+        Returns:
+            list[int | None]: values read back after each write, None where the read failed
+        """
+        if not values:
+            return []
+
+        batch_write = getattr(self._board_commands, 'write_pins_batch', None)
+        if batch_write is not None:
+            return batch_write(values, self._ser)
+
+        if (len(values) == 1 or self._max_in_flight == 1 or not isinstance(self._ser, serial.Serial) or
+            not self.supports_capture(self._board_commands)):
+            return [self._board_commands.write_pins(val, self._ser) for val in values]
+
+        commands: list[bytes] = [self._capture_command(val) for val in values]
+
+        # Keep a window of commands in flight: every time a response is parsed, the next command is sent
+        start: float = time.perf_counter()
+        replay_ser: _ReplaySerial = _ReplaySerial(self._ser)
+        in_flight: int = min(self._max_in_flight, len(commands))
+        self._ser.write(b''.join(commands[:in_flight]))
+        self._ser.flush()
+
+        results: list[int | None] = []
+        for idx, val in enumerate(values):
+            results.append(self._board_commands.write_pins(val, replay_ser)) # type: ignore[arg-type]
+
+            next_cmd: int = idx + in_flight
+            if next_cmd < len(commands):
+                self._ser.write(commands[next_cmd])
+                self._ser.flush()
+
+        # Instrumented command classes (see `InstrumentedCommands`) time the batch as a whole
+        record_pipelined = getattr(self._board_commands, 'record_pipelined', None)
+        if record_pipelined is not None:
+            record_pipelined(len(values), time.perf_counter() - start)
+
+        return results
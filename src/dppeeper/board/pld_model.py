@@ -0,0 +1,159 @@
+"""This module contains a behavioural model of a PLD, used to emulate an IC without hardware"""
+
+from typing import Callable, NamedTuple, Sequence, final
+
+from dppeeper.ic.ic_definition import ICDefinition
+
+PinFunction = Callable[[int], bool]
+
+class PLDEvaluation(NamedTuple):
+    read: int # Value seen on the pins, bit 0 is pin 1 of the IC
+    driven: int # Mask of the pins currently driven by the IC
+    view: int # Pin values as seen by the logic of the IC
+
+@final
+class PLDModel:
+    """
+    Behavioural model of a PLD.
+
+    Every function receives the pin values as seen by the logic of the IC (bit 0 is pin 1):
+    inputs and undriven I/O pins carry the written value, driven registered outputs carry the register state.
+    - outputs: combinational output functions, per pin
+    - registered: next value of registered outputs, latched on the rising edge of any of the clock pins
+    - enables: output enable functions, the pin is Hi-Z when it returns False. Outputs without an entry are always enabled
+    - oscillating: outputs that toggle on every read while enabled
+    """
+
+    outputs: dict[int, PinFunction]
+    registered: dict[int, PinFunction]
+    enables: dict[int, PinFunction]
+    clk_pins: list[int]
+    oscillating: list[int]
+    power_up_state: int
+
+    _output_mask: int
+    _registered_mask: int
+    _clk_mask: int
+    _osc_mask: int
+
+    def __init__(self,
+                 outputs: dict[int, PinFunction] = {},
+                 registered: dict[int, PinFunction] = {},
+                 enables: dict[int, PinFunction] = {},
+                 clk_pins: Sequence[int] = (),
+                 oscillating: Sequence[int] = (),
+                 power_up_state: int = 0) -> None:
+        if set(outputs) & set(registered):
+            raise ValueError(f'Pins {sorted(set(outputs) & set(registered))} are both combinational and registered')
+
+        self.outputs = dict(outputs)
+        self.registered = dict(registered)
+        self.enables = dict(enables)
+        self.clk_pins = list(clk_pins)
+        self.oscillating = list(oscillating)
+        self.power_up_state = power_up_state
+
+        self._output_mask = self._build_mask(list(outputs) + list(registered))
+        self._registered_mask = self._build_mask(list(registered))
+        self._clk_mask = self._build_mask(clk_pins)
+        self._osc_mask = self._build_mask(oscillating)
+
+    @staticmethod
+    def _build_mask(pins: Sequence[int]) -> int:
+        mask: int = 0
+
+        for pin in pins:
+            mask = mask | (1 << (pin - 1))
+
+        return mask
+
+    @staticmethod
+    def pin(view: int, pin: int) -> bool:
+        """Value of a pin (1-based) in a view"""
+        return ((view >> (pin - 1)) & 0x01) == 1
+
+    @property
+    def registered_mask(self) -> int:
+        return self._registered_mask
+
+    def evaluate(self, written: int, state: int, osc_phase: bool = False) -> PLDEvaluation:
+        """
+        Evaluate the pins of the IC
+
+        Args:
+            written (int): value written on the pins
+            state (int): current value of the registers, bit 0 is pin 1
+            osc_phase (bool, optional): current phase of the oscillating pins. Defaults to False.
+
+        Returns:
+            PLDEvaluation: what is read on the pins, which pins are driven and the view of the logic
+        """
+        reg_state: int = state & self._registered_mask
+
+        # Output enables may depend on registered feedback, assume registers are driving to evaluate them
+        view: int = (written & ~self._registered_mask) | reg_state
+
+        driven: int = self._output_mask
+        for pin, enable in self.enables.items():
+            if not enable(view):
+                driven = driven & ~(1 << (pin - 1))
+
+        view = (written & ~driven) | (reg_state & driven)
+
+        out_val: int = reg_state
+        for pin, func in self.outputs.items():
+            if func(view):
+                out_val = out_val | (1 << (pin - 1))
+
+        if osc_phase:
+            out_val = out_val ^ self._osc_mask
+
+        return PLDEvaluation((written & ~driven) | (out_val & driven), driven, view)
+
+    def clock_edge(self, prev_written: int, written: int) -> bool:
+        """True if the write produces a rising edge on a clock pin"""
+        return ((~prev_written & written) & self._clk_mask) != 0
+
+    def next_state(self, view: int) -> int:
+        state: int = 0
+
+        for pin, func in self.registered.items():
+            if func(view):
+                state = state | (1 << (pin - 1))
+
+        return state
+
+    def oscillating_pins(self, driven: int) -> int:
+        return self._osc_mask & driven
+
+    @classmethod
+    def from_definition(cls, ic_definition: ICDefinition) -> 'PLDModel':
+        """
+        Build a deterministic model exercising the features of a definition:
+        registered outputs count up on every clock, combinational outputs are parities of the inputs,
+        outputs capable of Hi-Z are enabled by the OE pins (or, without OE pins, every other one by the first input).
+        """
+        q_pins: list[int] = sorted(ic_definition.q_pins)
+        in_pins: list[int] = [pin for pin in ic_definition.in_pins if pin not in ic_definition.clk_pins]
+        comb_pins: list[int] = sorted(set(ic_definition.o_pins + ic_definition.io_pins) - set(q_pins))
+
+        registered: dict[int, PinFunction] = {}
+        for idx, pin in enumerate(q_pins):
+            lower_mask: int = cls._build_mask(q_pins[:idx])
+            registered[pin] = (lambda p, m: lambda view: cls.pin(view, p) != ((view & m) == m))(pin, lower_mask)
+
+        outputs: dict[int, PinFunction] = {}
+        for idx, pin in enumerate(comb_pins):
+            in_mask: int = cls._build_mask(in_pins[idx % max(1, len(in_pins)):][:3])
+            outputs[pin] = (lambda m: lambda view: (view & m).bit_count() % 2 == 1)(in_mask)
+
+        enables: dict[int, PinFunction] = {}
+        for idx, pin in enumerate(sorted(ic_definition.hiz_o_pins)):
+            if ic_definition.oe_l_pins and pin in q_pins:
+                enables[pin] = (lambda oe: lambda view: not cls.pin(view, oe))(ic_definition.oe_l_pins[0])
+            elif ic_definition.oe_h_pins and pin in q_pins:
+                enables[pin] = (lambda oe: lambda view: cls.pin(view, oe))(ic_definition.oe_h_pins[0])
+            elif in_pins and idx % 2 == 1:
+                enables[pin] = (lambda en: lambda view: not cls.pin(view, en))(in_pins[0])
+
+        return cls(outputs=outputs, registered=registered, enables=enables, clk_pins=ic_definition.clk_pins)
@@ -0,0 +1,85 @@
+"""This module contains the recorder that logs board transactions to a dump file"""
+
+import logging
+import queue
+import threading
+import time
+from typing import final
+
+from dppeeper.board.dump_file import DumpFile, DumpRecordKind, DumpWriter
+
+@final
+class SessionRecorder:
+    """
+    Streams every transaction with the board to a dump file.
+    Records are packed on the caller thread and handed to a background writer, so the caller never waits for the disk.
+    The resulting file is a valid input for the `sim` subcommand.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _FLUSH_INTERVAL: float = 1.0 # Seconds between flushes to disk while records keep coming
+
+    _writer: DumpWriter
+    _queue: queue.SimpleQueue[bytes | None]
+    _thread: threading.Thread
+    _closed: bool
+
+    def __init__(self, path: str, ic_name: str, pin_count: int) -> None:
+        self._writer = DumpWriter(path, ic_name, pin_count)
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._writer_loop, name='SessionRecorder', daemon=True)
+        self._thread.start()
+
+    def record(self, kind: DumpRecordKind, written: int, read: int = 0, hiz: int = 0, osc: int = 0) -> None:
+        if not self._closed:
+            self._queue.put(DumpFile.RECORD.pack(kind, time.time_ns(), written, read, hiz, osc))
+
+    def _writer_loop(self) -> None:
+        last_flush: float = time.monotonic()
+
+        while True:
+            try:
+                data: bytes | None = self._queue.get(timeout=self._FLUSH_INTERVAL)
+            except queue.Empty:
+                self._writer.flush()
+                last_flush = time.monotonic()
+                continue
+
+            # Drain whatever else is pending, so we write in as few calls as possible
+            chunks: list[bytes] = []
+            while data is not None:
+                chunks.append(data)
+                try:
+                    data = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if chunks:
+                self._writer.write_raw(b''.join(chunks))
+
+            if data is None: # Close requested
+                self._writer.close()
+                return
+
+            if time.monotonic() - last_flush >= self._FLUSH_INTERVAL:
+                self._writer.flush()
+                last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """Write all the pending records and close the file"""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._LOGGER.debug('Session recording closed')
+
+    def __enter__(self) -> 'SessionRecorder':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
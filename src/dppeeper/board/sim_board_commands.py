@@ -0,0 +1,104 @@
+"""This module contains a board command class that answers from a recorded dump instead of a dupico"""
+
+import logging
+
+import serial
+
+from dppeeper.board.virtual_board_commands import VirtualBoardCommands
+from dppeeper.board.dump_file import DumpReader, DumpRecord, DumpRecordKind
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.pin_mapper import PinMapper
+
+class SimBoardCommands(VirtualBoardCommands):
+    """
+    Simulated board. Use `bind` to obtain a command class answering from a specific dump.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _dump: DumpReader
+    _mapper: PinMapper
+    _hiz_candidates: int # IC-space mask of the pins that can go Hi-Z and just follow the written value
+
+    _last_hit: DumpRecord | None
+    _last_written: int
+    _powered: bool
+
+    @classmethod
+    def bind(cls, dump: DumpReader, ic_definition: ICDefinition) -> type['SimBoardCommands']:
+        """
+        Build a command class that answers from the given dump
+
+        Args:
+            dump (DumpReader): opened dump recorded from an IC
+            ic_definition (ICDefinition): definition of the IC the dump was recorded from
+
+        Returns:
+            type[SimBoardCommands]: the command class to be used in place of a hardware one
+        """
+        if dump.pin_count != len(ic_definition.zif_map):
+            raise ValueError(f'Dump has {dump.pin_count} pins, definition {ic_definition.name} has {len(ic_definition.zif_map)}')
+
+        if dump.ic_name != ic_definition.name:
+            cls._LOGGER.warning(f'Dump was recorded for {dump.ic_name}, but definition is for {ic_definition.name}')
+
+        hiz_candidates: int = ic_definition.hiz_o_mask
+
+        return type(f'{cls.__name__}[{dump.ic_name}]', (cls,), {
+            '_dump': dump,
+            '_mapper': PinMapper(ic_definition.zif_map, cls),
+            '_hiz_candidates': hiz_candidates,
+            '_last_hit': None,
+            '_last_written': 0,
+            '_powered': False
+        })
+
+    @classmethod
+    def _resolve(cls, written: int) -> DumpRecord | None:
+        record: DumpRecord | None = cls._dump.lookup(written)
+
+        if record is not None:
+            cls._last_hit = record
+            return record
+
+        # The Hi-Z probes invert pins of the last state we read. If the only differing pins were Hi-Z in that state,
+        # the IC does not see the difference and those pins just follow what we are writing.
+        last: DumpRecord | None = cls._last_hit
+        if last is not None and ((written ^ last.written) & ~(last.hiz & cls._hiz_candidates)) == 0:
+            return last._replace(read=(last.read & ~last.hiz) | (written & last.hiz))
+
+        return None
+
+    @classmethod
+    def set_power(cls, state: bool, ser: serial.Serial | None = None) -> bool | None:
+        cls._powered = state
+        return state
+
+    @classmethod
+    def write_pins(cls, pins: int, ser: serial.Serial | None = None) -> int | None:
+        written: int = cls._mapper.to_ic(pins)
+        cls._last_written = written
+
+        if not cls._powered:
+            return cls._mapper.to_zif(0)
+
+        record: DumpRecord | None = cls._resolve(written)
+        if record is None:
+            # Nothing recorded for this vector: behave like an empty socket, where every pin follows our pulls
+            cls._LOGGER.debug(f'No recorded data for {written:0{16}X}')
+            return cls._mapper.to_zif(written)
+
+        return cls._mapper.to_zif(record.read)
+
+    @classmethod
+    def read_pins(cls, ser: serial.Serial | None = None) -> int | None:
+        return cls.write_pins(cls._mapper.to_zif(cls._last_written), ser)
+
+    @classmethod
+    def detect_osc_pins(cls, reads: int, ser: serial.Serial | None = None) -> int | None:
+        record: DumpRecord | None = cls._resolve(cls._last_written) if cls._powered else None
+
+        if record is None or record.kind != DumpRecordKind.RESULT:
+            return 0
+
+        return cls._mapper.to_zif(record.osc)
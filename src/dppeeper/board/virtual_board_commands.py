@@ -0,0 +1,43 @@
+"""This module contains the base for board command classes that do not talk to a real dupico"""
+
+from typing import Sequence
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+
+class VirtualBoardCommands(BoardCommandsInterface):
+    """
+    Base for boards emulated in software.
+
+    Values on the emulated ZIF socket follow the pin numbering of the dupico: pins 1 to 20 map to bits 0 to 19,
+    pins 22 to 41 map to bits 20 to 39. GND (21), power (42) and NC (0) are not mapped.
+    """
+
+    @staticmethod
+    def _zif_pin_to_bit(pin: int) -> int | None:
+        if 1 <= pin <= 20:
+            return pin - 1
+        elif 22 <= pin <= 41:
+            return pin - 2
+        return None
+
+    @classmethod
+    def map_value_to_pins(cls, pins: Sequence[int], value: int) -> int:
+        ret_val: int = 0
+
+        for i, pin in enumerate(pins):
+            bit: int | None = cls._zif_pin_to_bit(pin)
+            if bit is not None and (value >> i) & 0x01:
+                ret_val = ret_val | (1 << bit)
+
+        return ret_val
+
+    @classmethod
+    def map_pins_to_value(cls, pins: Sequence[int], value: int) -> int:
+        ret_val: int = 0
+
+        for i, pin in enumerate(pins):
+            bit: int | None = cls._zif_pin_to_bit(pin)
+            if bit is not None and (value >> bit) & 0x01:
+                ret_val = ret_val | (1 << i)
+
+        return ret_val
@@ -1,30 +1,34 @@
 """Frontend module"""
 
 import argparse
+import os
 import time
 import traceback
 import logging
 
-from importlib.resources import files
-from tkinter import Tk, PhotoImage
-
 from enum import Enum
+from typing import TYPE_CHECKING
 
-import serial
+import dppeeper
+from dppeeper import __name__
 
-from dupicolib.board_commands_interface import BoardCommandsInterface
-from dupicolib.hardware_board_commands import HardwareBoardCommands
-from dupicolib.board_command_class_factory import BoardCommandClassFactory
-from dupicolib.board_utilities import BoardUtilities
-from dupicolib.board_fw_version import FwVersionTools, FWVersionDict
+from dppeeper.board.hiz_detection import HiZCachePolicy, HiZStrategy
+from dppeeper.board.osc_detection import MAX_SAMPLES, MIN_SAMPLES, OscPolicy, OscStrategy
 
-from dppeeper import __name__, __version__
+# Everything else is imported by the subcommands that need it, so that e.g. the headless ones never load Tk
+# and the ones that do not talk to a board never load pyserial or dupicolib
+if TYPE_CHECKING:
+    import serial
 
-from dppeeper.peeper_utilities import PeeperUtilities
-from dppeeper.ic.ic_definition import ICDefinition
-from dppeeper.ic.ic_loader import ICLoader
+    from dupicolib.board_commands_interface import BoardCommandsInterface
+    from dupicolib.hardware_board_commands import HardwareBoardCommands
 
-from dppeeper.ui.main_window import MainWin
+    from dppeeper.ic.ic_definition import ICDefinition
+    from dppeeper.board.command_stats import CommandStats
+    from dppeeper.board.session_recorder import SessionRecorder
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.batch.multi_board import BoardSpec
+    from dppeeper.board.board_daemon import DaemonClient
 
 MIN_SUPPORTED_MODEL: int = 3
 
@@ -33,6 +37,28 @@ _LOGGER: logging.Logger = logging.getLogger(__name__)
 class Subcommands(Enum):
     SIM = 'sim'
     DUPICO = 'dupico'
+    SWEEP = 'sweep'
+    EXPLORE = 'explore'
+    RUN = 'run'
+    REPLAY = 'replay'
+    ANALYZE = 'analyze'
+    DAEMON = 'daemon'
+
+class _VersionAction(argparse.Action):
+    """Same as the 'version' action, but the version is looked up only if requested"""
+
+    def __init__(self, option_strings: list[str], dest: str = argparse.SUPPRESS, default: str = argparse.SUPPRESS,
+                 help: str = "show program's version number and exit") -> None:
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser: argparse.ArgumentParser, *args) -> None:
+        parser.exit(message=f'{parser.prog} {dppeeper.__version__}\n')
+
+def _osc_samples(value: str) -> int:
+    samples: int = int(value)
+    if not MIN_SAMPLES <= samples <= MAX_SAMPLES:
+        raise argparse.ArgumentTypeError(f'must be between {MIN_SAMPLES} and {MAX_SAMPLES}')
+    return samples
 
 def _build_argsparser() -> argparse.ArgumentParser:
     parser: argparse.ArgumentParser = argparse.ArgumentParser(
@@ -41,18 +67,49 @@ def _build_argsparser() -> argparse.ArgumentParser:
     )
    
     parser.add_argument('-v', '--verbose', action='count', default=0)
-    parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+    parser.add_argument('--version', action=_VersionAction)
 
     parser.add_argument('-d', '--definition',
                              metavar='definition file',
-                             help='Path to the file containing the definition of the IC to be read',
+                             help='Path to the file containing the definition of the IC to be read, or name of the IC in the definition library',
                              required=True)
+
+    parser.add_argument('-L', '--library',
+                             metavar='library directory',
+                             default=os.environ.get('DPPEEPER_LIBRARY'),
+                             help='Directory containing the definition library, defaults to the DPPEEPER_LIBRARY environment variable')
     
     parser.add_argument('--skip_note',
                              action='store_true',
                              default=False,
                              help='If present, skip printing adapter notes and associated delays')
 
+    parser.add_argument('--record',
+                             metavar='record file',
+                             default=None,
+                             help='Record every transaction with the board to this file, usable later with the sim subcommand')
+
+    parser.add_argument('--stats',
+                             metavar='stats file',
+                             nargs='?',
+                             const='-',
+                             default=None,
+                             help='Measure the latency of board commands and operations, and print a report at exit or save it to this file as JSON')
+
+    parser.add_argument('--daemon',
+                             metavar='socket path',
+                             default=os.environ.get('DPPEEPER_DAEMON'),
+                             help='Use the board held by the daemon listening on this Unix socket instead of opening a port, '
+                                  'or where the daemon subcommand listens. Defaults to the DPPEEPER_DAEMON environment variable')
+
+    parser.add_argument('--live',
+                             metavar='rate',
+                             nargs='?',
+                             type=float,
+                             const=10.0,
+                             default=None,
+                             help='In the UI, start in live mode, reading the pins this many times per second (10 if omitted) and slowing down when the link is busy')
+
     hiz_group = parser.add_argument_group()
     hiz_group.add_argument('--check_hiz',
                              action='store_true',
@@ -64,6 +121,46 @@ def _build_argsparser() -> argparse.ArgumentParser:
                         type=int,
                         default=[],
                         help='List of output pins for which the Hi-Z check is skipped')
+    hiz_group.add_argument('--hiz_strategy',
+                        choices=[strategy.value for strategy in HiZStrategy],
+                        default=HiZStrategy.PER_PIN.value,
+                        help='Probe candidate pins one at a time (pin), or in groups that are split only when ambiguous (group)')
+    hiz_group.add_argument('--hiz_cache',
+                        metavar='size',
+                        nargs='?',
+                        type=int,
+                        const=256,
+                        default=0,
+                        help='Reuse the Hi-Z results of the input combinations already probed since the last clock or power cycle, keeping up to this many (256 if omitted)')
+    hiz_group.add_argument('--hiz_verify',
+                        metavar='rate',
+                        type=float,
+                        default=0.0,
+                        help='Fraction of the Hi-Z cache hits that are probed anyway, to detect stale results')
+
+    osc_group = parser.add_argument_group()
+    osc_group.add_argument('--osc_samples',
+                        metavar='samples',
+                        type=_osc_samples,
+                        default=OscPolicy().samples,
+                        help='Reads taken by the board to detect oscillating pins')
+    osc_group.add_argument('--osc_strategy',
+                        choices=[strategy.value for strategy in OscStrategy],
+                        default=OscStrategy.FIXED.value,
+                        help='Always take all the samples (fixed), or run a short probe first and take them only if a pin flickers (adaptive)')
+    osc_group.add_argument('--osc_probe',
+                        metavar='samples',
+                        type=_osc_samples,
+                        default=OscPolicy().probe_samples,
+                        help='Reads of the probe of the adaptive strategy')
+    osc_group.add_argument('--osc_skip_unchanged',
+                        action='store_true',
+                        default=False,
+                        help='Do not check again for oscillating pins if the same value was written and read as the last check, which found none')
+    osc_group.add_argument('--osc_deferred',
+                        action='store_true',
+                        default=False,
+                        help='In the UI, show the pin levels before checking for oscillating pins, then refresh them in the background')
 
     subparsers = parser.add_subparsers(help='supported subcommands', dest='subcommand', required=True)
 
@@ -73,19 +170,121 @@ def _build_argsparser() -> argparse.ArgumentParser:
                             required=True,
                             help='File with recorded transitions for simulation purposes')
     
-    parser_conn = subparsers.add_parser(Subcommands.DUPICO.value, help='Read data the dupico board')
-    parser_conn.add_argument('-p', '--port',
+    port_parser: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False)
+    port_parser.add_argument('-p', '--port',
                         type=str,
                         nargs='?',
                         metavar="serial port",
-                        required=True,
-                        help='Serial port associated with the board')
-    parser_conn.add_argument('-b', '--baudrate',
+                        help='Serial port associated with the board, not needed with --daemon')
+    port_parser.add_argument('-b', '--baudrate',
                         type=int,
                         metavar="baud rate",
                         default=115200,
                         help='Speed at which to the serial port is opened')
 
+    # Batch subcommands can drive several boards at once
+    boards_parser: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False)
+    boards_parser.add_argument('-p', '--port',
+                        type=str,
+                        nargs='*',
+                        metavar="serial port",
+                        help='Serial ports of the boards, not needed with --daemon. With run, port=definition reads a different IC on that board')
+    boards_parser.add_argument('-b', '--baudrate',
+                        type=int,
+                        metavar="baud rate",
+                        default=115200,
+                        help='Speed at which to the serial ports are opened')
+
+    subparsers.add_parser(Subcommands.DUPICO.value, parents=[port_parser], help='Read data the dupico board')
+
+    parser_sweep = subparsers.add_parser(Subcommands.SWEEP.value, parents=[boards_parser], help='Read all the input combinations without the UI')
+    parser_sweep.add_argument('-o', '--output',
+                        metavar='output file',
+                        required=True,
+                        help='File receiving the results, in the same format used by --record')
+    parser_sweep.add_argument('--check_osc',
+                        action='store_true',
+                        default=False,
+                        help='Also check for oscillating pins at every step')
+    parser_sweep.add_argument('--exclude',
+                        metavar='pin_to_exclude',
+                        nargs='+',
+                        type=int,
+                        default=[],
+                        help='Input pins to keep low during the sweep (e.g. clock pins)')
+    parser_sweep.add_argument('--resume',
+                        action='store_true',
+                        default=False,
+                        help='Continue an interrupted sweep from its checkpoint')
+
+    parser_explore = subparsers.add_parser(Subcommands.EXPLORE.value, parents=[port_parser], help='Explore the states of the registered outputs without the UI')
+    parser_explore.add_argument('-o', '--output',
+                        metavar='graph file',
+                        required=True,
+                        help='File receiving the transition graph')
+    parser_explore.add_argument('--clock',
+                        metavar='clock pin',
+                        type=int,
+                        default=None,
+                        help='Clock pin to pulse, defaults to the first one in the definition')
+    parser_explore.add_argument('--exclude',
+                        metavar='pin_to_exclude',
+                        nargs='+',
+                        type=int,
+                        default=[],
+                        help='Input pins to keep low during the exploration')
+    parser_explore.add_argument('--resume',
+                        action='store_true',
+                        default=False,
+                        help='Continue an interrupted exploration from its graph file')
+
+    parser_run = subparsers.add_parser(Subcommands.RUN.value, parents=[boards_parser], help='Execute a file of test vectors without the UI')
+    parser_run.add_argument('-f', '--vector_file',
+                        metavar='vector file',
+                        required=True,
+                        help='Text or CSV file with the actions to execute')
+    parser_run.add_argument('--check_osc',
+                        action='store_true',
+                        default=False,
+                        help='Also check for oscillating pins after every action')
+    parser_run.add_argument('--pulses',
+                        action='store_true',
+                        default=False,
+                        help='Print the pins read after every pulse of the clock actions with a count (single board only)')
+
+    parser_replay = subparsers.add_parser(Subcommands.REPLAY.value, parents=[port_parser], help='Execute a recorded session again and compare the results')
+    parser_replay.add_argument('-s', '--session_file',
+                        metavar='session file',
+                        required=True,
+                        help='Session recorded with --record, or results of a sweep')
+    parser_replay.add_argument('--power_delay',
+                        metavar='seconds',
+                        type=float,
+                        default=0.5,
+                        help='Time the IC is left off, and then given to settle, at every power cycle')
+
+    parser_analyze = subparsers.add_parser(Subcommands.ANALYZE.value, help='Find the inputs each output depends on, from the results of a sweep (needs NumPy)')
+    parser_analyze.add_argument('-i', '--input',
+                        metavar='dump file',
+                        required=True,
+                        help='Results of a sweep, or a recorded session')
+    parser_analyze.add_argument('--equations',
+                        metavar='output file',
+                        nargs='?',
+                        const='-',
+                        default=None,
+                        help='Also extract minimized equations of the outputs, in PALASM form, printed or saved to the file')
+    parser_analyze.add_argument('--max_terms',
+                        type=int,
+                        default=64,
+                        help='Product terms an equation can have before the output is reported as too complex')
+
+    parser_daemon = subparsers.add_parser(Subcommands.DAEMON.value, parents=[port_parser], help='Keep the board open and the IC powered, serving other invocations through --daemon')
+    parser_daemon.add_argument('--stop',
+                        action='store_true',
+                        default=False,
+                        help='Stop the daemon listening on the --daemon socket, powering the IC off')
+
     return parser
 
 def cli() -> int:
@@ -99,23 +298,72 @@ def cli() -> int:
         debug_level = logging.INFO
     logging.basicConfig(level=debug_level)
 
-    if not args.port:
+    osc_policy: OscPolicy = OscPolicy(OscStrategy(args.osc_strategy), args.osc_samples, args.osc_probe, args.osc_skip_unchanged, args.osc_deferred)
+    hiz_cache: HiZCachePolicy = HiZCachePolicy(args.hiz_cache, args.hiz_verify)
+
+    stats: CommandStats | None = None
+    if args.stats is not None:
+        from dppeeper.board.command_stats import CommandStats
+        stats = CommandStats()
+
+    if args.subcommand == Subcommands.DAEMON.value and not args.daemon:
+        _LOGGER.critical('The daemon subcommand needs the socket path, given with --daemon or DPPEEPER_DAEMON')
+        return 1
+
+    # Subcommands going through a daemon do not open a port
+    uses_daemon: bool = bool(args.daemon) and args.subcommand != Subcommands.DAEMON.value
+    needs_port: bool = ((args.subcommand in (Subcommands.DUPICO.value, Subcommands.SWEEP.value, Subcommands.EXPLORE.value, Subcommands.RUN.value, Subcommands.REPLAY.value) and not uses_daemon) or
+                        (args.subcommand == Subcommands.DAEMON.value and not args.stop))
+    if needs_port and not args.port:
+        from dppeeper.peeper_utilities import PeeperUtilities
+
         PeeperUtilities.print_serial_ports()      
         return 1
     else:
-        ser_port: serial.Serial | None = None
-
         try:
             # Load and check IC definition requirements
-            ic_definition: ICDefinition
-            with open(args.definition, 'rb') as def_file:
-                ic_definition = ICLoader.extract_definition_from_buffered_reader(def_file)
+            ic_definition: ICDefinition = load_definition(args.definition, args.library)
+
+            ports: list[str] | str | None = getattr(args, 'port', None)
+            port: str | None = (ports[0] if ports else None) if isinstance(ports, list) else ports
+            daemon: str | None = args.daemon if uses_daemon else None
+            if daemon and isinstance(ports, list) and len(ports) > 1:
+                raise ValueError('Multiple boards cannot be driven through the daemon')
+            elif daemon and port:
+                _LOGGER.warning(f'Using the board of the daemon on {daemon}, port {port} is ignored')
 
             match args.subcommand:
                 case Subcommands.SIM.value:
-                    sim_command(ic_definition, args.skip_note)
+                    sim_command(args.sim_file, ic_definition, args.check_hiz, args.skip_hiz, args.record, HiZStrategy(args.hiz_strategy), stats, osc_policy, hiz_cache, args.live)
                 case Subcommands.DUPICO.value:
-                    connect_command(args.port, args.baudrate, ic_definition, args.skip_note, args.check_hiz, args.skip_hiz)
+                    connect_command(port, args.baudrate, ic_definition, args.skip_note, args.check_hiz, args.skip_hiz, args.record, HiZStrategy(args.hiz_strategy), stats, osc_policy, hiz_cache,
+                                    daemon, args.live)
+                case Subcommands.SWEEP.value if not daemon and (len(args.port) > 1 or '=' in args.port[0]):
+                    multi_sweep_command(args.port, args.baudrate, ic_definition, args.output, args.skip_note, args.check_hiz, args.skip_hiz, args.record,
+                                        HiZStrategy(args.hiz_strategy), args.check_osc, args.exclude, args.resume, stats, osc_policy, hiz_cache)
+                case Subcommands.SWEEP.value:
+                    sweep_command(port, args.baudrate, ic_definition, args.output, args.skip_note, args.check_hiz, args.skip_hiz, args.record, HiZStrategy(args.hiz_strategy),
+                                  args.check_osc, args.exclude, args.resume, stats, osc_policy, hiz_cache, daemon)
+                case Subcommands.EXPLORE.value:
+                    explore_command(port, args.baudrate, ic_definition, args.output, args.clock, args.skip_note, args.record, args.exclude, args.resume, stats, daemon)
+                case Subcommands.RUN.value if not daemon and (len(args.port) > 1 or '=' in args.port[0]):
+                    if multi_run_command(args.port, args.baudrate, ic_definition, args.library, args.vector_file, args.skip_note, args.check_hiz, args.skip_hiz,
+                                         args.record, HiZStrategy(args.hiz_strategy), args.check_osc, stats, osc_policy, hiz_cache) != 1:
+                        return 2
+                case Subcommands.RUN.value:
+                    if run_command(port, args.baudrate, ic_definition, args.vector_file, args.skip_note, args.check_hiz, args.skip_hiz,
+                                   args.record, HiZStrategy(args.hiz_strategy), args.check_osc, stats, osc_policy, hiz_cache, daemon, args.pulses) != 1:
+                        return 2
+                case Subcommands.REPLAY.value:
+                    if replay_command(port, args.baudrate, ic_definition, args.session_file, args.skip_note, args.check_hiz, args.skip_hiz,
+                                      args.record, HiZStrategy(args.hiz_strategy), args.power_delay, stats, osc_policy, hiz_cache, daemon) != 1:
+                        return 2
+                case Subcommands.ANALYZE.value:
+                    analyze_command(args.input, ic_definition, args.equations, args.max_terms)
+                case Subcommands.DAEMON.value if args.stop:
+                    stop_daemon_command(args.daemon)
+                case Subcommands.DAEMON.value:
+                    daemon_command(port, args.baudrate, ic_definition, args.daemon, args.skip_note, stats)
                 case _:
                     _LOGGER.critical(f'Unsupported command {args.subcommand}')
 
@@ -123,77 +371,464 @@ def cli() -> int:
         except Exception as ex:
             _LOGGER.critical(traceback.format_exc())
             return -1
+        finally:
+            if stats is not None:
+                write_stats(stats, args.stats)
 
         _LOGGER.info('Quitting.')          
     return 0
 
-def start_ui(name: str, ic_definition: ICDefinition, command_class: type[BoardCommandsInterface], check_hiz: bool = False, skip_hiz: list[int] = [], ser: serial.Serial | None = None) -> None:
-    root: Tk = Tk()
-    ico_data: bytes = files('resources').joinpath('ico.png').read_bytes()
-    ico_img: PhotoImage = PhotoImage(data=ico_data)
-    
-    mw = MainWin(ic_definition=ic_definition, board_commands=command_class, check_hiz=check_hiz, skip_hiz=skip_hiz, ser=ser)
-    root.resizable(False, False)
-    root.title(name)
-    root.wm_iconphoto(False, ico_img)
+def load_definition(definition: str, library_dir: str | None = None) -> 'ICDefinition':
+    """
+    Load a definition from a file or, if no such file exists, by name from the library
+    """
+    from dppeeper.ic.ic_loader import ICLoader
+    from dppeeper.ic.ic_library import ICLibrary
+
+    if os.path.isfile(definition) or not library_dir:
+        with open(definition, 'rb') as def_file:
+            return ICLoader.extract_definition_from_buffered_reader(def_file)
+
+    library: ICLibrary = ICLibrary(library_dir)
+    _LOGGER.info(f'Loading {definition} from library {library.directory}')
+    return library.load(definition)
+
+def write_stats(stats: 'CommandStats', destination: str) -> None:
+    """Print the statistics report, or save it as JSON unless the destination is '-'"""
+    if destination == '-':
+        print(stats.format_report())
+    else:
+        import json
 
-    root.mainloop()
+        with open(destination, 'w') as stats_file:
+            json.dump(stats.to_dict(), stats_file, indent=2)
+        _LOGGER.info(f'Statistics saved to {destination}')
 
-def sim_command(ic_definition: ICDefinition, skip_note: bool) -> None:
-    raise NotImplementedError('Simulation mode not currently implemented.')
+def start_ui(name: str, ic_definition: 'ICDefinition', command_class: 'type[BoardCommandsInterface]', check_hiz: bool = False, skip_hiz: list[int] = [], ser: 'serial.Serial | DaemonClient | None' = None,
+             record_file: str | None = None, hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN, stats: 'CommandStats | None' = None, osc_policy: OscPolicy = OscPolicy(),
+             hiz_cache: HiZCachePolicy = HiZCachePolicy(), live_rate: float | None = None) -> None:
+    """Open the main window, in live mode if a live rate is given. Otherwise live mode can be turned on from the window, at the default rate"""
+    from importlib.resources import files
+    from tkinter import Tk, PhotoImage
 
-def connect_command(port_name: str, baudrate: int, ic_definition: ICDefinition, skip_note: bool = False, check_hiz: bool = False, skip_hiz: list[int] = []) -> int:
-    ser_port: serial.Serial | None = None
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.board.session_recorder import SessionRecorder
+    from dppeeper.ui.main_window import MainWin
+    from dppeeper.ui.live_refresh import LivePolicy
+
+    recorder: SessionRecorder | None = SessionRecorder(record_file, ic_definition.name, len(ic_definition.zif_map)) if record_file else None
+
+    try:
+        root: Tk = Tk()
+        ico_data: bytes = files('resources').joinpath('ico.png').read_bytes()
+        ico_img: PhotoImage = PhotoImage(data=ico_data)
+
+        session: PeeperSession = PeeperSession(ic_definition, command_class, ser, check_hiz=check_hiz, skip_hiz=skip_hiz, hiz_strategy=hiz_strategy, recorder=recorder, stats=stats,
+                                               osc_policy=osc_policy, hiz_cache=hiz_cache)
+        mw = MainWin(session, LivePolicy(rate=live_rate) if live_rate else LivePolicy(), live_rate is not None)
+        root.resizable(False, False)
+        root.title(name)
+        root.wm_iconphoto(False, ico_img)
+
+        root.mainloop()
+    finally:
+        if recorder:
+            recorder.close()
+
+def sim_command(sim_file: str, ic_definition: 'ICDefinition', check_hiz: bool = False, skip_hiz: list[int] = [], record_file: str | None = None, hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN,
+                stats: 'CommandStats | None' = None, osc_policy: OscPolicy = OscPolicy(), hiz_cache: HiZCachePolicy = HiZCachePolicy(), live_rate: float | None = None) -> int:
+    from dppeeper.board.dump_file import DumpReader
+    from dppeeper.board.sim_board_commands import SimBoardCommands
+
+    with DumpReader(sim_file) as dump:
+        _LOGGER.info(f'Opened dump {sim_file} for {dump.ic_name}, {len(dump)} records')
+
+        command_class: type[SimBoardCommands] = SimBoardCommands.bind(dump, ic_definition)
+        if stats is not None:
+            from dppeeper.board.command_stats import InstrumentedCommands
+            command_class = InstrumentedCommands.wrap(command_class, stats)
+
+        print(f'Simulating IC {ic_definition.name} from {sim_file}')
+
+        # Same power-up sequence as the real board
+        command_class.write_pins(command_class.map_value_to_pins(ic_definition.adapter_hi_pins, 0xFFFFFFFFFFFFFFFF))
+        command_class.set_power(True)
+
+        start_ui(f'{__name__} - {dppeeper.__version__} (sim)', ic_definition, command_class, check_hiz, skip_hiz, record_file=record_file, hiz_strategy=hiz_strategy,
+                 stats=stats, osc_policy=osc_policy, hiz_cache=hiz_cache, live_rate=live_rate)
+
+    return 1
+
+def _open_serial_port(port_name: str, baudrate: int) -> 'serial.Serial':
+    import serial
+
+    _LOGGER.debug(f'Trying to open serial port {port_name}')
+    return serial.Serial(port = port_name,
+                         baudrate=baudrate,
+                         bytesize = 8,
+                         stopbits = 1,
+                         parity = 'N',
+                         timeout = 5.0)
+
+def _open_port(port_name: str | None, baudrate: int, daemon_socket: str | None = None) -> 'serial.Serial | DaemonClient':
+    """Open the serial port of the board or, if a daemon socket is given, connect to the daemon holding the board"""
+    if daemon_socket is None:
+        if port_name is None:
+            raise ValueError('No serial port given')
+        return _open_serial_port(port_name, baudrate)
+
+    from dppeeper.board.board_daemon import DaemonClient
+
+    _LOGGER.debug(f'Connecting to the daemon on {daemon_socket}')
+    return DaemonClient(daemon_socket)
+
+def _init_daemon_board(client: 'DaemonClient', ic_definition: 'ICDefinition', stats: 'CommandStats | None' = None, claim: bool = False) -> 'type[BoardCommandsInterface] | None':
+    """
+    Obtain the command class for the board of a daemon. The IC is powered up only if it is not already,
+    so its registers keep the state left by the previous client.
+    The connection is closed, and None returned, if the daemon powers an IC wired differently in the socket.
+    """
+    from dppeeper.board.daemon_board_commands import DaemonBoardCommands
+
+    command_class: type[DaemonBoardCommands]
+    try:
+        command_class = DaemonBoardCommands.bind(client, ic_definition)
+    except ValueError as ex:
+        _LOGGER.critical(f'{ex}, refusing to drive its pins')
+        client.close()
+        return None
+    if stats is not None:
+        from dppeeper.board.command_stats import InstrumentedCommands
+        command_class = InstrumentedCommands.wrap(command_class, stats)
+
+    if claim:
+        _LOGGER.info('Waiting for exclusive access to the board')
+        client.claim()
+
+    print(f'Analyzing IC {ic_definition.name} through the daemon on {client.port}')
+    if not command_class.powered:
+        command_class.write_pins(command_class.map_value_to_pins(ic_definition.adapter_hi_pins, 0xFFFFFFFFFFFFFFFF), client)
+        command_class.set_power(True, client)
+
+    return command_class
+
+def _power_off(command_class: 'type[BoardCommandsInterface]', ser_port: 'serial.Serial | DaemonClient') -> None:
+    """Power the IC off at the end of a command, unless it is shared through a daemon"""
+    if not getattr(command_class, 'KEEPS_POWER', False):
+        command_class.set_power(False, ser_port)
+
+def _init_board(ser_port: 'serial.Serial | DaemonClient', ic_definition: 'ICDefinition', skip_note: bool = False, stats: 'CommandStats | None' = None,
+                claim: bool = False) -> 'type[BoardCommandsInterface] | None':
+    """
+    Check that the board is supported, then prepare it and power the IC up.
+    If stats are given, the returned class records the latency of every command in them.
+    For a board held by a daemon, see `_init_daemon_board`: claim makes this the only connection served by the daemon.
+
+    Returns:
+        type[BoardCommandsInterface] | None: the class handling commands for this board, or None if the board is not usable
+    """
+    from dppeeper.board.board_daemon import DaemonClient
+    if isinstance(ser_port, DaemonClient):
+        return _init_daemon_board(ser_port, ic_definition, stats, claim)
+
+    from dupicolib.hardware_board_commands import HardwareBoardCommands
+    from dupicolib.board_command_class_factory import BoardCommandClassFactory
+    from dupicolib.board_utilities import BoardUtilities
+    from dupicolib.board_fw_version import FwVersionTools, FWVersionDict
+
+    if not BoardUtilities.initialize_connection(ser_port):
+        _LOGGER.critical('Serial port connected, but the board did not respond in time.')
+        return None
+        
+    _LOGGER.info(f'Board connected @{ser_port.port}, speed:{ser_port.baudrate} ...')
+    model: int | None = HardwareBoardCommands.get_model(ser_port)
+    if model is None:
+        _LOGGER.critical('Unable to retrieve model number...')
+        return None
+    elif model < MIN_SUPPORTED_MODEL:
+        _LOGGER.critical(f'Model {model} is not supported.')
+        return None
+    else:
+        _LOGGER.info(f'Model {model} detected!')
+        
+    fw_version: str | None = HardwareBoardCommands.get_version(ser_port)
+    fw_version_dict: FWVersionDict
+    if fw_version is None:
+        _LOGGER.critical('Unable to retrieve firmware version...')
+        return None
+    else:
+        fw_version_dict = FwVersionTools.parse(fw_version) # Check that the version is formatted correctly
+        _LOGGER.info(f'Firmware version on board is "{fw_version}"')
+
+    if ic_definition.hw_model > model:
+        raise ValueError(f'Current hardware model {model} does not satisfy requirement {ic_definition.hw_model}')
+
+    # Now we have enough information to obtain the class that handles commands specific for this board
+    command_class: type[HardwareBoardCommands] = BoardCommandClassFactory.get_command_class(model, fw_version_dict)
+    if stats is not None:
+        from dppeeper.board.command_stats import InstrumentedCommands
+        command_class = InstrumentedCommands.wrap(command_class, stats)
+
+    print(f'Analyzing IC {ic_definition.name}')
+    if not skip_note and ic_definition.adapter_notes and bool(ic_definition.adapter_notes.strip()):
+        print_note(ic_definition.adapter_notes)
+
+    # Make sure that the required pins to be set are actually set, then power on
+    command_class.write_pins(command_class.map_value_to_pins(ic_definition.adapter_hi_pins, 0xFFFFFFFFFFFFFFFF), ser_port)
+    command_class.set_power(True, ser_port)
+
+    return command_class
+
+def connect_command(port_name: str | None, baudrate: int, ic_definition: 'ICDefinition', skip_note: bool = False, check_hiz: bool = False, skip_hiz: list[int] = [], record_file: str | None = None,
+                    hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN, stats: 'CommandStats | None' = None, osc_policy: OscPolicy = OscPolicy(),
+                    hiz_cache: HiZCachePolicy = HiZCachePolicy(), daemon_socket: str | None = None, live_rate: float | None = None) -> int:
+    ser_port: serial.Serial | DaemonClient | None = None
     
     try:
-        _LOGGER.debug(f'Trying to open serial port {port_name}')
-        ser_port = serial.Serial(port = port_name,
-                                 baudrate=baudrate,
-                                 bytesize = 8,
-                                 stopbits = 1,
-                                 parity = 'N',
-                                 timeout = 5.0)
-            
-        if not BoardUtilities.initialize_connection(ser_port):
-            _LOGGER.critical('Serial port connected, but the board did not respond in time.')
-            return -1
-            
-        _LOGGER.info(f'Board connected @{port_name}, speed:{baudrate} ...')
-        model: int | None = HardwareBoardCommands.get_model(ser_port)
-        if model is None:
-            _LOGGER.critical('Unable to retrieve model number...')
-            return -1
-        elif model < MIN_SUPPORTED_MODEL:
-            _LOGGER.critical(f'Model {model} is not supported.')
+        ser_port = _open_port(port_name, baudrate, daemon_socket)
+
+        command_class: type[BoardCommandsInterface] | None = _init_board(ser_port, ic_definition, skip_note, stats)
+        if command_class is None:
             return -1
-        else:
-            _LOGGER.info(f'Model {model} detected!')
-            
-        fw_version: str | None = HardwareBoardCommands.get_version(ser_port)
-        fw_version_dict: FWVersionDict
-        if fw_version is None:
-            _LOGGER.critical('Unable to retrieve firmware version...')
+
+        # And finally, start the UI
+        start_ui(f'{__name__} - {dppeeper.__version__}', ic_definition, command_class, check_hiz, skip_hiz, ser_port, record_file, hiz_strategy, stats, osc_policy, hiz_cache, live_rate)
+
+        return 1
+    finally:
+        if ser_port and not ser_port.closed:
+            _LOGGER.debug('Closing the serial port.')
+            ser_port.close()
+
+def sweep_command(port_name: str | None, baudrate: int, ic_definition: 'ICDefinition', output: str, skip_note: bool = False, check_hiz: bool = False, skip_hiz: list[int] = [],
+                  record_file: str | None = None, hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN, check_osc: bool = False, exclude: list[int] = [], resume: bool = False,
+                  stats: 'CommandStats | None' = None, osc_policy: OscPolicy = OscPolicy(), hiz_cache: HiZCachePolicy = HiZCachePolicy(),
+                daemon_socket: str | None = None) -> int:
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.board.session_recorder import SessionRecorder
+    from dppeeper.batch.truth_table_sweep import TruthTableSweep
+
+    ser_port: serial.Serial | DaemonClient | None = None
+    recorder: SessionRecorder | None = None
+    
+    try:
+        ser_port = _open_port(port_name, baudrate, daemon_socket)
+
+        command_class: type[BoardCommandsInterface] | None = _init_board(ser_port, ic_definition, skip_note, stats, claim=True)
+        if command_class is None:
             return -1
+
+        recorder = SessionRecorder(record_file, ic_definition.name, len(ic_definition.zif_map)) if record_file else None
+        session: PeeperSession = PeeperSession(ic_definition, command_class, ser_port, check_hiz=check_hiz, skip_hiz=skip_hiz, hiz_strategy=hiz_strategy, recorder=recorder, stats=stats,
+                                               osc_policy=osc_policy, hiz_cache=hiz_cache)
+
+        sweep: TruthTableSweep = TruthTableSweep(session, TruthTableSweep.sweep_pins(ic_definition, exclude), check_osc)
+        print(f'Sweeping {sweep.total_steps} input combinations into {output}')
+        done: int = sweep.run(output, resume)
+        print(f'Sweep completed, {done} combinations read')
+
+        _power_off(command_class, ser_port)
+
+        return 1
+    finally:
+        if recorder:
+            recorder.close()
+        if ser_port and not ser_port.closed:
+            _LOGGER.debug('Closing the serial port.')
+            ser_port.close()
+
+def explore_command(port_name: str | None, baudrate: int, ic_definition: 'ICDefinition', output: str, clk_pin: int | None = None, skip_note: bool = False,
+                    record_file: str | None = None, exclude: list[int] = [], resume: bool = False, stats: 'CommandStats | None' = None,
+                    daemon_socket: str | None = None) -> int:
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.board.session_recorder import SessionRecorder
+    from dppeeper.batch.state_explorer import ExplorationStats, RegisteredStateExplorer, StateGraph
+
+    if not ic_definition.q_pins:
+        raise ValueError(f'IC {ic_definition.name} has no registered outputs')
+
+    if clk_pin is None:
+        if not ic_definition.clk_pins:
+            raise ValueError(f'IC {ic_definition.name} has no clock pins')
+        clk_pin = ic_definition.clk_pins[0]
+
+    state_pins, input_pins = RegisteredStateExplorer.explore_pins(ic_definition, clk_pin, exclude)
+
+    ser_port: serial.Serial | DaemonClient | None = None
+    recorder: SessionRecorder | None = None
+    
+    try:
+        with StateGraph(output, ic_definition.name, state_pins, input_pins, resume) as graph:
+            ser_port = _open_port(port_name, baudrate, daemon_socket)
+
+            command_class: type[BoardCommandsInterface] | None = _init_board(ser_port, ic_definition, skip_note, stats, claim=True)
+            if command_class is None:
+                return -1
+
+            recorder = SessionRecorder(record_file, ic_definition.name, len(ic_definition.zif_map)) if record_file else None
+            session: PeeperSession = PeeperSession(ic_definition, command_class, ser_port, recorder=recorder, stats=stats)
+
+            print(f'Exploring {len(state_pins)} registered pins with {len(input_pins)} inputs into {output}')
+            result: ExplorationStats = RegisteredStateExplorer(session, graph, clk_pin).run()
+            print(f'Exploration completed: {result.states} states, {result.transitions} transitions, {result.power_cycles} power cycles, '
+                  f'{result.states / result.elapsed:.2f} states/s, {result.clocks / result.elapsed:.1f} clocks/s')
+
+            _power_off(command_class, ser_port)
+
+        return 1
+    finally:
+        if recorder:
+            recorder.close()
+        if ser_port and not ser_port.closed:
+            _LOGGER.debug('Closing the serial port.')
+            ser_port.close()
+
+def run_command(port_name: str | None, baudrate: int, ic_definition: 'ICDefinition', vector_file: str, skip_note: bool = False, check_hiz: bool = False, skip_hiz: list[int] = [],
+                record_file: str | None = None, hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN, check_osc: bool = False,
+                stats: 'CommandStats | None' = None, osc_policy: OscPolicy = OscPolicy(), hiz_cache: HiZCachePolicy = HiZCachePolicy(),
+                daemon_socket: str | None = None, pulses: bool = False) -> int:
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.board.session_recorder import SessionRecorder
+    from dppeeper.batch.vector_runner import VectorFile, VectorRunner
+
+    ser_port: serial.Serial | DaemonClient | None = None
+    recorder: SessionRecorder | None = None
+
+    try:
+        with open(vector_file, 'r', newline='') as vectors:
+            ser_port = _open_port(port_name, baudrate, daemon_socket)
+
+            command_class: type[BoardCommandsInterface] | None = _init_board(ser_port, ic_definition, skip_note, stats, claim=True)
+            if command_class is None:
+                return -1
+
+            recorder = SessionRecorder(record_file, ic_definition.name, len(ic_definition.zif_map)) if record_file else None
+            session: PeeperSession = PeeperSession(ic_definition, command_class, ser_port, check_hiz=check_hiz, skip_hiz=skip_hiz, hiz_strategy=hiz_strategy, recorder=recorder, stats=stats,
+                                                   osc_policy=osc_policy, hiz_cache=hiz_cache)
+
+            passed: bool = True
+            for result in VectorRunner(session, check_osc, capture=pulses).run(VectorFile(ic_definition).parse(vectors)):
+                print(VectorRunner.format_result(result, ic_definition), flush=True)
+                for line in VectorRunner.format_pulses(result, ic_definition):
+                    print(line)
+                passed = not result.mismatch
+
+            _power_off(command_class, ser_port)
+
+            return 1 if passed else 0
+    finally:
+        if recorder:
+            recorder.close()
+        if ser_port and not ser_port.closed:
+            _LOGGER.debug('Closing the serial port.')
+            ser_port.close()
+
+def replay_command(port_name: str | None, baudrate: int, ic_definition: 'ICDefinition', session_file: str, skip_note: bool = False, check_hiz: bool = False, skip_hiz: list[int] = [],
+                   record_file: str | None = None, hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN, power_delay: float = 0.5,
+                   stats: 'CommandStats | None' = None, osc_policy: OscPolicy = OscPolicy(), hiz_cache: HiZCachePolicy = HiZCachePolicy(),
+                daemon_socket: str | None = None) -> int:
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.board.dump_file import DumpReader
+    from dppeeper.board.session_recorder import SessionRecorder
+    from dppeeper.batch.session_replay import ReplayReport, SessionReplay
+
+    ser_port: serial.Serial | DaemonClient | None = None
+    recorder: SessionRecorder | None = None
+
+    try:
+        with DumpReader(session_file) as dump:
+            if dump.ic_name != ic_definition.name:
+                raise ValueError(f'Session {session_file} was recorded on {dump.ic_name}, not {ic_definition.name}')
+
+            ser_port = _open_port(port_name, baudrate, daemon_socket)
+
+            command_class: type[BoardCommandsInterface] | None = _init_board(ser_port, ic_definition, skip_note, stats, claim=True)
+            if command_class is None:
+                return -1
+
+            recorder = SessionRecorder(record_file, ic_definition.name, len(ic_definition.zif_map)) if record_file else None
+            session: PeeperSession = PeeperSession(ic_definition, command_class, ser_port, check_hiz=check_hiz, skip_hiz=skip_hiz, hiz_strategy=hiz_strategy, recorder=recorder,
+                                                   power_delay=power_delay, stats=stats, osc_policy=osc_policy, hiz_cache=hiz_cache)
+
+            print(f'Replaying {session_file}, {len(dump)} records')
+            start: float = time.perf_counter()
+            report: ReplayReport = ReplayReport()
+            for diff in SessionReplay(session).run(SessionReplay.steps(dump)):
+                report.add(diff)
+            elapsed: float = time.perf_counter() - start
+
+            print(report.format_report(ic_definition))
+            print(f'Replay took {elapsed:.2f}s ({report.steps / elapsed if elapsed > 0 else 0:.1f} steps/s)')
+
+            _power_off(command_class, ser_port)
+
+            return 1 if report.diverged == 0 else 0
+    finally:
+        if recorder:
+            recorder.close()
+        if ser_port and not ser_port.closed:
+            _LOGGER.debug('Closing the serial port.')
+            ser_port.close()
+
+def analyze_command(dump_file: str, ic_definition: 'ICDefinition', equations_file: str | None = None, max_terms: int = 64) -> int:
+    try:
+        from dppeeper.analysis.truth_table_analysis import TableAnalysis, TruthTable, TruthTableAnalyzer
+        from dppeeper.analysis.equation_extraction import EquationExtractor, OutputEquation
+    except ImportError as ex:
+        if ex.name != 'numpy':
+            raise
+        raise RuntimeError('The analyze subcommand needs NumPy, install it with the analysis extra of dppeeper') from ex
+
+    from dppeeper.board.dump_file import DumpReader
+
+    with DumpReader(dump_file) as dump:
+        if dump.ic_name != ic_definition.name:
+            _LOGGER.warning(f'Dump was recorded for {dump.ic_name}, but definition is for {ic_definition.name}')
+
+    table: TruthTable = TruthTable.from_dump(dump_file)
+    analyzer: TruthTableAnalyzer = TruthTableAnalyzer(ic_definition)
+    analysis: TableAnalysis = analyzer.analyze(table)
+    print(analyzer.format_report(analysis))
+
+    if equations_file is not None:
+        extractor: EquationExtractor = EquationExtractor(ic_definition, max_terms)
+        equations: list[OutputEquation] = extractor.extract(table, analysis)
+        palasm: str = extractor.format_palasm(table, equations)
+
+        if equations_file == '-':
+            print()
+            print(palasm)
         else:
-            fw_version_dict = FwVersionTools.parse(fw_version) # Check that the version is formatted correctly
-            _LOGGER.info(f'Firmware version on board is "{fw_version}"')
+            with open(equations_file, 'w') as eq_file:
+                eq_file.write(palasm + '\n')
+            _LOGGER.info(f'Equations saved to {equations_file}')
 
-        if ic_definition.hw_model > model:
-            raise ValueError(f'Current hardware model {model} does not satisfy requirement {ic_definition.hw_model}')
+    return 1
 
-        # Now we have enough information to obtain the class that handles commands specific for this board
-        command_class: type[HardwareBoardCommands] = BoardCommandClassFactory.get_command_class(model, fw_version_dict)
+def daemon_command(port_name: str | None, baudrate: int, ic_definition: 'ICDefinition', socket_path: str, skip_note: bool = False, stats: 'CommandStats | None' = None) -> int:
+    """Open the board and power the IC up, then serve it on a Unix socket until stopped"""
+    from dppeeper.board.board_daemon import BoardDaemon
 
-        print(f'Analyzing IC {ic_definition.name}')
-        if not skip_note and ic_definition.adapter_notes and bool(ic_definition.adapter_notes.strip()):
-            print_note(ic_definition.adapter_notes)
+    if port_name is None:
+        raise ValueError('The daemon needs the serial port of the board')
 
-        # Make sure that the required pins to be set are actually set, then power on
-        command_class.write_pins(command_class.map_value_to_pins(ic_definition.adapter_hi_pins, 0xFFFFFFFFFFFFFFFF), ser_port)
-        command_class.set_power(True, ser_port)
+    ser_port: serial.Serial | None = None
 
-        # And finally, start the UI
-        start_ui(f'{__name__} - {__version__}', ic_definition, command_class, check_hiz, skip_hiz, ser_port)
+    try:
+        ser_port = _open_serial_port(port_name, baudrate)
+
+        command_class: type[BoardCommandsInterface] | None = _init_board(ser_port, ic_definition, skip_note, stats)
+        if command_class is None:
+            return -1
+
+        daemon: BoardDaemon = BoardDaemon(socket_path, ic_definition, command_class, ser_port)
+        print(f'Serving the board on {socket_path}, stop with CTRL-C or the --stop option')
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+        command_class.set_power(False, ser_port)
 
         return 1
     finally:
@@ -201,6 +836,160 @@ def connect_command(port_name: str, baudrate: int, ic_definition: ICDefinition,
             _LOGGER.debug('Closing the serial port.')
             ser_port.close()
 
+def stop_daemon_command(socket_path: str) -> int:
+    from dppeeper.board.board_daemon import DaemonClient
+
+    client: DaemonClient = DaemonClient(socket_path)
+    try:
+        client.shutdown()
+    finally:
+        client.close()
+
+    print(f'Daemon on {socket_path} stopped')
+    return 1
+
+def _open_boards(boards: 'list[BoardSpec]', baudrate: int, ic_definitions: 'list[ICDefinition]', skip_note: bool, check_hiz: bool, skip_hiz: list[int],
+                 record_file: str | None, hiz_strategy: HiZStrategy, stats: 'CommandStats | None', osc_policy: OscPolicy, hiz_cache: HiZCachePolicy,
+                 ser_ports: 'list[serial.Serial]', recorders: 'list[SessionRecorder]', board_stats: 'list[CommandStats]') -> 'list[PeeperSession] | None':
+    """
+    Open and power up the boards one after the other, with a session for each.
+    Ports, recorders and statistics are appended to the lists as they are created, so the caller can release them.
+    """
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.board.command_stats import CommandStats
+    from dppeeper.board.session_recorder import SessionRecorder
+
+    sessions: list[PeeperSession] = []
+    noted: set[str] = set()
+
+    for idx, (board, ic_definition) in enumerate(zip(boards, ic_definitions)):
+        ser_port: serial.Serial = _open_serial_port(board.port, baudrate)
+        ser_ports.append(ser_port)
+
+        session_stats: CommandStats | None = None
+        if stats is not None:
+            session_stats = CommandStats()
+            board_stats.append(session_stats)
+
+        # Notes are shown once for every IC type
+        command_class: type[BoardCommandsInterface] | None = _init_board(ser_port, ic_definition, skip_note or ic_definition.name in noted, session_stats)
+        if command_class is None:
+            return None
+        noted.add(ic_definition.name)
+
+        recorder: SessionRecorder | None = None
+        if record_file:
+            recorder = SessionRecorder(f'{record_file}.{idx}', ic_definition.name, len(ic_definition.zif_map))
+            recorders.append(recorder)
+
+        sessions.append(PeeperSession(ic_definition, command_class, ser_port, check_hiz=check_hiz, skip_hiz=skip_hiz, hiz_strategy=hiz_strategy, recorder=recorder,
+                                      stats=session_stats, osc_policy=osc_policy, hiz_cache=hiz_cache))
+
+    return sessions
+
+def _close_boards(ser_ports: 'list[serial.Serial]', recorders: 'list[SessionRecorder]', stats: 'CommandStats | None', board_stats: 'list[CommandStats]') -> None:
+    for recorder in recorders:
+        recorder.close()
+    for ser_port in ser_ports:
+        if not ser_port.closed:
+            _LOGGER.debug(f'Closing the serial port {ser_port.port}.')
+            ser_port.close()
+    if stats is not None:
+        for session_stats in board_stats:
+            stats.merge(session_stats)
+
+def multi_sweep_command(boards: list[str], baudrate: int, ic_definition: 'ICDefinition', output: str, skip_note: bool = False, check_hiz: bool = False, skip_hiz: list[int] = [],
+                        record_file: str | None = None, hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN, check_osc: bool = False, exclude: list[int] = [], resume: bool = False,
+                        stats: 'CommandStats | None' = None, osc_policy: OscPolicy = OscPolicy(), hiz_cache: HiZCachePolicy = HiZCachePolicy()) -> int:
+    """Split a sweep across several boards reading the same IC type, merging the results in one output"""
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.board.command_stats import CommandStats
+    from dppeeper.board.session_recorder import SessionRecorder
+    from dppeeper.batch.multi_board import BoardSpec, BoardThroughput, ShardedSweep
+    from dppeeper.batch.truth_table_sweep import TruthTableSweep
+
+    board_specs: list[BoardSpec] = [BoardSpec.parse(board) for board in boards]
+    if any(spec.definition for spec in board_specs):
+        raise ValueError('All the boards of a sweep read the IC given with -d')
+
+    ser_ports: list[serial.Serial] = []
+    recorders: list[SessionRecorder] = []
+    board_stats: list[CommandStats] = []
+
+    try:
+        sessions: list[PeeperSession] | None = _open_boards(board_specs, baudrate, [ic_definition] * len(board_specs), skip_note, check_hiz, skip_hiz, record_file,
+                                                            hiz_strategy, stats, osc_policy, hiz_cache, ser_ports, recorders, board_stats)
+        if sessions is None:
+            return -1
+
+        sweep: ShardedSweep = ShardedSweep(sessions, TruthTableSweep.sweep_pins(ic_definition, exclude), check_osc)
+        print(f'Sweeping {sweep.total_steps} input combinations on {len(sessions)} boards into {output}')
+        throughputs: list[BoardThroughput] = sweep.run(output, resume)
+
+        for throughput in throughputs:
+            print(f'  {throughput.port}: {throughput.steps} combinations in {throughput.elapsed:.1f}s ({throughput.rate:.1f}/s)')
+        print(f'Sweep completed, {sum(throughput.steps for throughput in throughputs)} combinations read '
+              f'in {max(throughput.elapsed for throughput in throughputs):.1f}s ({sum(throughput.rate for throughput in throughputs):.1f}/s)')
+
+        for session in sessions:
+            session.set_power(False)
+
+        return 1
+    finally:
+        _close_boards(ser_ports, recorders, stats, board_stats)
+
+def multi_run_command(boards: list[str], baudrate: int, ic_definition: 'ICDefinition', library_dir: str | None, vector_file: str, skip_note: bool = False, check_hiz: bool = False,
+                      skip_hiz: list[int] = [], record_file: str | None = None, hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN, check_osc: bool = False,
+                      stats: 'CommandStats | None' = None, osc_policy: OscPolicy = OscPolicy(), hiz_cache: HiZCachePolicy = HiZCachePolicy()) -> int:
+    """Execute the same vector file on every board at the same time, e.g. to screen several chips at once"""
+    from dppeeper.peeper_session import PeeperSession
+    from dppeeper.board.command_stats import CommandStats
+    from dppeeper.board.session_recorder import SessionRecorder
+    from dppeeper.batch.multi_board import BoardOutcome, BoardPool, BoardSpec
+    from dppeeper.batch.vector_runner import VectorFile, VectorRunner
+
+    board_specs: list[BoardSpec] = [BoardSpec.parse(board) for board in boards]
+    ic_definitions: list[ICDefinition] = [load_definition(spec.definition, library_dir) if spec.definition else ic_definition for spec in board_specs]
+
+    with open(vector_file, 'r', newline='') as vectors:
+        lines: list[str] = vectors.readlines()
+
+    def run_board(session: PeeperSession, port: str) -> tuple[bool, int]:
+        passed: bool = True
+        steps: int = 0
+        for result in VectorRunner(session, check_osc).run(VectorFile(session.ic_definition).parse(lines)):
+            print(f'{port}: {VectorRunner.format_result(result, session.ic_definition)}', flush=True)
+            passed = not result.mismatch
+            steps += 1
+        return (passed, steps)
+
+    ser_ports: list[serial.Serial] = []
+    recorders: list[SessionRecorder] = []
+    board_stats: list[CommandStats] = []
+
+    try:
+        sessions: list[PeeperSession] | None = _open_boards(board_specs, baudrate, ic_definitions, skip_note, check_hiz, skip_hiz, record_file,
+                                                            hiz_strategy, stats, osc_policy, hiz_cache, ser_ports, recorders, board_stats)
+        if sessions is None:
+            return -1
+
+        outcomes: list[BoardOutcome[tuple[bool, int]]] = BoardPool.run([(spec.port, (lambda session, port: lambda: run_board(session, port))(session, spec.port))
+                                                                        for spec, session in zip(board_specs, sessions)])
+
+        for outcome in outcomes:
+            if outcome.result is None:
+                print(f'{outcome.port}: ERROR {outcome.error}')
+            else:
+                passed, steps = outcome.result
+                print(f'{outcome.port}: {"PASS" if passed else "FAIL"}, {steps} steps in {outcome.elapsed:.2f}s')
+
+        for session in sessions:
+            session.set_power(False)
+
+        return 1 if all(outcome.result is not None and outcome.result[0] for outcome in outcomes) else 0
+    finally:
+        _close_boards(ser_ports, recorders, stats, board_stats)
+
 def print_note(note: str, delay: int = 5) -> None:
     print('-' * 10)
     print(note.strip())
@@ -1,37 +1,78 @@
 """Contains the class that defines the connections of an IC"""
 
-from typing import final
+from typing import TYPE_CHECKING, Any, Iterable, Sequence, final
+
+from dppeeper.ic.pin_mapper import PinMapper
+
+if TYPE_CHECKING:
+    from dupicolib.board_commands_interface import BoardCommandsInterface
 
 @final
 class ICDefinition:
-    _SUPPORTED_NUM_SIDES: list[int] = [1, 2, 4]
+    """
+    Pinout of an IC and of its adapter. Pin lists are immutable tuples of 1-based pin numbers, and every role also has
+    a bitmask (bit 0 is pin 1 of the IC) for membership tests and masking of the values written and read.
+    """
 
-    name: str
-    pins_per_side: list[int]
-    
-    zif_map: list[int]
+    __slots__ = ('name', 'pins_per_side', 'zif_map', 'pin_names_override', 'pin_names',
+                 'clk_pins', 'in_pins', 'io_pins', 'o_pins', 'f_pins', 'q_pins', 'hiz_o_pins', 'oe_l_pins', 'oe_h_pins',
+                 'clk_mask', 'in_mask', 'io_mask', 'o_mask', 'f_mask', 'q_mask', 'hiz_o_mask', 'oe_l_mask', 'oe_h_mask',
+                 'nc_mask', 'gnd_mask', 'pwr_mask',
+                 'pin_rot_shift', 'adapter_hi_pins', 'hw_model', 'adapter_notes', '_pin_mappers')
 
-    pin_names_override: list[str]
-    pin_names: list[str]
+    _SUPPORTED_NUM_SIDES: tuple[int, ...] = (1, 2, 4)
 
-    clk_pins: list[int]
-    in_pins: list[int]
-    io_pins: list[int]
-    o_pins: list[int]
-    f_pins: list[int]
-    q_pins: list[int]
-    hiz_o_pins: list[int]
-    oe_l_pins: list[int]
-    oe_h_pins: list[int]
+    name: str
+    pins_per_side: tuple[int, ...]
+    
+    zif_map: tuple[int, ...]
+
+    pin_names_override: tuple[str, ...]
+    pin_names: tuple[str, ...]
+
+    clk_pins: tuple[int, ...]
+    in_pins: tuple[int, ...]
+    io_pins: tuple[int, ...]
+    o_pins: tuple[int, ...]
+    f_pins: tuple[int, ...]
+    q_pins: tuple[int, ...]
+    hiz_o_pins: tuple[int, ...]
+    oe_l_pins: tuple[int, ...]
+    oe_h_pins: tuple[int, ...]
+
+    clk_mask: int
+    in_mask: int
+    io_mask: int
+    o_mask: int
+    f_mask: int
+    q_mask: int
+    hiz_o_mask: int
+    oe_l_mask: int
+    oe_h_mask: int
+
+    nc_mask: int # Pins mapped on ZIF pin 0
+    gnd_mask: int # Pins mapped on ZIF pin 21
+    pwr_mask: int # Pins mapped on ZIF pin 42
 
     pin_rot_shift: int
 
-    adapter_hi_pins: list[int]
+    adapter_hi_pins: tuple[int, ...]
     hw_model: int
-    adapter_notes: str | None = None
+    adapter_notes: str | None
+
+    _pin_mappers: dict[type, PinMapper]
+
+    @staticmethod
+    def pins_to_mask(pins: Iterable[int]) -> int:
+        mask: int = 0
+
+        for pin in pins:
+            mask = mask | (1 << (pin - 1))
+
+        return mask
 
     @staticmethod
-    def _remap_pin_array(zif_map: list[int], pins: list[int]) -> list[int]:
+    def _remap_pin_array(zif_map: Sequence[int], pins: Sequence[int]) -> list[int]:
         remapped: list[int] = []
 
         for pin in pins:
@@ -40,7 +81,7 @@ class ICDefinition:
         return remapped
 
     @staticmethod
-    def _build_pin_names(zif_map: list[int], in_pins: list[int], io_pins: list[int], o_pins: list[int], clk_pins: list[int], q_pins: list[int], oe_l_pins: list[int], oe_h_pins: list[int], pin_names_override: list[str] = []) -> list[str]:
+    def _build_pin_names(zif_map: Sequence[int], in_pins: Sequence[int], io_pins: Sequence[int], o_pins: Sequence[int], clk_pins: Sequence[int], q_pins: Sequence[int], oe_l_pins: Sequence[int], oe_h_pins: Sequence[int], pin_names_override: Sequence[str] = ()) -> list[str]:
         pin_names: list[str] = [('P' if pin == 42 else ('G' if pin == 21 else '')) for pin in zif_map]
 
         for pin in in_pins:
@@ -88,44 +129,61 @@ class ICDefinition:
 
     def __init__(self,
                  name: str, 
-                 pins_per_side: list[int], 
-                 zif_map: list[int],
-                 clk_pins: list[int],
-                 in_pins: list[int],
-                 io_pins: list[int],
-                 o_pins: list[int],
-                 f_pins: list[int],
-                 hiz_o_pins: list[int],
-                 q_pins: list[int],
-                 oe_l_pins: list[int],
-                 oe_h_pins: list[int],
-                 adapter_hi_pins: list[int],
+                 pins_per_side: Sequence[int], 
+                 zif_map: Sequence[int],
+                 clk_pins: Sequence[int],
+                 in_pins: Sequence[int],
+                 io_pins: Sequence[int],
+                 o_pins: Sequence[int],
+                 f_pins: Sequence[int],
+                 hiz_o_pins: Sequence[int],
+                 q_pins: Sequence[int],
+                 oe_l_pins: Sequence[int],
+                 oe_h_pins: Sequence[int],
+                 adapter_hi_pins: Sequence[int],
                  hw_model: int,
                  pin_rot_shift: int = 0,
                  adapter_notes: str | None = None,
-                 pin_names_override: list[str] = []):
+                 pin_names_override: Sequence[str] = ()):
         
         self.name = name
-        self.pins_per_side = pins_per_side
-        self.zif_map = zif_map
+        self.pins_per_side = tuple(pins_per_side)
+        self.zif_map = tuple(zif_map)
         self.hw_model = hw_model
 
-        self.clk_pins = clk_pins
-        self.in_pins = in_pins
-        self.io_pins = io_pins
-        self.o_pins = o_pins
-        self.f_pins = f_pins
-        self.hiz_o_pins = hiz_o_pins
-        self.q_pins = q_pins
-        self.oe_h_pins = oe_h_pins
-        self.oe_l_pins = oe_l_pins
+        self.clk_pins = tuple(clk_pins)
+        self.in_pins = tuple(in_pins)
+        self.io_pins = tuple(io_pins)
+        self.o_pins = tuple(o_pins)
+        self.f_pins = tuple(f_pins)
+        self.hiz_o_pins = tuple(hiz_o_pins)
+        self.q_pins = tuple(q_pins)
+        self.oe_h_pins = tuple(oe_h_pins)
+        self.oe_l_pins = tuple(oe_l_pins)
+
+        self.clk_mask = self.pins_to_mask(self.clk_pins)
+        self.in_mask = self.pins_to_mask(self.in_pins)
+        self.io_mask = self.pins_to_mask(self.io_pins)
+        self.o_mask = self.pins_to_mask(self.o_pins)
+        self.f_mask = self.pins_to_mask(self.f_pins)
+        self.hiz_o_mask = self.pins_to_mask(self.hiz_o_pins)
+        self.q_mask = self.pins_to_mask(self.q_pins)
+        self.oe_h_mask = self.pins_to_mask(self.oe_h_pins)
+        self.oe_l_mask = self.pins_to_mask(self.oe_l_pins)
+
+        self.nc_mask = self.pins_to_mask(idx + 1 for idx, pin in enumerate(self.zif_map) if pin == 0)
+        self.gnd_mask = self.pins_to_mask(idx + 1 for idx, pin in enumerate(self.zif_map) if pin == 21)
+        self.pwr_mask = self.pins_to_mask(idx + 1 for idx, pin in enumerate(self.zif_map) if pin == 42)
 
         self.adapter_notes = adapter_notes
-        self.adapter_hi_pins = adapter_hi_pins
+        self.adapter_hi_pins = tuple(adapter_hi_pins)
 
         self.pin_rot_shift = pin_rot_shift
 
-        self.pin_names = self._build_pin_names(zif_map, in_pins, io_pins, o_pins, clk_pins, q_pins, oe_l_pins, oe_h_pins, pin_names_override)
+        self._pin_mappers = {}
+
+        self.pin_names_override = tuple(pin_names_override)
+        self.pin_names = tuple(self._build_pin_names(zif_map, in_pins, io_pins, o_pins, clk_pins, q_pins, oe_l_pins, oe_h_pins, pin_names_override))
 
         # Check the package
         tot_pins: int = sum(self.pins_per_side)
@@ -134,3 +192,36 @@ class ICDefinition:
         if len(self.pins_per_side) not in self._SUPPORTED_NUM_SIDES:
             raise ValueError(f'Number of sides {len(self.pins_per_side)} is not supported.')
 
+    @property
+    def signal_mask(self) -> int:
+        """Pins with a role, the ones that carry a signal"""
+        return (self.clk_mask | self.in_mask | self.io_mask | self.o_mask | self.f_mask | self.q_mask |
+                self.hiz_o_mask | self.oe_l_mask | self.oe_h_mask)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Mappers are keyed by board command classes, which may not be picklable, and are rebuilt on first use
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != '_pin_mappers'}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._pin_mappers = {}
+
+    def compile_pin_mapper(self, board_commands: 'type[BoardCommandsInterface]') -> PinMapper:
+        """
+        Get the lookup tables that map the pins of this IC on the ZIF socket of a board.
+        Tables are built on first use and cached for each board command class.
+
+        Args:
+            board_commands (type[BoardCommandsInterface]): command class of the board
+
+        Returns:
+            PinMapper: the compiled mapping
+        """
+        mapper: PinMapper | None = self._pin_mappers.get(board_commands)
+
+        if mapper is None:
+            mapper = PinMapper(self.zif_map, board_commands)
+            self._pin_mappers[board_commands] = mapper
+
+        return mapper
@@ -0,0 +1,178 @@
+"""This module contains the indexed library of IC definitions, backed by a cache of compiled definitions"""
+
+import hashlib
+import io
+import logging
+import os
+import pickle
+from typing import Any, NamedTuple, final
+
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.ic_loader import ICLoader
+
+class LibraryEntry(NamedTuple):
+    path: str # Relative to the library directory
+    mtime_ns: int
+    size: int
+    digest: bytes # SHA-1 of the file contents
+    name: str | None # None if the file is not a valid definition
+    pin_count: int
+    hw_model: int
+    compiled: bytes # Pickled ICDefinition
+
+@final
+class ICLibrary:
+    """
+    Index of the definitions found in a directory and its subdirectories, by IC name.
+
+    Parsed definitions are kept in a cache file. On every refresh only the files whose modification time or size changed
+    are read again, and only the ones whose contents changed are parsed again, so a large library opens quickly.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _CACHE_VERSION: int = 2
+    _EXTENSION: str = '.toml'
+
+    directory: str
+
+    _cache_path: str
+    _entries: dict[str, LibraryEntry]
+    _by_name: dict[str, LibraryEntry]
+    _by_file_name: dict[str, LibraryEntry]
+
+    def __init__(self, directory: str, cache_path: str | None = None) -> None:
+        """
+        Open a library and bring its index up to date
+
+        Args:
+            directory (str): directory containing the definitions
+            cache_path (str | None, optional): file where the index is cached. Defaults to one in the user cache directory.
+        """
+        if not os.path.isdir(directory):
+            raise ValueError(f'Definition library {directory} is not a directory')
+
+        self.directory = os.path.abspath(directory)
+        self._cache_path = cache_path if cache_path else self.default_cache_path(self.directory)
+        self._entries = {}
+        self._by_name = {}
+        self._by_file_name = {}
+
+        self.refresh()
+
+    @staticmethod
+    def default_cache_path(directory: str) -> str:
+        cache_home: str = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        dir_hash: str = hashlib.sha1(os.path.abspath(directory).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(cache_home, 'dppeeper', f'library-{dir_hash}.cache')
+
+    def _load_cache(self) -> dict[str, LibraryEntry]:
+        try:
+            with open(self._cache_path, 'rb') as cache_file:
+                cache: dict[str, Any] = pickle.load(cache_file)
+            if cache.get('version') == self._CACHE_VERSION and cache.get('directory') == self.directory:
+                return cache['entries']
+        except FileNotFoundError:
+            pass
+        except Exception as ex:
+            self._LOGGER.warning(f'Ignoring unreadable definition cache {self._cache_path}: {ex}')
+
+        return {}
+
+    def _save_cache(self) -> None:
+        tmp_path: str = self._cache_path + '.tmp'
+
+        try:
+            os.makedirs(os.path.dirname(self._cache_path), exist_ok=True)
+            with open(tmp_path, 'wb') as cache_file:
+                pickle.dump({'version': self._CACHE_VERSION, 'directory': self.directory, 'entries': self._entries}, cache_file)
+            os.replace(tmp_path, self._cache_path)
+        except OSError as ex:
+            self._LOGGER.warning(f'Unable to save the definition cache {self._cache_path}: {ex}')
+
+    def _scan(self, directory: str) -> list[os.DirEntry]:
+        found: list[os.DirEntry] = []
+
+        with os.scandir(directory) as dir_it:
+            for dir_entry in dir_it:
+                if dir_entry.is_dir():
+                    found.extend(self._scan(dir_entry.path))
+                elif dir_entry.is_file() and dir_entry.name.lower().endswith(self._EXTENSION):
+                    found.append(dir_entry)
+
+        return found
+
+    def _compile(self, rel_path: str, stat: os.stat_result, data: bytes, digest: bytes) -> LibraryEntry:
+        try:
+            ic_definition: ICDefinition = ICLoader.extract_definition_from_buffered_reader(io.BytesIO(data))
+        except Exception as ex:
+            self._LOGGER.warning(f'Skipping {rel_path}, not a valid definition: {ex}')
+            return LibraryEntry(rel_path, stat.st_mtime_ns, stat.st_size, digest, None, 0, 0, b'')
+
+        return LibraryEntry(rel_path, stat.st_mtime_ns, stat.st_size, digest, ic_definition.name, len(ic_definition.zif_map),
+                            ic_definition.hw_model, pickle.dumps(ic_definition))
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the files in the library directory"""
+        cached: dict[str, LibraryEntry] = self._load_cache()
+        entries: dict[str, LibraryEntry] = {}
+        changed: bool = False
+
+        for dir_entry in self._scan(self.directory):
+            rel_path: str = os.path.relpath(dir_entry.path, self.directory)
+            stat: os.stat_result = dir_entry.stat()
+            entry: LibraryEntry | None = cached.get(rel_path)
+
+            if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                with open(dir_entry.path, 'rb') as def_file:
+                    data: bytes = def_file.read()
+                digest: bytes = hashlib.sha1(data).digest()
+
+                if entry is not None and entry.digest == digest: # Touched, but not modified
+                    entry = entry._replace(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                else:
+                    self._LOGGER.debug(f'Compiling definition {rel_path}')
+                    entry = self._compile(rel_path, stat, data, digest)
+                changed = True
+
+            entries[rel_path] = entry
+
+        self._entries = entries
+        if changed or entries.keys() != cached.keys():
+            self._save_cache()
+
+        self._by_name = {}
+        self._by_file_name = {}
+        for rel_path in sorted(entries):
+            entry = entries[rel_path]
+            if entry.name is None:
+                continue
+
+            self._by_file_name.setdefault(os.path.splitext(os.path.basename(rel_path))[0].upper(), entry)
+
+            key: str = entry.name.upper()
+            if key in self._by_name:
+                self._LOGGER.warning(f'Definition {entry.name} in {rel_path} is shadowed by the one in {self._by_name[key].path}')
+            else:
+                self._by_name[key] = entry
+
+    def entries(self) -> list[LibraryEntry]:
+        """Valid definitions in the library, by name"""
+        return sorted(self._by_name.values(), key=lambda entry: entry.name or '')
+
+    def find(self, name: str) -> LibraryEntry | None:
+        """Look up a definition by IC name or, failing that, by file name without extension. Case insensitive."""
+        return self._by_name.get(name.upper()) or self._by_file_name.get(name.upper())
+
+    def load(self, name: str) -> ICDefinition:
+        """
+        Get a definition by IC name
+
+        Raises:
+            KeyError: if the library contains no definition with that name
+        """
+        entry: LibraryEntry | None = self.find(name)
+        if entry is None:
+            raise KeyError(f'No definition for {name} in library {self.directory}')
+
+        return pickle.loads(entry.compiled)
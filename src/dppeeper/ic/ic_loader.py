@@ -1,7 +1,6 @@
 """This class contains code to extract an IC definition from a properly formatted TOML file read from a BufferedReader"""
 
-from io import BufferedReader
-from typing import Any, final
+from typing import Any, BinaryIO, final
 from dppeeper.ic.ic_definition import ICDefinition
 
 import tomllib
@@ -30,7 +29,7 @@ class ICLoader:
     _KEY_REQUIREMENTS_HARDWARE: str = 'hardware'
 
     @classmethod
-    def extract_definition_from_buffered_reader(cls, filebuf: BufferedReader) -> ICDefinition:
+    def extract_definition_from_buffered_reader(cls, filebuf: BinaryIO) -> ICDefinition:
         toml_data: dict[str, Any] = tomllib.load(filebuf)
 
         return ICDefinition(name=toml_data[cls._KEY_NAME],
@@ -0,0 +1,67 @@
+"""This module contains the precompiled mapping between IC pins and ZIF socket pins"""
+
+from typing import TYPE_CHECKING, Sequence, final
+
+if TYPE_CHECKING:
+    from dupicolib.board_commands_interface import BoardCommandsInterface
+
+@final
+class PinMapper:
+    """
+    Lookup tables that translate a value in IC space (bit 0 is pin 1 of the IC) to the value to send to the board and back.
+    The tables are byte-wise: every byte of the value selects a precomputed mask, and the masks are OR-ed together.
+
+    The tables are built by asking the board command class how each single pin is mapped, so they match its
+    `map_value_to_pins` and `map_pins_to_value` for any value.
+    """
+
+    _MAX_ZIF_BITS: int = 64
+
+    _to_zif_tables: list[list[int]]
+    _to_ic_tables: list[list[int]]
+
+    @staticmethod
+    def _build_tables(bit_masks: list[int]) -> list[list[int]]:
+        tables: list[list[int]] = []
+
+        for byte_idx in range(0, len(bit_masks), 8):
+            byte_masks: list[int] = bit_masks[byte_idx:byte_idx + 8]
+            table: list[int] = [0] * 256
+            for val in range(1, 256):
+                low_bit: int = (val & -val).bit_length() - 1
+                # Every entry is the entry without its lowest bit, plus the mask for that bit
+                table[val] = table[val & (val - 1)] | (byte_masks[low_bit] if low_bit < len(byte_masks) else 0)
+            tables.append(table)
+
+        return tables
+
+    def __init__(self, zif_map: Sequence[int], board_commands: 'type[BoardCommandsInterface]') -> None:
+        ic_to_zif: list[int] = [board_commands.map_value_to_pins(zif_map, 1 << i) for i in range(len(zif_map))]
+
+        zif_bits: int = max([mask.bit_length() for mask in ic_to_zif] + [1])
+        if zif_bits > self._MAX_ZIF_BITS:
+            raise ValueError(f'Board maps pins over {zif_bits} bits, more than the supported {self._MAX_ZIF_BITS}')
+        zif_to_ic: list[int] = [board_commands.map_pins_to_value(zif_map, 1 << i) for i in range(zif_bits)]
+
+        self._to_zif_tables = self._build_tables(ic_to_zif)
+        self._to_ic_tables = self._build_tables(zif_to_ic)
+
+    def to_zif(self, value: int) -> int:
+        """Equivalent to `map_value_to_pins(zif_map, value)`"""
+        ret_val: int = 0
+
+        for table in self._to_zif_tables:
+            ret_val = ret_val | table[value & 0xFF]
+            value = value >> 8
+
+        return ret_val
+
+    def to_ic(self, value: int) -> int:
+        """Equivalent to `map_pins_to_value(zif_map, value)`"""
+        ret_val: int = 0
+
+        for table in self._to_ic_tables:
+            ret_val = ret_val | table[value & 0xFF]
+            value = value >> 8
+
+        return ret_val
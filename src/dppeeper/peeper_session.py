@@ -0,0 +1,364 @@
+"""This module contains the session that drives an IC through a board, independently from the UI"""
+
+import logging
+import time
+from array import array
+from typing import NamedTuple, Tuple, final
+
+import serial
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.pin_mapper import PinMapper
+from dppeeper.board.dump_file import DumpRecordKind
+from dppeeper.board.session_recorder import SessionRecorder
+from dppeeper.board.pin_pipeline import PinWritePipeline
+from dppeeper.board.hiz_detection import HiZCache, HiZCachePolicy, HiZDetector, HiZResult, HiZStrategy
+from dppeeper.board.osc_detection import OscDetector, OscPolicy
+from dppeeper.board.command_stats import CommandStats
+from dppeeper.board.board_daemon import DaemonClient
+
+class PinState(NamedTuple):
+    """State of the pins after an operation, bit 0 corresponds to pin 1 of the IC"""
+    read: int
+    hiz: int
+    osc: int
+
+class BurstResult(NamedTuple):
+    state: PinState # State after the last pulse, checked as after a single clock
+    reads: array | None # Pins read after every pulse, with the clock low, if captured
+
+@final
+class PeeperSession:
+    """
+    Operations on an IC plugged in a board: setting the pins, clocking and power cycling, with the Hi-Z and oscillation checks.
+    Values are in IC space: bit 0 corresponds to pin 1 of the IC.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    ic_definition: ICDefinition
+    board_commands: type[BoardCommandsInterface]
+    ser: serial.Serial | DaemonClient | None # A daemon client stands in for the port when the board is shared
+
+    _hiz_check_list: list[int]
+    _hiz_strategy: HiZStrategy
+    _hiz_cache: HiZCache | None
+    _osc_detector: OscDetector
+    _last_hiz: int # Hi-Z pins found by the last check
+
+    _always_high_mask: int
+    _pin_mapper: PinMapper
+
+    _pipeline: PinWritePipeline
+    _recorder: SessionRecorder | None
+    _power_delay: float
+    _stats: CommandStats | None
+
+    def __init__(self, ic_definition: ICDefinition, board_commands: type[BoardCommandsInterface], ser: serial.Serial | DaemonClient | None = None,
+                 check_hiz: bool = False, skip_hiz: list[int] = [], hiz_strategy: HiZStrategy = HiZStrategy.PER_PIN,
+                 recorder: SessionRecorder | None = None, power_delay: float = 0.5, stats: CommandStats | None = None,
+                 osc_policy: OscPolicy = OscPolicy(), hiz_cache: HiZCachePolicy = HiZCachePolicy()) -> None:
+        self.ic_definition = ic_definition
+        self.board_commands = board_commands
+        self.ser = ser
+
+        self._hiz_check_list = self._generate_hiz_check_list(ic_definition, skip_hiz) if check_hiz else []
+        self._hiz_strategy = hiz_strategy
+        self._hiz_cache = HiZCache(hiz_cache, self._hiz_key_mask(ic_definition)) if check_hiz and hiz_cache.size > 0 else None
+        self._osc_detector = OscDetector(osc_policy)
+        self._last_hiz = 0
+
+        self._always_high_mask = board_commands.map_value_to_pins(ic_definition.adapter_hi_pins, 0xFFFFFFFFFFFFFFFF)
+        self._pin_mapper = ic_definition.compile_pin_mapper(board_commands)
+
+        self._pipeline = PinWritePipeline(board_commands, ser)
+        self._recorder = recorder
+        self._power_delay = power_delay
+        self._stats = stats
+
+    @property
+    def hiz_check_list(self) -> list[int]:
+        return self._hiz_check_list
+
+    @property
+    def hiz_cache(self) -> HiZCache | None:
+        return self._hiz_cache
+
+    @property
+    def osc_policy(self) -> OscPolicy:
+        return self._osc_detector.policy
+
+    def write_val(self, val: int) -> int:
+        return self.write_vals([val])[0]
+
+    def write_vals(self, vals: list[int]) -> list[int]:
+        """
+        Write a list of values to the IC as a single pipelined batch
+
+        Args:
+            vals (list[int]): values to write, in IC space
+
+        Returns:
+            list[int]: values read back after each write, in IC space
+        """
+        to_zif = self._pin_mapper.to_zif
+        map_vals: list[int] = [to_zif(val) | self._always_high_mask for val in vals]
+
+        res_wrs: list[int | None] = self._pipeline.write_batch(map_vals)
+
+        res: list[int] = []
+        for val, res_wr in zip(vals, res_wrs):
+            if res_wr is None:
+                raise SystemError('Read from the dupico failed')
+
+            res_val: int = self._pin_mapper.to_ic(res_wr)
+            if self._recorder:
+                self._recorder.record(DumpRecordKind.WRITE, val, res_val)
+            res.append(res_val)
+
+        return res
+
+    def set_and_check_pins(self, val: int, preamble: list[int] = []) -> Tuple[int, int]:
+        """
+        Set the pins and check which of the candidate outputs are Hi-Z.
+
+        Args:
+            val (int): value to set, bit 0 corresponds to pin 1 of the IC
+            preamble (list[int], optional): values to write before setting the pins. Defaults to [].
+
+        Returns:
+            Tuple[int, int]: the value read back and the mask of Hi-Z pins
+        """
+        start: float = time.perf_counter()
+
+        cached_hiz: int | None = self._hiz_cache.lookup(val) if self._hiz_cache is not None and self._hiz_check_list else None
+        if cached_hiz is not None:
+            read: int = self.write_vals(preamble + [val])[-1]
+            self._record_operation('hiz_check', start)
+            self._last_hiz = cached_hiz
+            return (read, cached_hiz)
+
+        result: HiZResult = HiZDetector.detect(self._hiz_strategy, val, self._hiz_check_list, self.write_vals, preamble)
+        if self._hiz_check_list:
+            self._record_operation('hiz_check', start)
+
+        # Purge the pins that we detected being inputs, we don't want to check them again!!!
+        for pin in result.suspected_inputs:
+            self._LOGGER.warning(f'Removing pin {pin} from list of potential hi-z pins: triggered changes in other pins, probably an input!')
+            self._hiz_check_list.remove(pin)
+
+        if self._hiz_cache is not None:
+            if result.suspected_inputs: # Cached results include pins that are not checked anymore
+                self._hiz_cache.invalidate()
+            self._hiz_cache.store(val, result.hiz)
+
+        self._last_hiz = result.hiz
+        return (result.read, result.hiz)
+
+    def _scan_osc_pins(self, reads: int, record: bool = True) -> int:
+        osc_pins: int | None = self.board_commands.detect_osc_pins(reads, self.ser)
+
+        if osc_pins is None:
+            raise SystemError('Read from the dupico failed')
+
+        osc: int = self._pin_mapper.to_ic(osc_pins)
+        if self._recorder and record:
+            self._recorder.record(DumpRecordKind.OSC, 0, osc=osc)
+
+        return osc
+
+    def check_osc_pins(self, written: int | None = None, read: int | None = None, record: bool = True) -> int:
+        """
+        Find the oscillating pins, following the oscillation policy of the session
+
+        Args:
+            written (int | None, optional): value last written, lets the policy skip states already scanned. Defaults to None.
+            read (int | None, optional): value read back after the write. Defaults to None.
+            record (bool, optional): record the scans, if the session is recorded. Defaults to True.
+        """
+        if self._osc_detector.can_skip(written, read):
+            return 0
+
+        start: float = time.perf_counter()
+        osc: int = self._osc_detector.detect(lambda reads: self._scan_osc_pins(reads, record), written, read)
+        self._record_operation('osc_check', start)
+
+        return osc
+
+    def refresh_osc(self, written: int, state: PinState) -> PinState:
+        """
+        Complete a state obtained without the oscillation check, see `set_pins`.
+        Must be called before any other write to the pins.
+        """
+        osc: int = self.check_osc_pins(written, state.read)
+
+        if self._recorder:
+            self._recorder.record(DumpRecordKind.RESULT, written, state.read, state.hiz, osc)
+
+        return state._replace(osc=osc)
+
+    def _record_operation(self, name: str, start: float) -> None:
+        if self._stats is not None:
+            self._stats.record_operation(name, time.perf_counter() - start)
+
+    def set_pins(self, val: int, check_osc: bool = True) -> PinState:
+        """
+        Set the pins, then read the state
+
+        Args:
+            val (int): value to set, bit 0 corresponds to pin 1 of the IC
+            check_osc (bool, optional): if False the oscillating pins are left empty, to be completed later with `refresh_osc`. Defaults to True.
+        """
+        self._LOGGER.debug(f'Setting {val:0{16}X}')
+        start: float = time.perf_counter()
+
+        read, hiz = self.set_and_check_pins(val)
+        state: PinState = PinState(read, hiz, 0)
+        if check_osc:
+            state = self.refresh_osc(val, state)
+
+        self._record_operation('set', start)
+        return state
+
+    def poll(self, val: int) -> PinState:
+        """
+        Write the value once more and read the state, to watch pins changing on their own. The Hi-Z pins are the ones found
+        by the last check, which is not repeated, and the oscillating pins are checked following the policy.
+        Polls are not recorded as results, nor are their oscillation scans.
+
+        Args:
+            val (int): value last set, bit 0 corresponds to pin 1 of the IC
+        """
+        start: float = time.perf_counter()
+
+        read: int = self.write_val(val)
+        state: PinState = PinState(read, self._last_hiz, self.check_osc_pins(val, read, record=False))
+
+        self._record_operation('poll', start)
+        return state
+
+    def clock(self, val: int, pin: int, check_osc: bool = True) -> PinState:
+        """
+        Pulse a clock pin low-high-low, then read the state
+
+        Args:
+            val (int): value of the other pins, the clock pin is forced low
+            pin (int): clock pin, 1-based
+            check_osc (bool, optional): if False the oscillating pins are left empty, see `set_pins`. Defaults to True.
+        """
+        self._LOGGER.debug(f'Toggling clock {pin}')
+        start: float = time.perf_counter()
+
+        set_val: int = val & ~(1 << (pin - 1))
+        set_val_clk: int = set_val | (1 << (pin - 1))
+
+        if self._recorder:
+            self._recorder.record(DumpRecordKind.CLOCK, pin)
+        if self._hiz_cache is not None:
+            self._hiz_cache.invalidate() # The output enables may depend on the registers
+        read, hiz = self.set_and_check_pins(set_val, [set_val, set_val_clk])
+        self._osc_detector.invalidate() # The registers may have changed
+
+        state: PinState = PinState(read, hiz, 0)
+        if check_osc:
+            state = self.refresh_osc(set_val, state)
+
+        self._record_operation('clock', start)
+        return state
+
+    def clock_burst(self, val: int, pin: int, count: int, check_osc: bool = True, capture: bool = False, batch_size: int = 1024) -> BurstResult:
+        """
+        Pulse a clock pin `count` times. All the pulses but the last are sent as pipelined batches, without the Hi-Z and
+        oscillation checks, the state after the last one is checked as `clock` does.
+
+        Args:
+            val (int): value of the other pins, the clock pin is forced low
+            pin (int): clock pin, 1-based
+            count (int): number of pulses
+            check_osc (bool, optional): if False the oscillating pins are left empty, see `set_pins`. Defaults to True.
+            capture (bool, optional): keep the pins read after every pulse. Defaults to False.
+            batch_size (int, optional): most pulses sent in a single batch. Defaults to 1024.
+        """
+        if count < 1:
+            raise ValueError('A burst needs at least one pulse')
+
+        self._LOGGER.debug(f'Toggling clock {pin} {count} times')
+        start: float = time.perf_counter()
+
+        set_val: int = val & ~(1 << (pin - 1))
+        set_val_clk: int = set_val | (1 << (pin - 1))
+        reads: array | None = array('Q') if capture else None
+
+        if self._hiz_cache is not None:
+            self._hiz_cache.invalidate() # The output enables may depend on the registers
+
+        preamble: list[int] = [set_val, set_val_clk]
+        remaining: int = count - 1
+        while remaining > 0:
+            pulses: int = min(remaining, batch_size)
+            if self._recorder:
+                for _ in range(pulses):
+                    self._recorder.record(DumpRecordKind.CLOCK, pin)
+
+            batch_reads: list[int] = self.write_vals(preamble[:-1] + [set_val_clk, set_val] * pulses)
+            if reads is not None:
+                reads.extend(batch_reads[len(preamble):][::2])
+
+            preamble = [set_val_clk]
+            remaining = remaining - pulses
+
+        if self._recorder:
+            self._recorder.record(DumpRecordKind.CLOCK, pin)
+        read, hiz = self.set_and_check_pins(set_val, preamble)
+        self._osc_detector.invalidate() # The registers may have changed
+        if reads is not None:
+            reads.append(read)
+
+        state: PinState = PinState(read, hiz, 0)
+        if check_osc:
+            state = self.refresh_osc(set_val, state)
+
+        self._record_operation('clock_burst', start)
+        return BurstResult(state, reads)
+
+    def set_power(self, state: bool) -> None:
+        self.board_commands.set_power(state, self.ser)
+        if self._recorder:
+            self._recorder.record(DumpRecordKind.POWER, 1 if state else 0)
+
+    def restart_power(self) -> None:
+        """Power the IC off and on again, leaving the pins as they are"""
+        self.set_power(False)
+        time.sleep(self._power_delay)
+        self.set_power(True)
+        time.sleep(self._power_delay)
+
+        self._osc_detector.invalidate()
+        if self._hiz_cache is not None:
+            self._hiz_cache.invalidate()
+
+    def power_cycle(self, val: int) -> PinState:
+        self._LOGGER.debug('Power cycling IC')
+        start: float = time.perf_counter()
+
+        # Write the last data before powercycling
+        self.set_pins(val)
+        self.restart_power()
+
+        state: PinState = self.set_pins(val)
+        self._record_operation('power_cycle', start)
+        return state
+
+    @staticmethod
+    def _hiz_key_mask(ic_definition: ICDefinition) -> int:
+        # Every pin that can be an input or feed back into the array can drive an output enable
+        return (ic_definition.in_mask | ic_definition.io_mask | ic_definition.clk_mask | ic_definition.oe_l_mask | ic_definition.oe_h_mask |
+                ic_definition.hiz_o_mask | ic_definition.q_mask | ic_definition.f_mask)
+
+    @staticmethod
+    def _generate_hiz_check_list(ic_definition: ICDefinition, skip_hiz: list[int] = []) -> list[int]:
+        check_mask: int = ic_definition.hiz_o_mask & ~ICDefinition.pins_to_mask(skip_hiz)
+
+        return [pin for pin in range(1, len(ic_definition.zif_map) + 1) if (check_mask >> (pin - 1)) & 0x01]
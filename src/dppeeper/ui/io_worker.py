@@ -0,0 +1,138 @@
+"""This module contains the worker that runs board operations away from the Tk mainloop"""
+
+import logging
+import queue
+import threading
+from typing import Any, Callable, NamedTuple, final
+
+from tkinter import Misc
+
+class _Job(NamedTuple):
+    key: str | None
+    work: Callable[[], Any]
+    on_done: Callable[[Any], None] | None
+    on_error: Callable[[Exception], None] | None
+    background: bool
+
+@final
+class IOWorker:
+    """
+    Runs board operations on a dedicated thread, one at a time and in order.
+    Results are handed back to the Tk thread by polling with `after()`, as Tk must only be used from its own thread.
+
+    Jobs submitted with a key replace the last pending job if it has the same key, so a burst of requests
+    for the same operation (e.g. SET clicked repeatedly) results in a single transaction with the latest state.
+
+    Background jobs (e.g. refreshing a state that was already shown) run only when no other job is waiting,
+    and are dropped as soon as another job is submitted, as they refer to a state that is about to change.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _POLL_INTERVAL_MS: int = 15
+
+    _widget: Misc
+    _pending: list[_Job]
+    _lock: threading.Condition
+    _results: queue.SimpleQueue[tuple[_Job, Any, Exception | None]]
+    _thread: threading.Thread
+    _running: bool
+    _busy: bool
+    _poll_id: str | None
+
+    def __init__(self, widget: Misc) -> None:
+        self._widget = widget
+        self._pending = []
+        self._lock = threading.Condition()
+        self._results = queue.SimpleQueue()
+        self._running = True
+        self._busy = False
+        self._poll_id = None
+
+        self._thread = threading.Thread(target=self._worker_loop, name='IOWorker', daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """True if a job is running or waiting to run"""
+        with self._lock:
+            return self._busy or bool(self._pending)
+
+    def submit(self, work: Callable[[], Any], on_done: Callable[[Any], None] | None = None, key: str | None = None, on_error: Callable[[Exception], None] | None = None,
+               background: bool = False) -> None:
+        """
+        Queue a job. Must be called from the Tk thread.
+
+        Args:
+            work (Callable[[], Any]): the operation to run on the worker thread
+            on_done (Callable[[Any], None] | None, optional): called on the Tk thread with the result. Defaults to None.
+            key (str | None, optional): jobs with the same key are coalesced while pending. Defaults to None.
+            on_error (Callable[[Exception], None] | None, optional): called on the Tk thread if the job fails. Defaults to logging the error.
+            background (bool, optional): low priority job, dropped if another job is submitted before it starts. Defaults to False.
+        """
+        job: _Job = _Job(key, work, on_done, on_error, background)
+
+        with self._lock:
+            if not self._running:
+                return
+
+            if not background and any(pending.background for pending in self._pending):
+                self._LOGGER.debug('Dropping pending background jobs')
+                self._pending = [pending for pending in self._pending if not pending.background]
+
+            if key is not None and self._pending and self._pending[-1].key == key:
+                self._LOGGER.debug(f'Coalescing pending "{key}" job')
+                self._pending[-1] = job
+            else:
+                self._pending.append(job)
+            self._lock.notify()
+
+        if self._poll_id is None:
+            self._poll_id = self._widget.after(self._POLL_INTERVAL_MS, self._poll_results)
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._lock:
+                while self._running and not self._pending:
+                    self._lock.wait()
+                if not self._running:
+                    return
+                job: _Job = self._pending.pop(0)
+                self._busy = True
+
+            try:
+                self._results.put((job, job.work(), None))
+            except Exception as ex:
+                self._results.put((job, None, ex))
+            finally:
+                with self._lock:
+                    self._busy = False
+
+    def _poll_results(self) -> None:
+        self._poll_id = None
+
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            if error is not None:
+                if job.on_error:
+                    job.on_error(error)
+                else:
+                    self._LOGGER.error(f'Board operation failed: {error}')
+            elif job.on_done:
+                job.on_done(result)
+
+        if self._running and (self.busy or not self._results.empty()):
+            self._poll_id = self._widget.after(self._POLL_INTERVAL_MS, self._poll_results)
+
+    def stop(self, timeout: float | None = 10.0) -> None:
+        """Stop the worker after the job in progress, dropping pending ones"""
+        with self._lock:
+            self._running = False
+            self._pending.clear()
+            self._lock.notify()
+
+        self._thread.join(timeout)
@@ -0,0 +1,200 @@
+"""This module contains the live mode of the UI, reading the pins continuously"""
+
+import logging
+import time
+from typing import Callable, NamedTuple, final
+
+from tkinter import Misc
+
+from dppeeper.peeper_session import PinState
+from dppeeper.ui.io_worker import IOWorker
+
+class LivePolicy(NamedTuple):
+    rate: float = 10.0 # Reads per second when the link keeps up
+    max_interval: float = 2.0 # Longest wait between reads, in seconds, when backing off
+    duty: float = 0.5 # Largest fraction of the time the link is kept busy by the reads
+    frame_ms: int = 16 # Shortest interval between updates of the window
+
+@final
+class PollBackoff:
+    """
+    Interval between the reads of the live mode. Reads that take longer than the policy's duty of the interval
+    (e.g. an oscillation scan, or a slow link) stretch it, as do user operations competing for the link.
+    The interval shrinks back, halving at every quick read, once the link keeps up.
+    """
+
+    interval: float
+
+    _policy: LivePolicy
+
+    def __init__(self, policy: LivePolicy = LivePolicy()) -> None:
+        if policy.rate <= 0 or not 0 < policy.duty <= 1:
+            raise ValueError('Live mode needs a positive rate and a duty between 0 and 1')
+
+        self._policy = policy
+        self.interval = 1 / policy.rate
+
+    def update(self, elapsed: float, contended: bool = False) -> float:
+        """
+        Adapt the interval after a read
+
+        Args:
+            elapsed (float): time taken by the read, in seconds
+            contended (bool, optional): the read was skipped, as other operations were waiting for the link. Defaults to False.
+
+        Returns:
+            float: time to wait before the next read, in seconds
+        """
+        max_interval: float = max(self._policy.max_interval, 1 / self._policy.rate)
+
+        if contended:
+            self.interval = min(max_interval, self.interval * 2)
+            return self.interval
+
+        needed: float = elapsed / self._policy.duty
+        if needed > self.interval:
+            self.interval = min(max_interval, max(needed, self.interval * 2))
+        else:
+            self.interval = max(1 / self._policy.rate, needed, self.interval / 2)
+
+        return max(0.0, self.interval - elapsed)
+
+@final
+class LiveRefresh:
+    """
+    Reads the state of the pins over and over through the I/O worker, only while no other operation is waiting for it,
+    so a click is never queued behind more than one read. The reads are paced by a `PollBackoff`.
+
+    States are handed to the window at most once per frame: when reads come faster, only the latest one is shown,
+    and states equal to the one shown are not handed over at all.
+    """
+
+    _LOGGER = logging.getLogger(__name__)
+
+    _widget: Misc
+    _io_worker: IOWorker
+    _read: Callable[[], PinState]
+    _apply: Callable[[PinState], None]
+    _on_failure: Callable[[Exception], None] | None
+    _policy: LivePolicy
+    _backoff: PollBackoff
+
+    _running: bool
+    _in_flight: bool
+    _poll_id: str | None
+    _frame_id: str | None
+    _latest: PinState | None
+    _applied: PinState | None
+    _last_frame: float
+
+    def __init__(self, widget: Misc, io_worker: IOWorker, read: Callable[[], PinState], apply: Callable[[PinState], None], policy: LivePolicy = LivePolicy(),
+                 on_failure: Callable[[Exception], None] | None = None) -> None:
+        """
+        Args:
+            widget (Misc): widget used to schedule the reads and the updates on the Tk thread
+            io_worker (IOWorker): worker running the board operations
+            read (Callable[[], PinState]): reads the state, run on the worker thread
+            apply (Callable[[PinState], None]): shows a state, run on the Tk thread
+            policy (LivePolicy, optional): rates of the reads and of the updates. Defaults to LivePolicy().
+            on_failure (Callable[[Exception], None] | None, optional): called on the Tk thread when a read fails, which stops the live mode. Defaults to None.
+        """
+        self._widget = widget
+        self._io_worker = io_worker
+        self._read = read
+        self._apply = apply
+        self._on_failure = on_failure
+        self._policy = policy
+        self._backoff = PollBackoff(policy)
+
+        self._running = False
+        self._in_flight = False
+        self._poll_id = None
+        self._frame_id = None
+        self._latest = None
+        self._applied = None
+        self._last_frame = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def interval(self) -> float:
+        """Current interval between the reads, in seconds"""
+        return self._backoff.interval
+
+    def start(self) -> None:
+        if self._running:
+            return
+
+        self._LOGGER.debug(f'Live mode started at {self._policy.rate} reads/s')
+        self._running = True
+        self._backoff = PollBackoff(self._policy)
+        self._schedule_poll(0.0)
+
+    def stop(self) -> None:
+        self._running = False
+        for after_id in (self._poll_id, self._frame_id):
+            if after_id is not None:
+                self._widget.after_cancel(after_id)
+        self._poll_id = None
+        self._frame_id = None
+
+    def shown(self, state: PinState) -> None:
+        """Tell that the window shows a state obtained by another operation, so an equal read is not handed over again"""
+        self._applied = state
+
+    def _schedule_poll(self, delay: float) -> None:
+        self._poll_id = self._widget.after(int(delay * 1000), self._poll)
+
+    def _poll(self) -> None:
+        self._poll_id = None
+        if not self._running or self._in_flight:
+            return
+
+        if self._io_worker.busy:
+            self._schedule_poll(self._backoff.update(0.0, contended=True))
+            return
+
+        def timed_read() -> tuple[PinState, float]:
+            start: float = time.perf_counter()
+            return (self._read(), time.perf_counter() - start)
+
+        self._in_flight = True
+        self._io_worker.submit(timed_read, self._read_done, key='live', on_error=self._read_failed)
+
+    def _read_done(self, result: tuple[PinState, float]) -> None:
+        self._in_flight = False
+        state, elapsed = result
+
+        if not self._running:
+            return
+
+        self._latest = state
+        if self._frame_id is None:
+            wait: float = self._policy.frame_ms / 1000 - (time.monotonic() - self._last_frame)
+            if wait > 0:
+                self._frame_id = self._widget.after(int(wait * 1000), self._show_latest)
+            else:
+                self._show_latest()
+
+        self._schedule_poll(self._backoff.update(elapsed))
+
+    def _read_failed(self, error: Exception) -> None:
+        self._in_flight = False
+        self._LOGGER.error(f'Live read failed, stopping the live mode: {error}')
+        self.stop()
+        if self._on_failure is not None:
+            self._on_failure(error)
+
+    def _show_latest(self) -> None:
+        self._frame_id = None
+        state: PinState | None = self._latest
+        self._latest = None
+
+        if state is None or state == self._applied or not self._running:
+            return
+
+        self._last_frame = time.monotonic()
+        self._applied = state
+        self._apply(state)
@@ -1,31 +1,34 @@
 """This module contains code for the main window"""
 
 import logging
-from typing import Callable, Tuple
-import time
+from typing import Callable, Sequence
 
-from tkinter import BOTH, CENTER, LEFT, RAISED, TOP, X, IntVar, ttk
-from tkinter.ttk import Frame, Checkbutton, Label, Button
-
-import serial
+from tkinter import BOTH, CENTER, LEFT, RAISED, TOP, X, IntVar, StringVar, ttk
+from tkinter.ttk import Frame, Checkbutton, Label, Button, Spinbox
 
 from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.peeper_session import PeeperSession, PinState
 from dppeeper.ui.ui_utilities import UIUtilities, UIPinGridType
-from dupicolib.board_commands_interface import BoardCommandsInterface
+from dppeeper.ui.io_worker import IOWorker
+from dppeeper.ui.live_refresh import LivePolicy, LiveRefresh
 
 class MainWin(Frame):
     _ic_definition: ICDefinition
-    _board_commands: type[BoardCommandsInterface]
-
-    _hiz_check_list: list[int]
-
-    _always_high_mask: int
-
-    _ser: serial.Serial | None
+    _session: PeeperSession
+    _io_worker: IOWorker
+    _live: LiveRefresh
+    _live_var: IntVar
+    _burst_var: StringVar # Pulses sent by the clock buttons
     
     _checkb_states: dict[int, IntVar]
     _pin_state_labels: dict[int, Label]
 
+    # What is currently shown, as bitmasks where bit 0 corresponds to pin 1 of the IC
+    _set_val: int
+    _written_val: int # Last value sent by an operation, read again by the live mode
+    _shown_state: PinState
+    _labels_mask: int
+
     _LOGGER = logging.getLogger(__name__)
 
     _IC_NAME_LABEL_STYLE = 'ICNAME.TLabel'
@@ -40,25 +43,31 @@ class MainWin(Frame):
     _RESET_BUTTON_STYLE = 'RESET.TButton'
     _CLK_BUTTON_STYLE = 'CLK.TButton'
 
-    def __init__(self, ic_definition: ICDefinition, board_commands: type[BoardCommandsInterface], check_hiz: bool = False, skip_hiz: list[int] = [],  ser: serial.Serial | None = None) -> None:
+    def __init__(self, session: PeeperSession, live_policy: LivePolicy = LivePolicy(), live: bool = False) -> None:
         super().__init__()
 
-        self._ic_definition = ic_definition
-        self._board_commands = board_commands
-        self._ser = ser
-
-        self._hiz_check_list = self._generate_hiz_check_list(ic_definition, skip_hiz) if check_hiz else []
+        self._session = session
+        self._ic_definition = session.ic_definition
+        self._io_worker = IOWorker(self)
+        self._live = LiveRefresh(self, self._io_worker, self._live_read, self._apply_state, live_policy, on_failure=lambda ex: self._live_var.set(0))
+        self._live_var = IntVar(value=1 if live else 0)
+        self._burst_var = StringVar(value='1')
 
         self._checkb_states = {}
         self._pin_state_labels = {}
 
-        self._always_high_mask = self._board_commands.map_value_to_pins(self._ic_definition.adapter_hi_pins, 0xFFFFFFFFFFFFFFFF)
+        self._set_val = 0
+        self._written_val = 0
+        self._shown_state = PinState(0, 0, 0) # Labels are created with the LO style
+        self._labels_mask = 0
 
         self.buildStyles()
         self.initUI()
 
         # Send the first command to read the state
         self._cmd_set()
+        if live:
+            self._live.start()
 
     def buildStyles(self) -> None:
         style = ttk.Style()
@@ -118,16 +127,18 @@ class MainWin(Frame):
                 # Save the labels that represent the state of pins, we're also saving GND and power pins, to make sure
                 # the index value for the label matches the pin number
                 self._pin_state_labels[i] = gen_lbl
+                self._labels_mask = self._labels_mask | (1 << i)
                 
                 # Save the variables that store the state for checkboxes
                 # All this fuckery with the empty label is to try and slightly
                 # center checkbuttons that are organized horizontally
                 chkb_var: IntVar = IntVar(value=0)
+                chkb_var.trace_add('write', self._build_checkb_trace(i, chkb_var))
                 self._checkb_states[i] = chkb_var
                 inner_grid_frame = Frame(grid_frame) # Use an inner frame to put a dummy label and the checkbutton in
                 empty_label = Label(inner_grid_frame, text='')
                 empty_label.pack(anchor=CENTER, side=LEFT, padx=1)
-                gen_chk = Checkbutton(inner_grid_frame, text='', takefocus=False, variable=chkb_var, state=('disabled' if (i+1) in self._ic_definition.clk_pins and (i+1) not in self._ic_definition.in_pins else 'normal'))
+                gen_chk = Checkbutton(inner_grid_frame, text='', takefocus=False, variable=chkb_var, state=('disabled' if ((self._ic_definition.clk_mask & ~self._ic_definition.in_mask) >> i) & 0x01 else 'normal'))
                 gen_chk.pack(anchor=CENTER, side=LEFT)
                 inner_grid_frame.grid(row=c_y, column=c_x)
 
@@ -142,6 +153,12 @@ class MainWin(Frame):
             clk_button = Button(clock_button_frame, text=f'Clock {clk_pin}', command=command, style=self._CLK_BUTTON_STYLE)
             clk_button.pack(anchor=CENTER, side=LEFT, padx=5, pady=5)
 
+        if self._ic_definition.clk_pins:
+            burst_label = Label(clock_button_frame, text='x')
+            burst_label.pack(anchor=CENTER, side=LEFT, padx=(5, 0), pady=5)
+            burst_spin = Spinbox(clock_button_frame, from_=1, to=65535, width=6, textvariable=self._burst_var)
+            burst_spin.pack(anchor=CENTER, side=LEFT, padx=5, pady=5)
+
         control_button_frame = Frame(button_frame)
         control_button_frame.pack(side=TOP, anchor=CENTER)
 
@@ -154,130 +171,90 @@ class MainWin(Frame):
         pcycle_button = Button(control_button_frame, text='P.CYCLE', style=self._RESET_BUTTON_STYLE, command=self._cmd_powercycle)
         pcycle_button.pack(anchor=CENTER, side=LEFT, padx=5, pady=5)
 
+        live_check = Checkbutton(control_button_frame, text='LIVE', takefocus=False, variable=self._live_var, command=self._cmd_live)
+        live_check.pack(anchor=CENTER, side=LEFT, padx=5, pady=5)
 
-        self.pack(fill=BOTH, expand=1)
-
-    def _set_and_check_pins(self, val: int) -> Tuple[int, int]:
-        hiz_pins: int = 0
-        hiz_pins_to_remove: list[int] = []
-
-        hiz_mask: int = self._build_hiz_mask(self._hiz_check_list)
-        ret: int = self._write_val(val)
-
-        # The pins we are currently setting between those we need to check for hiz
-        toggled_hiz_pins: int = val & hiz_mask
-
-        # The inverse of the same pins, we will use this to check if they follow our pulls or not
-        rev_toggled_hiz_pins: int = (~toggled_hiz_pins) & hiz_mask
-
-        for pin in self._hiz_check_list:
-            pin_mask: int = 1 << (pin - 1)
-            # Invert the corresponding pin
-            wr_val: int = (val & ~pin_mask) | (rev_toggled_hiz_pins & pin_mask)
-            ret_chk = self._write_val(wr_val)
-            self._write_val(val)
-            
-            changed_pins: int = ret ^ ret_chk
-            if changed_pins == pin_mask: # The only pin that changed is the one we are checking. It's hi-z
-                hiz_pins = hiz_pins | pin_mask
-            elif changed_pins != 0: # One or more pins have changed, but it is not our checked pin, means we might have toggled an input!!!
-                hiz_pins_to_remove.append(pin)
 
-        # Purge the pins that we detected being inputs, we don't want to check them again!!!
-        for pin in hiz_pins_to_remove:
-            self._LOGGER.warning(f'Removing pin {pin} from list of potential hi-z pins: triggered changes in other pins, probably an input!')
-            self._hiz_check_list.remove(pin)
-
-        return (ret, hiz_pins)
+        self.pack(fill=BOTH, expand=1)
 
-    @staticmethod
-    def _build_hiz_mask(hiz_pins: list[int]) -> int:
-        mask: int = 0
+    def _update_labels(self, read_val: int, hiz_val: int, osc_val: int) -> None:
+        """
+        Update the state labels of the pins whose state changed since the last update
 
-        for i in hiz_pins:
-            mask = mask | (1 << (i-1))
+        Args:
+            read_val (int): value read from the dupico, already remapped (e.g. bit 0 corresponds to pin 1 of the IC)
+            hiz_val (int): if a bit is 1 in this map, it means the pin is hi-z
+            osc_val (int): if a bit is 1 in this map, it means the pin is oscillating between high and low
+        """
+        new_state: PinState = PinState(read_val, hiz_val, osc_val)
+
+        for k in UIUtilities.changedBits(self._shown_state, new_state, self._labels_mask):
+            if (hiz_val >> k) & 0x01:
+                self._pin_state_labels[k].configure(style=self._Z_LABEL_STYLE)
+            elif (osc_val >> k) & 0x01:
+                self._pin_state_labels[k].configure(style=self._OSC_LABEL_STYLE)
+            elif (read_val >> k) & 0x01:
+                self._pin_state_labels[k].configure(style=self._HI_LABEL_STYLE)
+            else:
+                self._pin_state_labels[k].configure(style=self._LO_LABEL_STYLE)
 
-        return mask
+        self._shown_state = new_state
 
-    def _write_val(self, val: int) -> int:
-        map_val: int = self._board_commands.map_value_to_pins(self._ic_definition.zif_map, val)
-        map_val = map_val | self._always_high_mask
+    def _build_checkb_trace(self, idx: int, var: IntVar) -> Callable[[str, str, str], None]:
+        def checkb_changed(*args: str) -> None:
+            if var.get():
+                self._set_val = self._set_val | (1 << idx)
+            else:
+                self._set_val = self._set_val & ~(1 << idx)
 
-        res_wr: int | None = self._board_commands.write_pins(map_val, self._ser)
-        if res_wr is None:
-            raise SystemError('Read from the dupico failed')
+        return checkb_changed
 
-        return self._board_commands.map_pins_to_value(self._ic_definition.zif_map, res_wr)
-    
-    def _check_osc_pins(self) -> int:
-        osc_pins: int | None = self._board_commands.detect_osc_pins(255, self._ser)
+    def _build_set_value(self) -> int:
+        return self._set_val
 
-        if osc_pins is None:
-            raise SystemError('Read from the dupico failed')
+    def _apply_state(self, state: PinState) -> None:
+        self._update_labels(*state)
+        self._live.shown(state)
 
-        return self._board_commands.map_pins_to_value(self._ic_definition.zif_map, osc_pins)
+    def _live_read(self) -> PinState:
+        # Runs on the worker: writing the same value again reads the pins without changing them
+        return self._session.poll(self._written_val)
 
-    def _update_labels(self, read_val: int, hiz_val: int, osc_val: int) -> None:
+    def _submit_operation(self, written: int, operation: Callable[[bool], PinState], key: str | None = None) -> None:
         """
-        Update the state labels of each pin according to the value read
+        Run an operation taking the check_osc flag on the worker. If the oscillation check is deferred, the levels are shown
+        first, keeping the oscillating pins of the previous state, and the check follows as a background refresh.
+        """
+        deferred: bool = self._session.osc_policy.deferred
 
-        Args:
-            read_val (int): value read from the dupico, already remapped (e.g. bit 0 corresponds to pin 1 of the IC)
-            hiz_val (int): if a bit is 1 in this map, it means the pin is hi-z
-            osc_val (int): if a bit is 1 in this map, it means the pin is oscillating between high and low
-        """        
-        for k,v in self._pin_state_labels.items():
-            state: bool = ((read_val >> k) & 0x01) == 1
-            hiz: bool = ((hiz_val >> k) & 0x01) == 1
-            osc: bool = ((osc_val >> k) & 0x01) == 1
-
-            if hiz:
-                v.configure(style=self._Z_LABEL_STYLE)
-            elif osc:
-                v.configure(style=self._OSC_LABEL_STYLE)
-            elif state:
-                v.configure(style=self._HI_LABEL_STYLE)
-            else:
-                v.configure(style=self._LO_LABEL_STYLE)
-            
-    def _build_set_value(self) -> int:
-        val: int = 0
+        def operation_done(state: PinState) -> None:
+            if not deferred:
+                self._apply_state(state)
+                return
 
-        for k,v in self._checkb_states.items():
-            if bool(v.get()):
-                val = val | (1 << k)
+            self._apply_state(state._replace(osc=self._shown_state.osc))
+            self._io_worker.submit(lambda: self._session.refresh_osc(written, state), self._apply_state, key='osc', background=True)
 
-        return val
+        self._io_worker.submit(lambda: operation(not deferred), operation_done, key=key)
 
     def _cmd_set(self) -> None:
-        read: int; hiz: int; osc: int
-
         set_val: int = self._build_set_value()
-        
-        self._LOGGER.debug(f'Setting {set_val:0{16}X}')
-        
-        read, hiz = self._set_and_check_pins(set_val)
-        osc = self._check_osc_pins()
+        self._written_val = set_val
 
-        self._update_labels(read, hiz, osc)
+        # Pending SETs are coalesced: only the latest state of the checkboxes gets written
+        self._submit_operation(set_val, lambda check_osc: self._session.set_pins(set_val, check_osc), key='set')
 
     def _cmd_powercycle(self) -> None:
-        self._LOGGER.debug('Power cycling IC')
-        
-        # Write the last data before powercycling
-        self._cmd_set()
+        set_val: int = self._build_set_value()
+        self._written_val = set_val
 
-        self._board_commands.set_power(False, self._ser)
-        time.sleep(0.5)
-        self._board_commands.set_power(True, self._ser)
-        time.sleep(0.5)
-        self._cmd_set()
+        self._io_worker.submit(lambda: self._session.power_cycle(set_val), self._apply_state)
 
     def _cmd_clear(self) -> None:
         self._LOGGER.debug('Clearing all the pins')
 
-        for _,v in self._checkb_states.items():
-            v.set(0)
+        for k in UIUtilities.changedBits((self._set_val,), (0,)):
+            self._checkb_states[k].set(0)
 
         self._cmd_set()
 
@@ -289,32 +266,37 @@ class MainWin(Frame):
 
 
     def _cmd_clock(self, pin: int) -> None:
-        self._LOGGER.debug(f'Toggling clock {pin}')
-        
-        read: int; hiz: int; osc: int
-
         # Start with clearing the pin checkbox we'll use for the clock
         self._checkb_states[pin - 1].set(0)
 
         set_val: int = self._build_set_value()
-        set_val_clk: int = set_val | (1 << (pin - 1))
-
-        self._write_val(set_val)
-        self._write_val(set_val_clk)
-        read, hiz = self._set_and_check_pins(set_val)
+        self._written_val = set_val
+
+        count: int = self._burst_count()
+        if count > 1:
+            # Only the state after the last pulse is shown
+            self._submit_operation(set_val, lambda check_osc: self._session.clock_burst(set_val, pin, count, check_osc).state)
+        else:
+            self._submit_operation(set_val, lambda check_osc: self._session.clock(set_val, pin, check_osc))
+
+    def _burst_count(self) -> int:
+        try:
+            return max(1, int(self._burst_var.get()))
+        except ValueError:
+            self._burst_var.set('1')
+            return 1
+
+    def _cmd_live(self) -> None:
+        if self._live_var.get():
+            self._live.start()
+        else:
+            self._live.stop()
+
+    def destroy(self) -> None:
+        self._live.stop()
+        self._io_worker.stop()
+        super().destroy()
 
-        osc = self._check_osc_pins()
-
-        self._update_labels(read, hiz, osc)
-
-    @staticmethod
-    def _generate_hiz_check_list(ic_definition: ICDefinition, skip_hiz: list[int] = []) -> list[int]:
-        check_list: list[int] = ic_definition.hiz_o_pins
-
-        check_list.sort()
-
-        return [i for i in check_list if i not in skip_hiz]
-    
     @staticmethod
-    def _calculate_pinlabel_width(pin_names: list[str]) -> int:
+    def _calculate_pinlabel_width(pin_names: Sequence[str]) -> int:
         return max([len(name) for name in pin_names]) + 3
\ No newline at end of file
@@ -1,7 +1,7 @@
 """This module contains miscellaneous utilities for the UI"""
 
 from enum import Enum
-from typing import final, Tuple
+from typing import final, Sequence, Tuple
 
 from dppeeper.ic.ic_definition import ICDefinition
 
@@ -14,7 +14,33 @@ class UIPinGridType(Enum):
 @final
 class UIUtilities:
     @staticmethod
-    def calculateGridSize(pins_per_side: list[int]) -> Tuple[int, int]:
+    def changedBits(old_vals: Sequence[int], new_vals: Sequence[int], mask: int = -1) -> list[int]:
+        """
+        Find which bits changed between two sets of bitmasks
+
+        Args:
+            old_vals (Sequence[int]): previous bitmasks
+            new_vals (Sequence[int]): current bitmasks, paired with the previous ones
+            mask (int, optional): only bits set here are considered. Defaults to all of them.
+
+        Returns:
+            list[int]: indexes of the bits that changed in at least one of the bitmasks, in ascending order
+        """
+        changed: int = 0
+        for old_val, new_val in zip(old_vals, new_vals):
+            changed = changed | (old_val ^ new_val)
+        changed = changed & mask
+
+        indexes: list[int] = []
+        while changed:
+            low_bit: int = changed & -changed
+            indexes.append(low_bit.bit_length() - 1)
+            changed = changed ^ low_bit
+
+        return indexes
+
+    @staticmethod
+    def calculateGridSize(pins_per_side: Sequence[int]) -> Tuple[int, int]:
         match len(pins_per_side):
             case 1:
                 return (4, pins_per_side[0] + 2)
@@ -28,7 +54,7 @@ class UIUtilities:
                 raise ValueError(f'Number of sides {len(pins_per_side)} is not supported')
 
     @staticmethod    
-    def calculatePinPosition(pin_no: int, type: UIPinGridType, pins_per_side: list[int], rot_shift: int = 0) -> Tuple[int, int]:
+    def calculatePinPosition(pin_no: int, type: UIPinGridType, pins_per_side: Sequence[int], rot_shift: int = 0) -> Tuple[int, int]:
         grid_size: Tuple[int, int] = UIUtilities.calculateGridSize(pins_per_side)
         tot_pins: int = sum(pins_per_side)
 
@@ -30,4 +30,9 @@ def pin_list_o_16L8() -> list[int]:
 @pytest.fixture
 def ic_definition_PAL16L8() -> ICDefinition:
     with open('examples/PAL16L8.toml', 'rb') as def_file:    
-        return ICLoader.extract_definition_from_buffered_reader(def_file)
\ No newline at end of file
+        return ICLoader.extract_definition_from_buffered_reader(def_file)
+
+@pytest.fixture
+def ic_definition_PAL16R4() -> ICDefinition:
+    with open('examples/PAL16R4.toml', 'rb') as def_file:    
+        return ICLoader.extract_definition_from_buffered_reader(def_file)
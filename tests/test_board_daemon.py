@@ -0,0 +1,112 @@
+"""Tests for the board daemon and the sessions sharing it"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dppeeper.board.board_daemon import BoardDaemon, DaemonClient
+from dppeeper.board.daemon_board_commands import DaemonBoardCommands
+from dppeeper.board.fake_board_commands import FakeBoardCommands
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.ic_loader import ICLoader
+from dppeeper.peeper_session import PeeperSession, PinState
+
+@pytest.fixture
+def daemon_PAL16R4(tmp_path, ic_definition_PAL16R4):
+    board = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition_PAL16R4), ic_definition_PAL16R4)
+    board.set_power(True)
+
+    daemon = BoardDaemon(os.path.join(tmp_path, 'board.sock'), ic_definition_PAL16R4, board)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+
+    yield (daemon, board)
+
+    daemon.shutdown()
+    thread.join(5)
+
+def test_shared_registers(daemon_PAL16R4, ic_definition_PAL16R4):
+    daemon, board = daemon_PAL16R4
+    q_mask: int = ICDefinition.pins_to_mask([14, 15, 16, 17])
+
+    # The registers keep counting across clients
+    for count in (2, 4):
+        client = DaemonClient(daemon.path)
+        commands = DaemonBoardCommands.bind(client, ic_definition_PAL16R4)
+        assert commands.ic_name == 'PAL16R4' and commands.powered
+
+        session = PeeperSession(ic_definition_PAL16R4, commands, client, check_hiz=True)
+        session.clock(0, 1)
+        state: PinState = session.clock(0, 1)
+        assert (state.read & q_mask) >> 13 == count
+        assert session.set_pins(ICDefinition.pins_to_mask([11])).hiz & q_mask == q_mask
+        client.close()
+
+    with pytest.raises(RuntimeError):
+        BoardDaemon(daemon.path, ic_definition_PAL16R4, board)
+
+def test_batching(daemon_PAL16R4, ic_definition_PAL16R4):
+    daemon, board = daemon_PAL16R4
+    client = DaemonClient(daemon.path)
+    session = PeeperSession(ic_definition_PAL16R4, DaemonBoardCommands.bind(client, ic_definition_PAL16R4), client)
+
+    # A batch of writes is a single transaction on the board, as are consecutive write requests sent together
+    board.reset_stats()
+    reads: list[int] = session.write_vals([0, ICDefinition.pins_to_mask([2]), ICDefinition.pins_to_mask([2, 3])])
+    assert reads[2] & ICDefinition.pins_to_mask([2, 3]) == ICDefinition.pins_to_mask([2, 3])
+    assert board.stats == {'round_trips': 1, 'write_pins': 3}
+
+    board.reset_stats()
+    results = client.requests([{'op': 'write_pins', 'values': [0]}, {'op': 'write_pins', 'values': [1, 2]}, {'op': 'read_pins'}])
+    assert len(results[0]) == 1 and len(results[1]) == 2
+    assert board.stats == {'round_trips': 2, 'write_pins': 3, 'read_pins': 1}
+
+    with pytest.raises(RuntimeError):
+        client.request('format_flash')
+    client.close()
+
+def test_claim(daemon_PAL16R4, ic_definition_PAL16R4):
+    daemon, _ = daemon_PAL16R4
+    owner = DaemonClient(daemon.path)
+    other = DaemonClient(daemon.path)
+    owner.claim()
+
+    done = threading.Event()
+    def read_other() -> None:
+        other.request('read_pins')
+        done.set()
+    threading.Thread(target=read_other, daemon=True).start()
+
+    # The other connection is served only once the owner disconnects
+    time.sleep(0.2)
+    assert not done.is_set()
+    owner.request('read_pins')
+    owner.close()
+    assert done.wait(5)
+    other.close()
+
+def test_pinout_mismatch(daemon_PAL16R4, ic_definition_PAL16L8):
+    daemon, _ = daemon_PAL16R4
+    client = DaemonClient(daemon.path)
+
+    # Same socket wiring, only a warning
+    assert DaemonBoardCommands.bind(client, ic_definition_PAL16L8).ic_name == 'PAL16R4'
+
+    # The power pins of a 24 pin IC are elsewhere: its pins must not be driven
+    with open('examples/GAL22V10.toml', 'rb') as def_file:
+        gal_definition = ICLoader.extract_definition_from_buffered_reader(def_file)
+    with pytest.raises(ValueError):
+        DaemonBoardCommands.bind(client, gal_definition)
+    client.close()
+
@@ -0,0 +1,70 @@
+"""Tests for the instrumentation of board commands"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import json
+
+from dppeeper.board.command_stats import CommandStats, InstrumentedCommands, LatencyHistogram
+
+class _Commands:
+    @staticmethod
+    def read_pins(ser=None) -> int | None:
+        return 0x12
+
+    @staticmethod
+    def set_power(state: bool, ser=None) -> None:
+        raise SystemError('Board disconnected')
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for _ in range(90):
+        histogram.record(0.0001) # 100us
+    for _ in range(10):
+        histogram.record(0.01) # 10ms
+
+    assert histogram.count == 100
+    assert histogram.min == 0.0001
+    assert histogram.max == 0.01
+    assert histogram.percentile(0.5) == 0.000128 # Upper bound of the 64-128us bucket
+    assert histogram.percentile(0.99) == 0.01 # Capped at the maximum
+
+    summary = histogram.to_dict()
+    assert summary['buckets_us'] == {'<128': 90, '<16384': 10}
+    assert abs(summary['mean_ms'] - 1.09) < 1e-9
+
+def test_wrapped_commands_are_timed():
+    stats = CommandStats()
+    command_class = InstrumentedCommands.wrap(_Commands, stats)
+
+    assert issubclass(command_class, _Commands)
+    assert command_class.read_pins() == 0x12
+    assert command_class.read_pins() == 0x12
+    assert not hasattr(command_class, 'write_pins_batch')
+
+    # Failed commands are not recorded
+    try:
+        command_class.set_power(True)
+    except SystemError:
+        pass
+
+    assert stats.commands['read_pins'].count == 2
+    assert 'set_power' not in stats.commands
+    assert not hasattr(_Commands, 'command_stats') # The original class is untouched
+
+def test_report():
+    stats = CommandStats()
+    stats.record_command('write_pins', 0.002)
+    stats.record_command('write_pins_batch', 0.004, 8)
+    stats.record_operation('set', 0.005)
+
+    report = json.loads(json.dumps(stats.to_dict()))
+    assert report['commands']['write_pins_batch']['per_item_ms'] == 0.5
+    assert report['operations']['set']['count'] == 1
+
+    lines = stats.format_report().splitlines()
+    assert lines[1] == 'Commands'
+    assert lines[2].split()[:2] == ['write_pins', '1']
+    assert lines[4] == 'Operations'
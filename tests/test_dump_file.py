@@ -0,0 +1,93 @@
+"""Tests for recorded dumps and the simulated board"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import os
+
+import pytest
+
+from dppeeper.board.dump_file import DumpReader, DumpRecordKind, DumpWriter
+
+def test_dump_round_trip(tmp_path):
+    dump_path: str = os.path.join(tmp_path, 'test.dpr')
+
+    with DumpWriter(dump_path, 'PAL16L8', 20) as writer:
+        writer.write(DumpRecordKind.WRITE, written=0x01, read=0x81, timestamp=10)
+        writer.write(DumpRecordKind.RESULT, written=0x02, read=0x42, hiz=0x40, osc=0x10, timestamp=20)
+        writer.write(DumpRecordKind.POWER, written=1, timestamp=30)
+
+    with DumpReader(dump_path) as reader:
+        assert reader.ic_name == 'PAL16L8'
+        assert reader.pin_count == 20
+        assert len(reader) == 3
+        assert [rec.kind for rec in reader] == [DumpRecordKind.WRITE, DumpRecordKind.RESULT, DumpRecordKind.POWER]
+        assert reader.record(1).osc == 0x10
+
+def test_dump_resume(tmp_path):
+    dump_path: str = os.path.join(tmp_path, 'test.dpr')
+
+    for timestamp in (10, 20):
+        with DumpWriter(dump_path, 'PAL16L8', 20) as writer:
+            writer.write(DumpRecordKind.WRITE, written=0x01, read=0x81, timestamp=timestamp)
+
+    # Records of another IC are not appended to the dump
+    for ic_name, pin_count in (('PAL16R4', 20), ('PAL16L8', 24)):
+        with pytest.raises(ValueError):
+            DumpWriter(dump_path, ic_name, pin_count)
+
+    with DumpReader(dump_path) as reader:
+        assert (reader.ic_name, len(reader)) == ('PAL16L8', 2)
+
+def test_dump_index_lookup(tmp_path):
+    dump_path: str = os.path.join(tmp_path, 'test.dpr')
+
+    with DumpWriter(dump_path, 'PAL16L8', 20) as writer:
+        for val in range(1024):
+            writer.write(DumpRecordKind.WRITE, written=val, read=val ^ 0xFF)
+        # A result for a vector supersedes raw writes, before and after it
+        writer.write(DumpRecordKind.RESULT, written=5, read=0x55, hiz=0x01)
+        writer.write(DumpRecordKind.WRITE, written=5, read=0x00)
+
+    with DumpReader(dump_path) as reader:
+        assert reader.lookup(0).read == 0xFF
+        assert reader.lookup(1023).read == 1023 ^ 0xFF
+        assert reader.lookup(5).kind == DumpRecordKind.RESULT
+        assert reader.lookup(5).read == 0x55
+        assert reader.lookup(4096) is None
+
+    assert os.path.exists(dump_path + '.idx')
+
+    # Reopening uses the existing index, appending to the dump invalidates it
+    with DumpReader(dump_path) as reader:
+        assert reader.lookup(7).read == 7 ^ 0xFF
+
+    with DumpWriter(dump_path, 'PAL16L8', 20) as writer:
+        writer.write(DumpRecordKind.WRITE, written=4096, read=1)
+
+    with DumpReader(dump_path) as reader:
+        assert len(reader) == 1027
+        assert reader.lookup(4096).read == 1
+
+def test_sim_board_hiz_fallback(tmp_path, ic_definition_PAL16L8):
+    pytest.importorskip('dupicolib')
+    from dppeeper.board.sim_board_commands import SimBoardCommands
+
+    dump_path: str = os.path.join(tmp_path, 'test.dpr')
+
+    # Pin 19 (bit 18) is Hi-Z, pin 12 (bit 11) is driven high
+    with DumpWriter(dump_path, 'PAL16L8', 20) as writer:
+        writer.write(DumpRecordKind.RESULT, written=0x01, read=0x801, hiz=1 << 18, osc=1 << 11)
+
+    with DumpReader(dump_path) as reader:
+        sim = SimBoardCommands.bind(reader, ic_definition_PAL16L8)
+        zif_map: list[int] = ic_definition_PAL16L8.zif_map
+
+        sim.set_power(True)
+        assert sim.map_pins_to_value(zif_map, sim.write_pins(sim.map_value_to_pins(zif_map, 0x01))) == 0x801
+        assert sim.map_pins_to_value(zif_map, sim.detect_osc_pins(255)) == 1 << 11
+
+        # Pulling the Hi-Z pin high is followed, the IC is not affected
+        assert sim.map_pins_to_value(zif_map, sim.write_pins(sim.map_value_to_pins(zif_map, 0x01 | (1 << 18)))) == 0x801 | (1 << 18)
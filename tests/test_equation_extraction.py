@@ -0,0 +1,70 @@
+"""Tests for the extraction of equations from truth tables"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from dppeeper.analysis.equation_extraction import CubeMinimizer, Cube, EquationExtractor, OutputEquation
+from dppeeper.analysis.truth_table_analysis import TruthTable
+from dppeeper.ic.ic_definition import ICDefinition
+
+from test_truth_table_analysis import _model, _vectors
+
+def _model_table() -> TruthTable:
+    vectors: list[int] = _vectors()
+    reads: list[tuple[int, int]] = [_model(val) for val in vectors]
+
+    return TruthTable(np.array(vectors, dtype=np.uint64), np.array([read for read, _ in reads], dtype=np.uint64),
+                      np.array([hiz for _, hiz in reads], dtype=np.uint64), np.zeros(len(vectors), dtype=np.uint64))
+
+def test_minimize():
+    # f(a, b, c) = a & b | !c, with minterms 1 and 3 as don't care
+    on = np.array([(idx & 0x03) == 0x03 or not idx & 0x04 for idx in range(8)])
+    off = ~on
+    on[[1, 3]] = off[[1, 3]] = False
+
+    cover = CubeMinimizer.minimize(on, off, 8)
+    assert sorted(cover) == [(0b011, 0b011), (0b100, 0b000)]
+
+    # Parity of 4 inputs has no smaller cover than its 8 minterms
+    parity = np.array([bool(idx.bit_count() & 0x01) for idx in range(16)])
+    assert len(CubeMinimizer.minimize(parity, ~parity, 8)) == 8
+    assert CubeMinimizer.minimize(parity, ~parity, 7) is None
+
+def test_extract(ic_definition_PAL16L8):
+    table: TruthTable = _model_table()
+    extractor = EquationExtractor(ic_definition_PAL16L8)
+    equations: dict[int, OutputEquation] = {equation.pin: equation for equation in extractor.extract(table)}
+
+    assert equations[12] == OutputEquation(12, False, (Cube(ICDefinition.pins_to_mask([1, 2]), ICDefinition.pins_to_mask([1, 2])),), None, True)
+    assert equations[19] == OutputEquation(19, True, (Cube(ICDefinition.pins_to_mask([1, 2]), ICDefinition.pins_to_mask([1, 2])),), None, True)
+    assert equations[13] == OutputEquation(13, False, (Cube(ICDefinition.pins_to_mask([3]), ICDefinition.pins_to_mask([3])),), (Cube(ICDefinition.pins_to_mask([4]), 0),), True)
+    assert equations[14].terms == (Cube(0, 0),) and equations[16].terms == ()
+    assert equations[15].terms is None and equations[15].enable == ()
+    assert extractor.check(table, list(equations.values())) == 0
+
+    palasm: str = extractor.format_palasm(table, list(equations.values()))
+    assert 'CHIP PAL16L8 PAL16L8' in palasm
+    assert 'O12 = I1 * I2' in palasm and '/O19 = I1 * I2' in palasm
+    assert 'IO13.TRST = /I4\nIO13 = I3' in palasm
+    assert 'IO14 = VCC' in palasm and 'IO15.TRST = GND' in palasm
+
+def test_too_many_terms(ic_definition_PAL16L8):
+    # O12 is the parity of I1 to I4: 8 terms in both polarities
+    vectors: list[int] = _vectors()
+    reads: list[int] = [val | (ICDefinition.pins_to_mask([12]) if (val & ICDefinition.pins_to_mask([1, 2, 3, 4])).bit_count() & 0x01 else 0) for val in vectors]
+    table = TruthTable(np.array(vectors, dtype=np.uint64), np.array(reads, dtype=np.uint64),
+                       np.zeros(len(vectors), dtype=np.uint64), np.zeros(len(vectors), dtype=np.uint64))
+
+    equation: OutputEquation = next(equation for equation in EquationExtractor(ic_definition_PAL16L8, 4).extract(table) if equation.pin == 12)
+    assert equation.terms is None
+
+    extractor = EquationExtractor(ic_definition_PAL16L8, 8)
+    equations: list[OutputEquation] = extractor.extract(table)
+    assert len(next(equation for equation in equations if equation.pin == 12).terms) == 8
+    assert extractor.check(table, equations) == 0
@@ -0,0 +1,156 @@
+"""Tests for the fake board and the session logic running on it"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dppeeper.board.fake_board_commands import FakeBoardCommands, FakeLatency
+from dppeeper.board.hiz_detection import HiZCachePolicy, HiZStrategy
+from dppeeper.board.osc_detection import OscPolicy, OscStrategy
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.peeper_session import PeeperSession, PinState
+
+def test_registered_counter(ic_definition_PAL16R4):
+    board = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition_PAL16R4), ic_definition_PAL16R4)
+    board.set_power(True)
+    session = PeeperSession(ic_definition_PAL16R4, board, check_hiz=True, power_delay=0)
+
+    q_mask: int = ICDefinition.pins_to_mask([14, 15, 16, 17])
+    assert session.set_pins(0).read & q_mask == 0
+
+    # Q pins count up on every clock
+    for count in range(1, 6):
+        state: PinState = session.clock(0, 1)
+        assert (state.read & q_mask) >> 13 == count
+        assert state.hiz & q_mask == 0
+
+    # OE (pin 11) high puts the registered outputs in Hi-Z
+    assert session.set_pins(ICDefinition.pins_to_mask([11])).hiz & q_mask == q_mask
+
+    # Power cycling resets the registers
+    assert session.power_cycle(0).read & q_mask == 0
+
+@pytest.mark.parametrize('strategy', [HiZStrategy.PER_PIN, HiZStrategy.GROUP])
+def test_hiz_detection_on_fake_board(ic_definition_PAL16L8, strategy):
+    board = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition_PAL16L8), ic_definition_PAL16L8)
+    board.set_power(True)
+    session = PeeperSession(ic_definition_PAL16L8, board, check_hiz=True, hiz_strategy=strategy)
+
+    # Every other Hi-Z capable output is disabled while pin 1 is high
+    assert session.set_pins(0).hiz == 0
+    assert session.set_pins(ICDefinition.pins_to_mask([1])).hiz == ICDefinition.pins_to_mask([13, 15, 17, 19])
+
+def test_oscillating_pins(ic_definition_PAL16L8):
+    model = PLDModel(outputs={12: lambda view: PLDModel.pin(view, 1), 19: lambda view: False},
+                     enables={19: lambda view: PLDModel.pin(view, 2)},
+                     oscillating=[19])
+    board = FakeBoardCommands.bind(model, ic_definition_PAL16L8)
+    board.set_power(True)
+    session = PeeperSession(ic_definition_PAL16L8, board)
+
+    assert session.set_pins(ICDefinition.pins_to_mask([1])).read & ICDefinition.pins_to_mask([12]) == ICDefinition.pins_to_mask([12])
+    assert session.set_pins(0).osc == 0
+    assert session.set_pins(ICDefinition.pins_to_mask([2])).osc == ICDefinition.pins_to_mask([19])
+
+def test_hiz_cache(ic_definition_PAL16R4):
+    board = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition_PAL16R4), ic_definition_PAL16R4)
+    board.set_power(True)
+    session = PeeperSession(ic_definition_PAL16R4, board, check_hiz=True, power_delay=0, hiz_cache=HiZCachePolicy(16))
+    q_mask: int = ICDefinition.pins_to_mask([14, 15, 16, 17])
+
+    first: PinState = session.set_pins(ICDefinition.pins_to_mask([11]))
+    session.set_pins(0)
+
+    # Toggling between known vectors costs a single write
+    board.reset_stats()
+    assert session.set_pins(ICDefinition.pins_to_mask([11])) == first
+    assert board.stats['write_pins'] == 1
+    assert session.set_pins(0).hiz & q_mask == 0
+
+    # Clocks invalidate the cache, only the state after the clock is known
+    session.clock(0, 1)
+    board.reset_stats()
+    assert session.set_pins(ICDefinition.pins_to_mask([11])).hiz & q_mask == q_mask
+    assert board.stats['write_pins'] == 1 + 2 * len(session.hiz_check_list)
+
+def test_adaptive_oscillation_policy(ic_definition_PAL16L8):
+    model = PLDModel(outputs={12: lambda view: PLDModel.pin(view, 1), 19: lambda view: False},
+                     enables={19: lambda view: PLDModel.pin(view, 2)},
+                     oscillating=[19])
+    board = FakeBoardCommands.bind(model, ic_definition_PAL16L8)
+    board.set_power(True)
+    session = PeeperSession(ic_definition_PAL16L8, board, power_delay=0,
+                            osc_policy=OscPolicy(OscStrategy.ADAPTIVE, skip_unchanged=True))
+
+    # A quiet probe is enough, a flickering one escalates to a full scan
+    board.reset_stats()
+    assert session.set_pins(0).osc == 0
+    assert board.stats['detect_osc_pins'] == 1
+    assert session.set_pins(ICDefinition.pins_to_mask([2])).osc == ICDefinition.pins_to_mask([19])
+    assert board.stats['detect_osc_pins'] == 3
+
+    # Same state as the last quiet scan: no scan at all, until a clock or power cycle
+    board.reset_stats()
+    assert session.set_pins(0).osc == 0
+    assert session.set_pins(0).osc == 0
+    assert board.stats['detect_osc_pins'] == 1
+    session.power_cycle(0)
+    assert board.stats['detect_osc_pins'] == 2 # Only the state after the power cycle is scanned again
+
+    # Deferred checks complete the state later
+    state: PinState = session.set_pins(ICDefinition.pins_to_mask([2]), check_osc=False)
+    assert state.osc == 0
+    assert session.refresh_osc(ICDefinition.pins_to_mask([2]), state).osc == ICDefinition.pins_to_mask([19])
+
+def test_latency_and_stats(ic_definition_PAL16L8):
+    board = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition_PAL16L8), ic_definition_PAL16L8, FakeLatency(link=0.001))
+    board.set_power(True)
+    board.reset_stats()
+
+    session = PeeperSession(ic_definition_PAL16L8, board, check_hiz=True)
+    session.set_pins(0)
+
+    # One pipelined batch for the pins and the Hi-Z probes, one oscillation scan
+    assert board.stats[FakeBoardCommands.STAT_ROUND_TRIPS] == 2
+    assert board.stats['write_pins'] == 1 + 2 * len(ic_definition_PAL16L8.hiz_o_pins)
+    assert board.stats['detect_osc_pins'] == 1
+
+def test_connect_command(monkeypatch, ic_definition_PAL16R4):
+    import dppeeper.frontend as frontend
+
+    class _Port:
+        port: str = 'fake'
+        baudrate: int = 115200
+        closed: bool = False
+
+        def close(self) -> None:
+            self.closed = True
+
+    board = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition_PAL16R4), ic_definition_PAL16R4)
+    ui_calls: list[tuple] = []
+
+    # The frontend imports these when connecting, patch them where they are defined
+    import serial
+    from dupicolib.board_utilities import BoardUtilities
+    from dupicolib.hardware_board_commands import HardwareBoardCommands
+    from dupicolib.board_fw_version import FwVersionTools
+    from dupicolib.board_command_class_factory import BoardCommandClassFactory
+
+    monkeypatch.setattr(serial, 'Serial', lambda **kwargs: _Port())
+    monkeypatch.setattr(BoardUtilities, 'initialize_connection', staticmethod(lambda ser: True))
+    monkeypatch.setattr(HardwareBoardCommands, 'get_model', staticmethod(lambda ser: 3))
+    monkeypatch.setattr(HardwareBoardCommands, 'get_version', staticmethod(lambda ser: '0.1.0'))
+    monkeypatch.setattr(FwVersionTools, 'parse', staticmethod(lambda ver: {}))
+    monkeypatch.setattr(BoardCommandClassFactory, 'get_command_class', staticmethod(lambda model, fw: board))
+    monkeypatch.setattr(frontend, 'start_ui', lambda *args, **kwargs: ui_calls.append(args))
+
+    assert frontend.connect_command('fake', 115200, ic_definition_PAL16R4, skip_note=True) == 1
+    assert len(ui_calls) == 1 and ui_calls[0][2] is board
+    assert board.stats == {FakeBoardCommands.STAT_ROUND_TRIPS: 2, 'write_pins': 1, 'set_power': 1}
@@ -0,0 +1,114 @@
+"""Tests for Hi-Z detection strategies"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import math
+import random
+from typing import Callable
+
+import pytest
+
+from dppeeper.board.hiz_detection import HiZCache, HiZCachePolicy, HiZDetector, HiZStrategy
+
+def _build_chip(hiz_mask: int, driven: int, input_pin: int | None = None) -> tuple[Callable[[list[int]], list[int]], list[int]]:
+    """
+    Build a fake IC: pins in hiz_mask follow the written value, the others read as `driven`.
+    If input_pin is given, that pin follows the write and its value is copied on pin 1.
+    """
+    writes: list[int] = []
+
+    def write_vals(vals: list[int]) -> list[int]:
+        writes.extend(vals)
+        res: list[int] = []
+        for val in vals:
+            read: int = (val & hiz_mask) | (driven & ~hiz_mask)
+            if input_pin is not None:
+                in_mask: int = 1 << (input_pin - 1)
+                read = (read & ~(in_mask | 1)) | (val & in_mask) | ((val >> (input_pin - 1)) & 1)
+            res.append(read)
+        return res
+
+    return (write_vals, writes)
+
+CHECK_LIST: list[int] = [12, 13, 14, 15, 16, 17, 18, 19]
+
+@pytest.mark.parametrize('strategy', [HiZStrategy.PER_PIN, HiZStrategy.GROUP])
+def test_hiz_detection(strategy):
+    hiz_mask: int = (1 << 12) | (1 << 13) | (1 << 17)
+    write_vals, _ = _build_chip(hiz_mask, driven=0x7FFFF)
+
+    result = HiZDetector.detect(strategy, 0x3, CHECK_LIST, write_vals)
+    assert result.hiz == hiz_mask
+    assert result.read == ((0x3 & hiz_mask) | (0x7FFFF & ~hiz_mask))
+    assert result.suspected_inputs == []
+
+@pytest.mark.parametrize('strategy', [HiZStrategy.PER_PIN, HiZStrategy.GROUP])
+def test_hiz_detection_input_misclassification(strategy):
+    # Pin 16 is actually an input driving pin 1
+    write_vals, _ = _build_chip(1 << 14, driven=0, input_pin=16)
+
+    result = HiZDetector.detect(strategy, 0, CHECK_LIST, write_vals)
+    assert result.hiz == 1 << 14
+    assert result.suspected_inputs == [16]
+
+@pytest.mark.parametrize('strategy', [HiZStrategy.PER_PIN, HiZStrategy.GROUP])
+def test_hiz_detection_feedback(strategy):
+    # Pin 13 is Hi-Z and pin 14 drives a copy of it: inverting both looks like two Hi-Z pins
+    def write_vals(vals: list[int]) -> list[int]:
+        return [(val & (1 << 12)) | ((val >> 12) & 1) << 13 for val in vals]
+
+    result = HiZDetector.detect(strategy, 0, CHECK_LIST, write_vals)
+    assert result.hiz == 0
+    assert result.suspected_inputs == [13]
+
+def test_group_detection_probe_count():
+    write_vals, writes = _build_chip(0, driven=0x55)
+    HiZDetector.detect_group(0, CHECK_LIST, write_vals)
+    assert len(writes) == 3 # Set, probe all, restore
+
+    # Groups that all follow the pull are confirmed pin by pin
+    write_vals, writes = _build_chip(0xFF << 11, driven=0)
+    assert HiZDetector.detect_group(0, CHECK_LIST, write_vals, preamble=[1, 2]).hiz == 0xFF << 11
+    assert len(writes) == 5 + 2 * len(CHECK_LIST)
+
+@pytest.mark.parametrize('count', [8, 16, 32])
+def test_group_detection_logarithmic(count: int):
+    check_list: list[int] = list(range(1, count + 1))
+
+    # A single Hi-Z pin costs the set, the probe of all the candidates, one probe per halving and at most one confirmation
+    for pin in check_list:
+        write_vals, writes = _build_chip(1 << (pin - 1), driven=0)
+        assert HiZDetector.detect_group(0, check_list, write_vals).hiz == 1 << (pin - 1)
+        assert len(writes) <= 2 * math.ceil(math.log2(count)) + 5
+
+def test_hiz_cache_lru():
+    cache = HiZCache(HiZCachePolicy(size=2), key_mask=0x0F)
+
+    cache.store(0x01, 0x100)
+    cache.store(0x02, 0x200)
+    assert cache.lookup(0xF1) == 0x100 # Pins outside of the key do not matter
+    cache.store(0x03, 0x300) # Evicts 0x02, the least recently used
+
+    assert cache.lookup(0x02) is None
+    assert cache.lookup(0x01) == 0x100
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+def test_hiz_cache_verification():
+    cache = HiZCache(HiZCachePolicy(size=4, verify_rate=0.5), key_mask=0xFF, rng=random.Random(1))
+    cache.store(0x01, 0x100)
+
+    results = [cache.lookup(0x01) for _ in range(100)]
+    assert 20 < results.count(None) < 80 # Hits picked for verification are reported as misses
+    assert all(result in (None, 0x100) for result in results)
+
+    # A verification finding a different result clears everything
+    cache.store(0x02, 0x200)
+    cache.store(0x01, 0x000)
+    assert len(cache) == 1
+
@@ -2,6 +2,7 @@
 
 # pylint: disable=wrong-import-position,wrong-import-order
 
+import pickle
 import sys
 from typing import Type
 sys.path.insert(0, './src') # Make VSCode happy...
@@ -28,8 +29,28 @@ def test_16L8_pin_names_override(pin_list_zif_map_16L8, pin_list_in_16L8, pin_li
 def test_PAL16L8_Definition(ic_definition_PAL16L8):
     assert len(ic_definition_PAL16L8.pin_names) == 20
     assert len(ic_definition_PAL16L8.zif_map) == len(ic_definition_PAL16L8.pin_names)
-    assert ic_definition_PAL16L8.in_pins == [1, 2, 3, 4, 5, 6, 7, 8, 9, 11]
-    assert ic_definition_PAL16L8.o_pins == [12, 19]
-    assert ic_definition_PAL16L8.io_pins == [13, 14, 15, 16, 17, 18]
-    assert ic_definition_PAL16L8.clk_pins == []
+    assert ic_definition_PAL16L8.in_pins == (1, 2, 3, 4, 5, 6, 7, 8, 9, 11)
+    assert ic_definition_PAL16L8.o_pins == (12, 19)
+    assert ic_definition_PAL16L8.io_pins == (13, 14, 15, 16, 17, 18)
+    assert ic_definition_PAL16L8.clk_pins == ()
     assert ic_definition_PAL16L8.hw_model == 3
+
+def test_PAL16L8_masks(ic_definition_PAL16L8):
+    assert ic_definition_PAL16L8.in_mask == 0b000_0000_0101_1111_1111
+    assert ic_definition_PAL16L8.o_mask == (1 << 11) | (1 << 18)
+    assert ic_definition_PAL16L8.io_mask == ic_definition_PAL16L8.f_mask == 0b0011_1111 << 12
+    assert ic_definition_PAL16L8.clk_mask == ic_definition_PAL16L8.q_mask == ic_definition_PAL16L8.nc_mask == 0
+    assert (ic_definition_PAL16L8.gnd_mask, ic_definition_PAL16L8.pwr_mask) == (1 << 9, 1 << 19)
+    assert ic_definition_PAL16L8.signal_mask == 0xFFFFF & ~(ic_definition_PAL16L8.gnd_mask | ic_definition_PAL16L8.pwr_mask)
+
+    with pytest.raises(AttributeError): # Slots, no arbitrary attributes
+        ic_definition_PAL16L8.extra_pins = [1]
+
+def test_pickle(ic_definition_PAL16L8):
+    ic_definition_PAL16L8.compile_pin_mapper(type('Board', (), {'map_value_to_pins': staticmethod(lambda pins, value: value),
+                                                                'map_pins_to_value': staticmethod(lambda pins, value: value)}))
+
+    # The cached mappers are not pickled, local classes would not survive it anyway
+    loaded: ICDefinition = pickle.loads(pickle.dumps(ic_definition_PAL16L8))
+    assert loaded.pin_names == ic_definition_PAL16L8.pin_names and loaded.hiz_o_mask == ic_definition_PAL16L8.hiz_o_mask
+    assert loaded.adapter_notes == ic_definition_PAL16L8.adapter_notes
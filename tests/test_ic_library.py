@@ -0,0 +1,90 @@
+"""Tests for the library of IC definitions"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import os
+import shutil
+
+import pytest
+
+from dppeeper.ic.ic_library import ICLibrary, LibraryEntry
+from dppeeper.ic.ic_loader import ICLoader
+
+@pytest.fixture
+def library_dir(tmp_path) -> str:
+    lib_dir = tmp_path / 'definitions'
+    shutil.copytree('examples', lib_dir / 'examples')
+    (lib_dir / 'broken.toml').write_text('name = "BROKEN"\n')
+    return str(lib_dir)
+
+def _count_parses(monkeypatch) -> list[int]:
+    calls: list[int] = []
+    original = ICLoader.extract_definition_from_buffered_reader.__func__
+
+    def _counting(cls, filebuf):
+        calls.append(1)
+        return original(cls, filebuf)
+
+    monkeypatch.setattr(ICLoader, 'extract_definition_from_buffered_reader', classmethod(_counting))
+    return calls
+
+def test_index_and_load(tmp_path, library_dir):
+    library = ICLibrary(library_dir, str(tmp_path / 'lib.cache'))
+
+    entry: LibraryEntry | None = library.find('gal22v10')
+    assert entry is not None
+    assert entry.name == 'GAL22V10' and entry.pin_count == 24 and entry.hw_model == 3
+    assert entry.path == os.path.join('examples', 'GAL22V10.toml')
+
+    assert library.find('BROKEN') is None
+    # GAL16V8_eprom_01 has the same IC name as GAL16V8, and can only be found by its file name
+    assert len(library.entries()) == len(os.listdir('examples')) - 1
+    shadowed: LibraryEntry | None = library.find('gal16v8_eprom_01')
+    assert shadowed is not None and shadowed.name == 'GAL16V8' and shadowed != library.find('GAL16V8')
+
+    with open('examples/PAL16R4.toml', 'rb') as def_file:
+        parsed = ICLoader.extract_definition_from_buffered_reader(def_file)
+    loaded = library.load('PAL16R4')
+    assert loaded.pin_names == parsed.pin_names and loaded.zif_map == parsed.zif_map and loaded.q_pins == parsed.q_pins
+
+    with pytest.raises(KeyError):
+        library.load('PAL99X99')
+
+def test_cache_invalidation(tmp_path, monkeypatch, library_dir):
+    cache_path: str = str(tmp_path / 'lib.cache')
+    ICLibrary(library_dir, cache_path)
+
+    calls: list[int] = _count_parses(monkeypatch)
+
+    # Nothing changed, nothing parsed
+    ICLibrary(library_dir, cache_path)
+    assert not calls
+
+    # Touched without changes: the contents are hashed, but not parsed again
+    def_path: str = os.path.join(library_dir, 'examples', 'PAL16L8.toml')
+    stat = os.stat(def_path)
+    os.utime(def_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    ICLibrary(library_dir, cache_path)
+    assert not calls
+
+    # Modified and added files are parsed again
+    with open(def_path, 'r') as def_file:
+        contents: str = def_file.read()
+    with open(def_path, 'w') as def_file:
+        def_file.write(contents.replace('name = "PAL16L8"', 'name = "PAL16L8A"'))
+    with open(os.path.join(library_dir, 'PAL16R6B.toml'), 'w') as def_file:
+        with open('examples/PAL16R6.toml', 'r') as src_file:
+            def_file.write(src_file.read().replace('name = "PAL16R6"', 'name = "PAL16R6B"'))
+
+    library = ICLibrary(library_dir, cache_path)
+    assert len(calls) == 2
+    assert library.load('PAL16L8A').name == 'PAL16L8A'
+    assert library.load('PAL16L8').name == 'PAL16L8A' # Still found by file name
+    assert library.find('PAL16R6B') is not None
+
+    # Removed files leave the index
+    os.remove(def_path)
+    assert ICLibrary(library_dir, cache_path).find('PAL16L8A') is None
@@ -0,0 +1,96 @@
+"""Tests for the background I/O worker"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import threading
+import time
+from typing import Callable
+
+from dppeeper.ui.io_worker import IOWorker
+
+class _FakeWidget:
+    """Collects the callbacks scheduled with after(), so the test can run them as the Tk mainloop would"""
+
+    def __init__(self) -> None:
+        self.scheduled: list[Callable[[], None]] = []
+
+    def after(self, ms: int, func: Callable[[], None]) -> str:
+        self.scheduled.append(func)
+        return 'after#0'
+
+    def run_until_idle(self, worker: IOWorker, timeout: float = 5.0) -> None:
+        deadline: float = time.monotonic() + timeout
+        while self.scheduled and time.monotonic() < deadline:
+            self.scheduled.pop(0)()
+            time.sleep(0.001)
+
+def test_jobs_run_in_order_and_coalesce():
+    widget = _FakeWidget()
+    worker = IOWorker(widget) # type: ignore[arg-type]
+
+    release = threading.Event()
+    executed: list[str] = []
+    delivered: list[str] = []
+
+    def blocking_job() -> str:
+        release.wait(5)
+        executed.append('clock')
+        return 'clock'
+
+    worker.submit(blocking_job, delivered.append)
+    time.sleep(0.05) # Let the worker pick the job up
+
+    # While the clock is in flight, the SETs pile up and collapse into the last one
+    for val in range(5):
+        worker.submit((lambda v: lambda: executed.append(f'set{v}') or f'set{v}')(val), delivered.append, key='set')
+    worker.submit(lambda: executed.append('cycle') or 'cycle', delivered.append)
+    worker.submit(lambda: executed.append('set9') or 'set9', delivered.append, key='set')
+
+    release.set()
+    widget.run_until_idle(worker)
+
+    assert executed == ['clock', 'set4', 'cycle', 'set9']
+    assert delivered == executed
+    assert not worker.busy
+
+    worker.stop()
+
+def test_errors_are_delivered():
+    widget = _FakeWidget()
+    worker = IOWorker(widget) # type: ignore[arg-type]
+    errors: list[Exception] = []
+
+    def failing_job() -> None:
+        raise SystemError('Read from the dupico failed')
+
+    worker.submit(failing_job, on_error=errors.append)
+    widget.run_until_idle(worker)
+
+    assert len(errors) == 1 and isinstance(errors[0], SystemError)
+    worker.stop()
+
+def test_background_jobs_are_dropped_by_new_jobs():
+    widget = _FakeWidget()
+    worker = IOWorker(widget) # type: ignore[arg-type]
+    release = threading.Event()
+    executed: list[str] = []
+
+    def blocking_job() -> None:
+        release.wait(5.0)
+        executed.append('set1')
+
+    worker.submit(blocking_job)
+    time.sleep(0.05)
+
+    worker.submit(lambda: executed.append('osc1'), background=True)
+    worker.submit(lambda: executed.append('set2'))
+    worker.submit(lambda: executed.append('osc2'), background=True)
+
+    release.set()
+    widget.run_until_idle(worker)
+
+    assert executed == ['set1', 'set2', 'osc2']
+    worker.stop()
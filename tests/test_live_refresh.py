@@ -0,0 +1,141 @@
+"""Tests for the live mode of the UI"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import os
+import threading
+import time
+from typing import Callable
+
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dppeeper.board.dump_file import DumpReader, DumpRecordKind
+from dppeeper.board.fake_board_commands import FakeBoardCommands
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.board.session_recorder import SessionRecorder
+from dppeeper.peeper_session import PeeperSession, PinState
+from dppeeper.ui.io_worker import IOWorker
+from dppeeper.ui.live_refresh import LivePolicy, LiveRefresh, PollBackoff
+
+class _FakeWidget:
+    """Runs the callbacks scheduled with after() in order, ignoring the delays"""
+
+    def __init__(self) -> None:
+        self.scheduled: dict[str, Callable[[], None]] = {}
+        self.delays: list[int] = []
+        self._next_id: int = 0
+
+    def after(self, ms: int, func: Callable[[], None]) -> str:
+        self._next_id += 1
+        self.scheduled[f'after#{self._next_id}'] = func
+        self.delays.append(ms)
+        return f'after#{self._next_id}'
+
+    def after_cancel(self, after_id: str) -> None:
+        self.scheduled.pop(after_id, None)
+
+    def run(self, until: Callable[[], bool], timeout: float = 5.0) -> None:
+        deadline: float = time.monotonic() + timeout
+        while self.scheduled and not until() and time.monotonic() < deadline:
+            after_id: str = next(iter(self.scheduled))
+            self.scheduled.pop(after_id)()
+            time.sleep(0.001)
+
+def test_backoff():
+    backoff = PollBackoff(LivePolicy(rate=10, max_interval=2.0, duty=0.5))
+
+    assert backoff.update(0.01) == pytest.approx(0.09) and backoff.interval == pytest.approx(0.1)
+
+    # Slow reads stretch the interval to keep the link free half of the time, contention doubles it up to the maximum
+    assert backoff.update(0.3) == pytest.approx(0.3) and backoff.interval == pytest.approx(0.6)
+    assert backoff.update(0, contended=True) == pytest.approx(1.2)
+    backoff.update(0, contended=True)
+    assert backoff.interval == pytest.approx(2.0)
+
+    # Quick reads bring it back to the rate of the policy
+    intervals: list[float] = []
+    for _ in range(6):
+        backoff.update(0.01)
+        intervals.append(backoff.interval)
+    assert intervals == pytest.approx([1.0, 0.5, 0.25, 0.125, 0.1, 0.1])
+
+    with pytest.raises(ValueError):
+        PollBackoff(LivePolicy(rate=0))
+
+def test_live_reads():
+    widget = _FakeWidget()
+    worker = IOWorker(widget) # type: ignore[arg-type]
+
+    states: list[PinState] = [PinState(1, 0, 0), PinState(1, 0, 0), PinState(2, 0, 0), PinState(2, 4, 0), PinState(2, 4, 0)]
+    reads: list[PinState] = []
+    applied: list[PinState] = []
+
+    def read() -> PinState:
+        reads.append(states[min(len(reads), len(states) - 1)])
+        return reads[-1]
+
+    live = LiveRefresh(widget, worker, read, applied.append, LivePolicy(rate=1000, frame_ms=0)) # type: ignore[arg-type]
+    live.start()
+    widget.run(lambda: len(reads) >= len(states))
+
+    # Only the states that changed reach the window
+    assert applied == [PinState(1, 0, 0), PinState(2, 0, 0), PinState(2, 4, 0)]
+
+    live.stop()
+    count: int = len(reads)
+    widget.run(lambda: False, timeout=0.2)
+    assert len(reads) - count <= 1 and not live.running
+
+    worker.stop()
+
+def test_live_yields_to_operations():
+    widget = _FakeWidget()
+    worker = IOWorker(widget) # type: ignore[arg-type]
+    release = threading.Event()
+    reads: list[int] = []
+
+    worker.submit(lambda: release.wait(5))
+    time.sleep(0.05) # Let the worker pick the job up
+
+    live = LiveRefresh(widget, worker, lambda: reads.append(0) or PinState(0, 0, 0), lambda state: None, LivePolicy(rate=10, max_interval=1.0)) # type: ignore[arg-type]
+    live.start()
+    widget.run(lambda: live.interval >= 1.0)
+
+    # No read was queued behind the busy worker, which made the live mode back off
+    assert not reads and live.interval == pytest.approx(1.0)
+
+    release.set()
+    widget.run(lambda: bool(reads))
+    assert reads
+
+    live.stop()
+    worker.stop()
+
+def test_poll(tmp_path, ic_definition_PAL16L8):
+    # IO13 = I1, enabled when I3 is low
+    model = PLDModel(outputs={13: lambda view: PLDModel.pin(view, 1)}, enables={13: lambda view: not PLDModel.pin(view, 3)})
+    board = FakeBoardCommands.bind(model, ic_definition_PAL16L8)
+    board.set_power(True)
+    rec_path: str = os.path.join(tmp_path, 'session.dpr')
+
+    with SessionRecorder(rec_path, ic_definition_PAL16L8.name, len(ic_definition_PAL16L8.zif_map)) as recorder:
+        session = PeeperSession(ic_definition_PAL16L8, board, check_hiz=True, recorder=recorder)
+        checked: PinState = session.set_pins(1 << 2)
+        assert checked.hiz & (1 << 12)
+        check_list: list[int] = list(session.hiz_check_list)
+
+        # A single write and the oscillation scan, reusing the Hi-Z pins of the last check
+        board.reset_stats()
+        assert session.poll(1 << 2) == checked
+        assert board.stats == {'round_trips': 2, 'write_pins': 1, 'detect_osc_pins': 1}
+        assert session.hiz_check_list == check_list
+
+    with DumpReader(rec_path) as dump:
+        assert [record.kind for record in dump].count(DumpRecordKind.RESULT) == 1
+
@@ -0,0 +1,84 @@
+"""Tests for the execution of batch jobs on several boards"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import os
+
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dppeeper.batch.multi_board import BoardPool, BoardSpec, ShardedSweep
+from dppeeper.batch.truth_table_sweep import TruthTableSweep
+from dppeeper.board.dump_file import DumpReader
+from dppeeper.board.fake_board_commands import FakeBoardCommands, FakeLatency
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.peeper_session import PeeperSession
+
+def _session(ic_definition) -> PeeperSession:
+    board = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition), ic_definition, FakeLatency(link=0.0005))
+    board.set_power(True)
+    return PeeperSession(ic_definition, board)
+
+def test_board_spec():
+    assert BoardSpec.parse('/dev/ttyACM0') == BoardSpec('/dev/ttyACM0', None)
+    assert BoardSpec.parse('COM3=GAL16V8') == BoardSpec('COM3', 'GAL16V8')
+    with pytest.raises(ValueError):
+        BoardSpec.parse('COM3=')
+
+def test_shard_bounds():
+    assert TruthTableSweep.shard_bounds(1024, 3) == [(0, 341), (341, 682), (682, 1024)]
+    assert TruthTableSweep.shard_bounds(2, 3) == [(0, 0), (0, 1), (1, 2)]
+
+def test_sharded_sweep_matches_single_board(tmp_path, ic_definition_PAL16L8):
+    pins: list[int] = TruthTableSweep.sweep_pins(ic_definition_PAL16L8, ic_definition_PAL16L8.io_pins)
+    output: str = str(tmp_path / 'sharded.dpp')
+
+    sweep = ShardedSweep([_session(ic_definition_PAL16L8) for _ in range(3)], pins)
+    throughputs = sweep.run(output)
+    assert sum(throughput.steps for throughput in throughputs) == 1024
+    assert not [name for name in os.listdir(tmp_path) if '.part' in name]
+
+    single_output: str = str(tmp_path / 'single.dpp')
+    TruthTableSweep(_session(ic_definition_PAL16L8), pins).run(single_output)
+
+    with DumpReader(output) as sharded, DumpReader(single_output) as single:
+        assert len(sharded) == len(single)
+        assert [(rec.written, rec.read) for rec in sharded] == [(rec.written, rec.read) for rec in single]
+
+def test_failed_board_keeps_shards(tmp_path, monkeypatch, ic_definition_PAL16L8):
+    pins: list[int] = TruthTableSweep.sweep_pins(ic_definition_PAL16L8, ic_definition_PAL16L8.io_pins)
+    output: str = str(tmp_path / 'sharded.dpp')
+    sessions = [_session(ic_definition_PAL16L8) for _ in range(2)]
+
+    def _failing_write_vals(vals: list[int]) -> list[int]:
+        raise SystemError('Read from the dupico failed')
+    write_vals = sessions[1].write_vals
+    monkeypatch.setattr(sessions[1], 'write_vals', _failing_write_vals)
+
+    with pytest.raises(SystemError):
+        ShardedSweep(sessions, pins).run(output)
+    assert not os.path.exists(output)
+
+    # The shard completed by the first board is not read again
+    monkeypatch.setattr(sessions[1], 'write_vals', write_vals)
+    throughputs = ShardedSweep(sessions, pins).run(output, resume=True)
+    assert [throughput.steps for throughput in throughputs] == [0, 512]
+    with DumpReader(output) as reader:
+        assert len(reader) == 1024
+
+def test_pool_runs_concurrently():
+    import time
+
+    def job() -> int:
+        time.sleep(0.2)
+        return 1
+
+    start: float = time.perf_counter()
+    outcomes = BoardPool.run([(f'port{idx}', job) for idx in range(4)])
+    assert time.perf_counter() - start < 0.6
+    assert [outcome.result for outcome in outcomes] == [1, 1, 1, 1]
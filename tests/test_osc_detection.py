@@ -0,0 +1,68 @@
+"""Tests for the oscillation detection policies"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import pytest
+
+from dppeeper.board.osc_detection import OscDetector, OscPolicy, OscStrategy
+
+class _Scanner:
+    def __init__(self, osc: int) -> None:
+        self.osc: int = osc
+        self.scans: list[int] = []
+
+    def __call__(self, reads: int) -> int:
+        self.scans.append(reads)
+        return self.osc
+
+def test_fixed_strategy():
+    scanner = _Scanner(0x04)
+    detector = OscDetector(OscPolicy(samples=100))
+
+    assert detector.detect(scanner) == 0x04
+    assert scanner.scans == [100]
+
+def test_adaptive_strategy_escalates():
+    scanner = _Scanner(0)
+    detector = OscDetector(OscPolicy(OscStrategy.ADAPTIVE, samples=255, probe_samples=8))
+
+    assert detector.detect(scanner) == 0
+    assert scanner.scans == [8]
+
+    scanner.osc = 0x10
+    assert detector.detect(scanner) == 0x10
+    assert scanner.scans == [8, 8, 255]
+
+def test_skip_unchanged():
+    scanner = _Scanner(0)
+    detector = OscDetector(OscPolicy(skip_unchanged=True))
+
+    assert detector.detect(scanner, 0x01, 0x80) == 0
+    assert detector.detect(scanner, 0x01, 0x80) == 0
+    assert detector.detect(scanner, 0x01, 0x00) == 0 # Different reading
+    assert len(scanner.scans) == 2
+
+    detector.invalidate()
+    assert detector.detect(scanner, 0x01, 0x00) == 0
+    assert len(scanner.scans) == 3
+
+    # Oscillating states are always scanned again
+    scanner.osc = 0x02
+    assert detector.detect(scanner, 0x02, 0x00) == 0x02
+    assert detector.detect(scanner, 0x02, 0x00) == 0x02
+    assert len(scanner.scans) == 5
+
+    # Without a reading there is nothing to compare the next state with
+    scanner.osc = 0
+    assert detector.detect(scanner, 0x03) == 0
+    assert detector.detect(scanner, 0x03) == 0
+    assert len(scanner.scans) == 7
+
+def test_invalid_samples():
+    with pytest.raises(ValueError):
+        OscDetector(OscPolicy(samples=1))
+    with pytest.raises(ValueError):
+        OscDetector(OscPolicy(probe_samples=256))
@@ -0,0 +1,43 @@
+"""Tests for the precompiled pin mapping"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import glob
+import random
+
+import pytest
+
+pytest.importorskip('dupicolib')
+
+from dupicolib.board_command_class_factory import BoardCommandClassFactory
+from dupicolib.board_fw_version import FwVersionTools
+
+from dppeeper.board.virtual_board_commands import VirtualBoardCommands
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.ic_loader import ICLoader
+
+def _load_definition(path: str) -> ICDefinition:
+    with open(path, 'rb') as def_file:
+        return ICLoader.extract_definition_from_buffered_reader(def_file)
+
+@pytest.mark.parametrize('def_path', sorted(glob.glob('examples/*.toml')))
+@pytest.mark.parametrize('board_commands', [BoardCommandClassFactory.get_command_class(3, FwVersionTools.parse('0.1.0')), VirtualBoardCommands])
+def test_mapper_matches_board_mapping(def_path, board_commands):
+    ic_definition: ICDefinition = _load_definition(def_path)
+    mapper = ic_definition.compile_pin_mapper(board_commands)
+    zif_map: list[int] = ic_definition.zif_map
+
+    rnd = random.Random(len(zif_map))
+    ic_values: list[int] = [0, (1 << len(zif_map)) - 1] + [1 << i for i in range(len(zif_map))] + [rnd.getrandbits(len(zif_map)) for _ in range(200)]
+    for val in ic_values:
+        assert mapper.to_zif(val) == board_commands.map_value_to_pins(zif_map, val)
+
+    zif_values: list[int] = [0, (1 << 40) - 1] + [1 << i for i in range(40)] + [rnd.getrandbits(40) for _ in range(200)]
+    for val in zif_values:
+        assert mapper.to_ic(val) == board_commands.map_pins_to_value(zif_map, val)
+
+def test_mapper_is_cached(ic_definition_PAL16L8):
+    assert ic_definition_PAL16L8.compile_pin_mapper(VirtualBoardCommands) is ic_definition_PAL16L8.compile_pin_mapper(VirtualBoardCommands)
@@ -0,0 +1,130 @@
+"""Tests for the pipelined pin writes"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import inspect
+
+import pytest
+
+serial = pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dupicolib.board_commands_interface import BoardCommandsInterface
+from dupicolib.hardware_board_commands import HardwareBoardCommands
+
+from dppeeper.board.pin_pipeline import PinWritePipeline
+from dppeeper.board.command_stats import CommandStats, InstrumentedCommands
+
+class _EchoSerial(serial.Serial):
+    """Answers every command line with the inverted value it carries, keeps track of the commands in flight"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.responses: list[bytes] = []
+        self.write_calls: int = 0
+        self.max_in_flight: int = 0
+
+    def write(self, data: bytes) -> int:
+        self.write_calls += 1
+        for line in data.splitlines():
+            self.responses.append(b'[W ' + f'{~int(line[2:], 16) & 0xFF:02X}'.encode('ASCII') + b']\n')
+        self.max_in_flight = max(self.max_in_flight, len(self.responses))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        self.responses.clear()
+
+    def readline(self) -> bytes:
+        return self.responses.pop(0) if self.responses else b''
+
+class _LineBoardCommands(BoardCommandsInterface):
+    @staticmethod
+    def write_pins(pins: int, ser=None) -> int | None:
+        ser.reset_input_buffer()
+        ser.write(f'W {pins:02X}\n'.encode('ASCII'))
+        ser.flush()
+        line: bytes = ser.readline()
+        return int(line[3:-2], 16) if line else None
+
+def test_pipelined_writes_keep_order():
+    ser = _EchoSerial()
+    pipeline = PinWritePipeline(_LineBoardCommands, ser, max_in_flight=4)
+
+    values: list[int] = list(range(20))
+    assert pipeline.write_batch(values) == [~val & 0xFF for val in values]
+
+    # The first window goes out in a single write, then one command for every response
+    assert ser.write_calls == 1 + (len(values) - 4)
+    assert ser.max_in_flight == 4
+
+def test_sequential_writes_without_serial():
+    class _DirectBoardCommands(BoardCommandsInterface):
+        @staticmethod
+        def write_pins(pins: int, ser=None) -> int | None:
+            return pins + 1
+
+    assert PinWritePipeline(_DirectBoardCommands).write_batch([1, 2, 3]) == [2, 3, 4]
+
+def test_instrumented_pipeline_records_batches():
+    stats = CommandStats()
+    command_class = InstrumentedCommands.wrap(_LineBoardCommands, stats)
+    ser = _EchoSerial()
+
+    assert PinWritePipeline(command_class, ser, max_in_flight=4).write_batch(list(range(10))) == [~val & 0xFF for val in range(10)]
+
+    # Capture and replay of the commands are not round trips: only the batch as a whole is timed
+    assert 'write_pins' not in stats.commands
+    assert stats.commands['write_pins_pipelined'].count == 1
+    assert stats.commands['write_pins_pipelined'].items == 10
+
+    command_class.write_pins(0x01, ser)
+    assert stats.commands['write_pins'].count == 1
+
+def test_capture_check():
+    class _ReadFirstBoardCommands(BoardCommandsInterface):
+        @staticmethod
+        def write_pins(pins: int, ser=None) -> int | None:
+            ser.readline() # Drains the port before sending: the command cannot be captured
+            return _LineBoardCommands.write_pins(pins, ser)
+
+    class _FixedBoardCommands(BoardCommandsInterface):
+        @staticmethod
+        def write_pins(pins: int, ser=None) -> int | None:
+            return _LineBoardCommands.write_pins(0, ser) # The command does not carry the value
+
+    assert PinWritePipeline.supports_capture(_LineBoardCommands)
+    assert not PinWritePipeline.supports_capture(_ReadFirstBoardCommands)
+    assert not PinWritePipeline.supports_capture(_FixedBoardCommands)
+
+    # Unsupported classes still work, one write at a time
+    ser = _EchoSerial()
+    assert PinWritePipeline(_ReadFirstBoardCommands, ser).write_batch([1, 2, 3]) == [0xFE, 0xFD, 0xFC]
+    assert ser.write_calls == 3
+
+def _hardware_command_classes() -> list[type]:
+    import dupicolib.board_command_class_factory # pylint: disable=unused-import # Loads the command classes of every board
+
+    classes: list[type] = []
+    pending: list[type] = [HardwareBoardCommands]
+    while pending:
+        command_class: type = pending.pop()
+        pending.extend(command_class.__subclasses__())
+        if not inspect.isabstract(command_class):
+            classes.append(command_class)
+
+    return classes
+
+def test_dupicolib_capture():
+    # Pipelining relies on how dupicolib drives the port: this fails if a version of dupicolib breaks it
+    classes: list[type] = _hardware_command_classes()
+    assert classes
+
+    for command_class in classes:
+        assert PinWritePipeline.supports_capture(command_class), command_class.__name__
+
@@ -0,0 +1,30 @@
+"""Tests for the session recorder"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import os
+
+from dppeeper.board.dump_file import DumpReader, DumpRecordKind
+from dppeeper.board.session_recorder import SessionRecorder
+
+def test_recorder_produces_dump(tmp_path):
+    rec_path: str = os.path.join(tmp_path, 'session.dpr')
+
+    with SessionRecorder(rec_path, 'GAL22V10', 24) as recorder:
+        for val in range(500):
+            recorder.record(DumpRecordKind.WRITE, val, val << 1)
+        recorder.record(DumpRecordKind.RESULT, 3, 6, hiz=0x100, osc=0x200)
+
+    # Closed recorders ignore further records
+    recorder.record(DumpRecordKind.WRITE, 1, 1)
+
+    with DumpReader(rec_path) as reader:
+        assert reader.ic_name == 'GAL22V10'
+        assert len(reader) == 501
+        assert reader.record(499).read == 499 << 1
+        assert reader.lookup(3).hiz == 0x100
+        assert reader.lookup(42).read == 84
+        assert all(reader.record(i).timestamp <= reader.record(i + 1).timestamp for i in range(500))
@@ -0,0 +1,114 @@
+"""Tests for the replay of recorded sessions"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import os
+
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dppeeper.batch.session_replay import ReplayReport, SessionReplay
+from dppeeper.board.dump_file import DumpReader, DumpRecordKind
+from dppeeper.board.fake_board_commands import FakeBoardCommands
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.board.session_recorder import SessionRecorder
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.peeper_session import PeeperSession
+
+def _board(ic_definition, o12_and: bool = True) -> type[FakeBoardCommands]:
+    # O12 = I1 & I2 (or I1 | I2 for a faulty chip), IO13 = I1 enabled when I3 is low, IO14 toggles when I9 is clocked
+    model = PLDModel(outputs={12: (lambda view: PLDModel.pin(view, 1) and PLDModel.pin(view, 2)) if o12_and else
+                                  (lambda view: PLDModel.pin(view, 1) or PLDModel.pin(view, 2)),
+                              13: lambda view: PLDModel.pin(view, 1)},
+                     registered={14: lambda view: not PLDModel.pin(view, 14)},
+                     enables={13: lambda view: not PLDModel.pin(view, 3)},
+                     clk_pins=[9])
+    board = FakeBoardCommands.bind(model, ic_definition)
+    board.set_power(True)
+    return board
+
+def _record(path: str, ic_definition, check_hiz: bool) -> None:
+    with SessionRecorder(path, ic_definition.name, len(ic_definition.zif_map)) as recorder:
+        session = PeeperSession(ic_definition, _board(ic_definition), check_hiz=check_hiz, recorder=recorder, power_delay=0)
+        session.set_pins(ICDefinition.pins_to_mask([1, 2]))
+        session.clock(ICDefinition.pins_to_mask([1, 2]), 9)
+        session.set_pins(ICDefinition.pins_to_mask([1]))
+        session.set_pins(ICDefinition.pins_to_mask([2, 3]))
+        session.power_cycle(ICDefinition.pins_to_mask([1, 2]))
+        if not check_hiz: # Results without the checks, as written by the batched sweeps
+            for val, read in zip([ICDefinition.pins_to_mask([1]), ICDefinition.pins_to_mask([2])], session.write_vals([ICDefinition.pins_to_mask([1]), ICDefinition.pins_to_mask([2])])):
+                recorder.record(DumpRecordKind.RESULT, val, read)
+
+def test_steps(tmp_path, ic_definition_PAL16L8):
+    rec_path: str = os.path.join(tmp_path, 'session.dpr')
+    _record(rec_path, ic_definition_PAL16L8, check_hiz=False)
+
+    with DumpReader(rec_path) as dump:
+        steps = list(SessionReplay.steps(dump))
+
+    assert [(step.written, step.clock_pin, step.power_cycle, step.check_osc) for step in steps] == [
+        (ICDefinition.pins_to_mask([1, 2]), 0, False, True),
+        (ICDefinition.pins_to_mask([1, 2]), 9, False, True),
+        (ICDefinition.pins_to_mask([1]), 0, False, True),
+        (ICDefinition.pins_to_mask([2, 3]), 0, False, True),
+        (ICDefinition.pins_to_mask([1, 2]), 0, False, True),
+        (ICDefinition.pins_to_mask([1, 2]), 0, True, True),
+        (ICDefinition.pins_to_mask([1]), 0, False, False),
+        (ICDefinition.pins_to_mask([2]), 0, False, False)
+    ]
+
+@pytest.mark.parametrize('check_hiz', [False, True])
+def test_replay_same_chip(tmp_path, ic_definition_PAL16L8, check_hiz: bool):
+    rec_path: str = os.path.join(tmp_path, 'session.dpr')
+    _record(rec_path, ic_definition_PAL16L8, check_hiz)
+
+    board = _board(ic_definition_PAL16L8)
+    board.reset_stats()
+    report = ReplayReport()
+    with DumpReader(rec_path) as dump:
+        for diff in SessionReplay(PeeperSession(ic_definition_PAL16L8, board, check_hiz=check_hiz, power_delay=0)).run(SessionReplay.steps(dump)):
+            report.add(diff)
+
+    assert (report.diverged, report.first) == (0, None)
+    if not check_hiz: # The last two steps have no oscillation check and share a batch: no Hi-Z probes, no repeated writes
+        assert report.steps == 8
+        assert board.stats['write_pins'] == 10
+
+def test_replay_different_chip(tmp_path, ic_definition_PAL16L8):
+    rec_path: str = os.path.join(tmp_path, 'session.dpr')
+    _record(rec_path, ic_definition_PAL16L8, check_hiz=True)
+
+    report = ReplayReport()
+    with DumpReader(rec_path) as dump:
+        session = PeeperSession(ic_definition_PAL16L8, _board(ic_definition_PAL16L8, o12_and=False), check_hiz=True, power_delay=0)
+        for diff in SessionReplay(session).run(SessionReplay.steps(dump)):
+            report.add(diff)
+
+    # O12 differs when only one of I1 and I2 is high
+    assert (report.steps, report.diverged) == (6, 2)
+    assert report.first is not None and report.first.step.written == ICDefinition.pins_to_mask([1]) and report.first.level == ICDefinition.pins_to_mask([12])
+    assert report.pin_counts() == {12: (2, 0, 0)}
+    assert 'First divergence' in report.format_report(ic_definition_PAL16L8)
+
+def test_replay_burst(tmp_path, ic_definition_PAL16L8):
+    rec_path: str = os.path.join(tmp_path, 'session.dpr')
+    with SessionRecorder(rec_path, ic_definition_PAL16L8.name, len(ic_definition_PAL16L8.zif_map)) as recorder:
+        session = PeeperSession(ic_definition_PAL16L8, _board(ic_definition_PAL16L8), recorder=recorder)
+        assert session.clock_burst(0, 9, 5, capture=True).reads is not None
+        session.clock_burst(0, 9, 2)
+
+    with DumpReader(rec_path) as dump:
+        steps = list(SessionReplay.steps(dump))
+    assert [(step.clock_pin, step.pulses) for step in steps] == [(9, 5), (9, 2)]
+
+    # IO14 is high after both bursts, a single pulse per step would leave it low after the second one
+    report = ReplayReport()
+    for diff in SessionReplay(PeeperSession(ic_definition_PAL16L8, _board(ic_definition_PAL16L8))).run(steps):
+        report.add(diff)
+    assert (report.steps, report.diverged) == (2, 0)
+
@@ -0,0 +1,69 @@
+"""Startup time regression tests: the CLI must only load what each subcommand needs"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Generous budgets for the imports done by the CLI, in milliseconds, to catch heavy modules creeping in
+_FRONTEND_BUDGET_MS: float = 200.0
+_SUBCOMMAND_BUDGET_MS: float = 500.0
+
+_GUI_MODULES: tuple[str, ...] = ('tkinter', 'dppeeper.ui')
+_BOARD_MODULES: tuple[str, ...] = ('serial', 'dupicolib')
+
+def _run_with_importtime(code: str) -> tuple[dict[str, float], float]:
+    """Run code in a fresh interpreter, returns the cumulative import time of every module and the total, in ms"""
+    env: dict[str, str] = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(['./src'] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, capture_output=True, text=True, timeout=60)
+
+    imports: dict[str, float] = {}
+    total: float = 0.0
+    for line in proc.stderr.splitlines():
+        if line.startswith('import time:') and not line.startswith('import time: self'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            imports[name.strip()] = int(cumulative) / 1000
+            if not name.startswith('  '): # Nested imports are already part of the cumulative time of the parent
+                total = total + int(cumulative) / 1000
+    return (imports, total)
+
+def _loaded(imports: dict[str, float], prefixes: tuple[str, ...]) -> list[str]:
+    return [name for name in imports if name.split('.')[0] in prefixes or name.startswith(prefixes)]
+
+def test_frontend_import():
+    imports, _ = _run_with_importtime('import dppeeper.frontend')
+
+    assert 'dppeeper.frontend' in imports
+    assert not _loaded(imports, _GUI_MODULES + _BOARD_MODULES + ('importlib.metadata',))
+    assert imports['dppeeper.frontend'] < _FRONTEND_BUDGET_MS
+
+@pytest.mark.parametrize('args, allowed', [
+    (['--version'], ()),
+    (['-d', 'examples/PAL16L8.toml', 'dupico', '-p'], ('serial',)), # Lists the serial ports
+    (['-d', 'examples/PAL16L8.toml', 'dupico', '-p', '/nonexistent'], _BOARD_MODULES),
+    (['-d', 'examples/PAL16L8.toml', 'sim', '-s', '/nonexistent.dpp'], _BOARD_MODULES),
+    (['-d', 'examples/PAL16L8.toml', 'sweep', '-p', '/nonexistent', '-o', '/nonexistent.dpp'], _BOARD_MODULES),
+    (['-d', 'examples/PAL16R4.toml', 'explore', '-p', '/nonexistent', '-o', '/nonexistent/graph.dpg'], _BOARD_MODULES),
+    (['-d', 'examples/PAL16L8.toml', 'run', '-p', '/nonexistent', '-f', '/nonexistent.txt'], _BOARD_MODULES),
+    (['-d', 'examples/PAL16L8.toml', 'analyze', '-i', '/nonexistent.dpp'], ()),
+    (['-d', 'examples/PAL16L8.toml', '--daemon', '/nonexistent.sock', 'daemon', '--stop'], _BOARD_MODULES),
+])
+def test_subcommand_imports(args: list[str], allowed: tuple[str, ...]):
+    # Every subcommand fails early here (no board, no files), after importing what it needs
+    code: str = (f'import sys, logging; sys.argv = ["dppeeper"] + {args!r}; logging.disable(logging.CRITICAL)\n'
+                 'import dppeeper.frontend\n'
+                 'try:\n'
+                 '    dppeeper.frontend.cli()\n'
+                 'except SystemExit:\n'
+                 '    pass\n')
+    imports, total = _run_with_importtime(code)
+
+    assert 'dppeeper.frontend' in imports
+    assert not _loaded(imports, _GUI_MODULES)
+    assert not [name for name in _loaded(imports, _BOARD_MODULES) if not name.startswith(allowed)]
+    assert total < _SUBCOMMAND_BUDGET_MS
@@ -0,0 +1,108 @@
+"""Tests for the registered-state explorer"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dppeeper.batch.state_explorer import ExplorationStats, RegisteredStateExplorer, StateGraph
+from dppeeper.board.fake_board_commands import FakeBoardCommands
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.peeper_session import PeeperSession
+
+def _shift_register_model(ic_definition) -> PLDModel:
+    # Q14..Q17 shift in pin 2, pin 3 clears the register: 16 states, each reachable in at most 4 clocks
+    registered = {14: lambda view: PLDModel.pin(view, 2) and not PLDModel.pin(view, 3)}
+    for pin in (15, 16, 17):
+        registered[pin] = (lambda prev: lambda view: PLDModel.pin(view, prev) and not PLDModel.pin(view, 3))(pin - 1)
+
+    oe: int = ic_definition.oe_l_pins[0]
+    return PLDModel(registered=registered,
+                    enables={pin: (lambda view: not PLDModel.pin(view, oe)) for pin in registered},
+                    clk_pins=ic_definition.clk_pins)
+
+def _explorer(ic_definition, model: PLDModel, graph_path: str, resume: bool = False) -> tuple[RegisteredStateExplorer, StateGraph]:
+    board = FakeBoardCommands.bind(model, ic_definition)
+    session = PeeperSession(ic_definition, board, power_delay=0)
+    state_pins, input_pins = RegisteredStateExplorer.explore_pins(ic_definition, 1, [4, 5, 6, 7, 8, 9])
+    graph = StateGraph(graph_path, ic_definition.name, state_pins, input_pins, resume)
+    return (RegisteredStateExplorer(session, graph, 1), graph)
+
+def test_explore_shift_register(tmp_path, ic_definition_PAL16R4):
+    graph_path: str = str(tmp_path / 'PAL16R4.dpg')
+    explorer, graph = _explorer(ic_definition_PAL16R4, _shift_register_model(ic_definition_PAL16R4), graph_path)
+
+    with graph:
+        assert graph.state_pins == [14, 15, 16, 17] and graph.input_pins == [2, 3]
+        stats: ExplorationStats = explorer.run()
+
+        assert stats.states == 16
+        assert stats.transitions == 16 * 4
+        for state in range(16):
+            assert graph.get(state, 0b00) == (state << 1) & 0xF
+            assert graph.get(state, 0b01) == ((state << 1) | 1) & 0xF
+            assert graph.get(state, 0b10) == graph.get(state, 0b11) == 0
+
+    # The graph on disk is complete
+    with StateGraph.open(graph_path) as graph:
+        assert graph.ic_name == ic_definition_PAL16R4.name
+        assert graph.root == 0
+        assert graph.get(0b0101, 0b01) == 0b1011
+
+def test_breadth_first(tmp_path, monkeypatch, ic_definition_PAL16R4):
+    explorer, graph = _explorer(ic_definition_PAL16R4, _shift_register_model(ic_definition_PAL16R4), str(tmp_path / 'PAL16R4.dpg'))
+
+    expanded: list[int] = []
+    graph_set = graph.set
+    def _tracking_set(state: int, inputs: int, next_state: int) -> None:
+        if not expanded or expanded[-1] != state:
+            expanded.append(state)
+        graph_set(state, inputs, next_state)
+    monkeypatch.setattr(graph, 'set', _tracking_set)
+
+    with graph:
+        explorer.run()
+
+    # Every state is expanded at once, in order of distance from power-up: the number of bits shifted in
+    assert sorted(expanded) == list(range(16))
+    assert [state.bit_length() for state in expanded] == sorted(state.bit_length() for state in expanded)
+
+def test_graph_name(tmp_path):
+    graph_path: str = str(tmp_path / 'graph.dpg')
+    name: str = 'Zähler PAL16R4 ' + 'é' * 20 # Longer than the header field once encoded
+
+    with StateGraph(graph_path, name, [14], [2]):
+        pass
+    with StateGraph(graph_path, name, [14], [2], resume=True), StateGraph.open(graph_path) as graph:
+        assert name.startswith(graph.ic_name) and len(graph.ic_name.encode('utf-8')) <= 32
+
+def test_resume(tmp_path, monkeypatch, ic_definition_PAL16R4):
+    graph_path: str = str(tmp_path / 'PAL16R4.dpg')
+    model: PLDModel = _shift_register_model(ic_definition_PAL16R4)
+
+    explorer, graph = _explorer(ic_definition_PAL16R4, model, graph_path)
+    clock_path = explorer._clock_path
+    def _interrupted_clock_path(path: list[int]) -> int:
+        if explorer._transitions >= 20:
+            raise KeyboardInterrupt()
+        return clock_path(path)
+    monkeypatch.setattr(explorer, '_clock_path', _interrupted_clock_path)
+
+    with graph, pytest.raises(KeyboardInterrupt):
+        explorer.run()
+
+    explorer, graph = _explorer(ic_definition_PAL16R4, model, graph_path, resume=True)
+    with graph:
+        assert explorer.states_count() > 1
+        stats: ExplorationStats = explorer.run()
+        assert stats.states == 16 and stats.transitions == 64
+        assert all(graph.get(state, 0b01) == ((state << 1) | 1) & 0xF for state in range(16))
+
+    # A different set of inputs is a different exploration
+    with pytest.raises(ValueError):
+        StateGraph(graph_path, ic_definition_PAL16R4.name, [14, 15, 16, 17], [2, 3, 4], resume=True)
@@ -0,0 +1,113 @@
+"""Tests for the dependency analysis of truth tables"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import os
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from dppeeper.analysis.truth_table_analysis import OutputAnalysis, TableAnalysis, TruthTable, TruthTableAnalyzer
+from dppeeper.board.dump_file import DumpRecordKind, DumpWriter
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.ic_loader import ICLoader
+
+def _pin(val: int, pin: int) -> bool:
+    return bool((val >> (pin - 1)) & 0x01)
+
+def _model(written: int) -> tuple[int, int]:
+    # O12 = I1 & I2, O19 = !(I1 & I2), IO13 = I3 enabled when I4 is low, IO14 stuck high, IO15 always Hi-Z
+    read: int = written & ICDefinition.pins_to_mask([1, 2, 3, 4, 13])
+    hiz: int = ICDefinition.pins_to_mask([15])
+
+    if _pin(written, 1) and _pin(written, 2):
+        read |= ICDefinition.pins_to_mask([12])
+    else:
+        read |= ICDefinition.pins_to_mask([19])
+
+    if _pin(written, 4):
+        hiz |= ICDefinition.pins_to_mask([13])
+    else:
+        read = (read & ~ICDefinition.pins_to_mask([13])) | (ICDefinition.pins_to_mask([13]) if _pin(written, 3) else 0)
+
+    return (read | ICDefinition.pins_to_mask([14]), hiz)
+
+_INPUTS: list[int] = [1, 2, 3, 4, 13]
+
+def _vectors() -> list[int]:
+    vectors: list[int] = []
+    for step in range(1 << len(_INPUTS)):
+        vectors.append(sum(1 << (pin - 1) for idx, pin in enumerate(_INPUTS) if (step >> idx) & 0x01))
+    return vectors
+
+def test_analyze(tmp_path, ic_definition_PAL16L8):
+    dump_path: str = os.path.join(tmp_path, 'sweep.dpp')
+    with DumpWriter(dump_path, ic_definition_PAL16L8.name, 20) as writer:
+        writer.write(DumpRecordKind.POWER, 1)
+        for val in _vectors():
+            read, hiz = _model(val)
+            writer.write(DumpRecordKind.RESULT, val, read, hiz)
+
+    table: TruthTable = TruthTable.from_dump(dump_path)
+    assert table.input_pins == tuple(_INPUTS) and table.rows == 32
+
+    analyzer = TruthTableAnalyzer(ic_definition_PAL16L8)
+    analysis: TableAnalysis = analyzer.analyze(table)
+    assert analysis.complete
+    outputs: dict[int, OutputAnalysis] = {output.pin: output for output in analysis.outputs}
+
+    # IO16 to IO18 read back 0 and are reported as constant, IO13 is both an input and an output
+    assert sorted(outputs) == [12, 13, 14, 15, 16, 17, 18, 19]
+    assert outputs[12] == OutputAnalysis(12, (1, 2), (), None, False, True, None, False)
+    assert outputs[19] == OutputAnalysis(19, (1, 2), (), None, False, True, 12, True)
+    assert outputs[13].inputs == (3,) and outputs[13].hiz_inputs == (4,)
+    assert outputs[14].constant == 1 and outputs[16].constant == 0
+    assert outputs[15].always_hiz and outputs[15].constant is None
+
+    report: str = analyzer.format_report(analysis)
+    assert 'O19      depends on I1 I2, inverse of O12' in report
+    assert 'IO13     depends on I3, Hi-Z controlled by I4' in report
+
+def test_partial_and_unstable(ic_definition_PAL16L8):
+    vectors: list[int] = _vectors()
+    reads: list[tuple[int, int]] = [_model(val) for val in vectors]
+
+    # The last combinations are missing, and the first is read again with O12 flipped
+    written = np.array(vectors[:24] + [vectors[0]], dtype=np.uint64)
+    read = np.array([read for read, _ in reads[:24]] + [reads[0][0] ^ ICDefinition.pins_to_mask([12])], dtype=np.uint64)
+    hiz = np.array([hiz for _, hiz in reads[:24]] + [reads[0][1]], dtype=np.uint64)
+    osc = np.zeros(len(written), dtype=np.uint64)
+    osc[3] = ICDefinition.pins_to_mask([19])
+
+    analysis: TableAnalysis = TruthTableAnalyzer(ic_definition_PAL16L8).analyze(TruthTable(written, read, hiz, osc))
+    outputs: dict[int, OutputAnalysis] = {output.pin: output for output in analysis.outputs}
+
+    assert analysis.rows == 24 and not analysis.complete
+    assert not outputs[12].pure and not outputs[19].pure and outputs[14].pure
+    assert outputs[19].inputs == (1, 2) and outputs[19].constant is None
+
+def test_large_table():
+    with open('examples/GAL22V10.toml', 'rb') as def_file:
+        gal_definition = ICLoader.extract_definition_from_buffered_reader(def_file)
+
+    # 2^20 combinations of I1-I11, I13 and IO14-IO21, IO22 is the parity of I1, I5 and IO14
+    input_pins: list[int] = list(range(1, 12)) + list(range(13, 22))
+    steps = np.arange(1 << len(input_pins), dtype=np.uint64)
+    written = np.zeros_like(steps)
+    for idx, pin in enumerate(input_pins):
+        written |= ((steps >> np.uint64(idx)) & np.uint64(1)) << np.uint64(pin - 1)
+    parity = ((written >> np.uint64(0)) ^ (written >> np.uint64(4)) ^ (written >> np.uint64(13))) & np.uint64(1)
+    read = written | (parity << np.uint64(21))
+
+    start: float = time.perf_counter()
+    analysis: TableAnalysis = TruthTableAnalyzer(gal_definition).analyze(TruthTable(written, read, np.zeros_like(written), np.zeros_like(written)))
+    assert time.perf_counter() - start < 10
+
+    assert analysis.complete and analysis.input_pins == tuple(input_pins)
+    output: OutputAnalysis = next(output for output in analysis.outputs if output.pin == 22)
+    assert output.inputs == (1, 5, 14) and output.pure and output.duplicate_of is None
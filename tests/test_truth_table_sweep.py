@@ -0,0 +1,83 @@
+"""Tests for the headless truth-table sweep"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dppeeper.batch.truth_table_sweep import TruthTableSweep
+from dppeeper.board.dump_file import DumpReader, DumpRecordKind
+from dppeeper.board.fake_board_commands import FakeBoardCommands
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.peeper_session import PeeperSession
+
+def _session(ic_definition, check_hiz: bool = False) -> PeeperSession:
+    board = FakeBoardCommands.bind(PLDModel.from_definition(ic_definition), ic_definition)
+    board.set_power(True)
+    return PeeperSession(ic_definition, board, check_hiz=check_hiz)
+
+def test_gray_code_order(ic_definition_PAL16L8):
+    pins: list[int] = [1, 2, 3, 11]
+    sweep = TruthTableSweep(_session(ic_definition_PAL16L8), pins)
+
+    vectors: list[int] = list(sweep.vectors())
+    assert len(vectors) == sweep.total_steps == 16
+    assert len(set(vectors)) == 16
+    assert all(bin(a ^ b).count('1') == 1 for a, b in zip(vectors, vectors[1:]))
+    assert all(val & ~sum(1 << (pin - 1) for pin in pins) == 0 for val in vectors)
+
+    # Starting midway gives the same sequence
+    assert list(sweep.vectors(5)) == vectors[5:]
+    assert [sweep.vector(step) for step in range(16)] == vectors
+
+@pytest.mark.parametrize('check_hiz', [False, True])
+def test_sweep_results(tmp_path, ic_definition_PAL16L8, check_hiz):
+    session = _session(ic_definition_PAL16L8, check_hiz)
+    sweep = TruthTableSweep(session, TruthTableSweep.sweep_pins(ic_definition_PAL16L8, ic_definition_PAL16L8.io_pins))
+    output: str = str(tmp_path / 'sweep.dpp')
+
+    assert sweep.run(output) == 1024
+
+    reference = _session(ic_definition_PAL16L8, check_hiz)
+    with DumpReader(output) as reader:
+        assert reader.ic_name == ic_definition_PAL16L8.name
+        assert len(reader) == 1024
+        for rec, val in zip(reader, sweep.vectors()):
+            assert rec.kind == DumpRecordKind.RESULT and rec.written == val
+            assert (rec.read, rec.hiz) == reference.set_and_check_pins(val)
+
+def test_resume(tmp_path, monkeypatch, ic_definition_PAL16L8):
+    pins: list[int] = TruthTableSweep.sweep_pins(ic_definition_PAL16L8, ic_definition_PAL16L8.io_pins)
+    output: str = str(tmp_path / 'sweep.dpp')
+    session = _session(ic_definition_PAL16L8)
+
+    monkeypatch.setattr(TruthTableSweep, '_CHECKPOINT_INTERVAL', 0.0)
+    write_vals = session.write_vals
+    calls: list[int] = []
+    def _failing_write_vals(vals: list[int]) -> list[int]:
+        calls.append(len(vals))
+        if len(calls) > 3:
+            raise SystemError('Read from the dupico failed')
+        return write_vals(vals)
+    monkeypatch.setattr(session, 'write_vals', _failing_write_vals)
+
+    with pytest.raises(SystemError):
+        TruthTableSweep(session, pins).run(output)
+
+    monkeypatch.setattr(session, 'write_vals', write_vals)
+    assert TruthTableSweep(session, pins).run(output, resume=True) == 1024 - sum(calls[:3])
+
+    full_output: str = str(tmp_path / 'full.dpp')
+    TruthTableSweep(_session(ic_definition_PAL16L8), pins).run(full_output)
+    with DumpReader(output) as resumed, DumpReader(full_output) as full:
+        assert len(resumed) == len(full)
+        assert [(rec.written, rec.read) for rec in resumed] == [(rec.written, rec.read) for rec in full]
+
+    # A checkpoint for different pins is refused
+    with pytest.raises(ValueError):
+        TruthTableSweep(session, pins[1:]).run(output, resume=True)
@@ -79,4 +79,13 @@ def test_grid_position_rotation_calculation():
     assert UIUtilities.calculatePinPosition(pin_no = 1, type = UIPinGridType.CHECKBOX, pins_per_side = [14, 10, 14, 10], rot_shift=-1) == (3, 1)
     assert UIUtilities.calculatePinPosition(pin_no = 14, type = UIPinGridType.CHECKBOX, pins_per_side = [14, 10, 14, 10], rot_shift=-1) == (1, 15)
     assert UIUtilities.calculatePinPosition(pin_no = 1, type = UIPinGridType.LABEL, pins_per_side = [14, 10, 14, 10], rot_shift=-1) == (3, 2)
-    assert UIUtilities.calculatePinPosition(pin_no = 14, type = UIPinGridType.LABEL, pins_per_side = [14, 10, 14, 10], rot_shift=-1) == (2, 15)
\ No newline at end of file
+    assert UIUtilities.calculatePinPosition(pin_no = 14, type = UIPinGridType.LABEL, pins_per_side = [14, 10, 14, 10], rot_shift=-1) == (2, 15)
+
+def test_changed_bits():
+    assert UIUtilities.changedBits((0b1010, 0, 0), (0b1010, 0, 0)) == []
+    assert UIUtilities.changedBits((0b1010, 0, 0), (0b0011, 0, 0)) == [0, 3]
+    # Changes in any of the masks count, once
+    assert UIUtilities.changedBits((0, 0b100, 0), (0, 0, 0b101)) == [0, 2]
+    # Bits outside the mask are ignored
+    assert UIUtilities.changedBits((0, 0, 0), (0xFFFF, 0, 0), 0b10010) == [1, 4]
+    assert UIUtilities.changedBits((1 << 40,), (0,)) == [40]
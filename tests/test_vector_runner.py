@@ -0,0 +1,118 @@
+"""Tests for the vector file parser and runner"""
+
+# pylint: disable=wrong-import-position,wrong-import-order
+
+import sys
+sys.path.insert(0, './src') # Make VSCode happy...
+
+import pytest
+
+pytest.importorskip('serial')
+pytest.importorskip('dupicolib')
+
+from dppeeper.batch.vector_runner import VectorAction, VectorFile, VectorRunner, VectorStep
+from dppeeper.board.fake_board_commands import FakeBoardCommands
+from dppeeper.board.pld_model import PLDModel
+from dppeeper.ic.ic_definition import ICDefinition
+from dppeeper.ic.ic_loader import ICLoader
+from dppeeper.peeper_session import PeeperSession
+
+def test_parse(ic_definition_PAL16L8):
+    vector_file = VectorFile(ic_definition_PAL16L8)
+
+    steps: list[VectorStep] = list(vector_file.parse([
+        '# Comment only',
+        'set I1=1 i2=0 3=1',
+        '',
+        'SET,I4=H,IO13=L # CSV with a comment',
+        'expect O12=1 IO13=Z',
+        'powercycle'
+    ]))
+
+    assert steps == [
+        VectorStep(2, VectorAction.SET, ICDefinition.pins_to_mask([1, 2, 3]), ICDefinition.pins_to_mask([1, 3])),
+        VectorStep(4, VectorAction.SET, ICDefinition.pins_to_mask([4, 13]), ICDefinition.pins_to_mask([4])),
+        VectorStep(5, VectorAction.EXPECT, ICDefinition.pins_to_mask([12]), ICDefinition.pins_to_mask([12]), ICDefinition.pins_to_mask([13])),
+        VectorStep(6, VectorAction.POWERCYCLE)
+    ]
+
+    for line in ['jump I1', 'set X1=1', 'set I1=Z', 'set 21=1', 'clock', 'powercycle now']:
+        with pytest.raises(ValueError):
+            vector_file.parse_line(1, line)
+
+def test_composite_names(ic_definition_PAL16R4):
+    with open('examples/GAL22V10.toml', 'rb') as def_file:
+        gal_definition = ICLoader.extract_definition_from_buffered_reader(def_file)
+
+    vector_file = VectorFile(gal_definition)
+    assert vector_file.resolve_pin('I1/CLK') == vector_file.resolve_pin('clk') == vector_file.resolve_pin('I1') == 1
+    assert vector_file.resolve_pin('io14') == 14
+    with pytest.raises(ValueError): # Shared by all the registered outputs
+        vector_file.resolve_pin('Q')
+
+    assert VectorFile(ic_definition_PAL16R4).parse_line(1, 'clock CLK1') == VectorStep(1, VectorAction.CLOCK, pin=1)
+
+def _session(ic_definition, check_hiz: bool = False) -> tuple[PeeperSession, type[FakeBoardCommands]]:
+    # O12 = I1 & I2, IO13 = I1 enabled when I3 is low, IO14 toggles when I9 is clocked
+    model = PLDModel(outputs={12: lambda view: PLDModel.pin(view, 1) and PLDModel.pin(view, 2),
+                              13: lambda view: PLDModel.pin(view, 1)},
+                     registered={14: lambda view: not PLDModel.pin(view, 14)},
+                     enables={13: lambda view: not PLDModel.pin(view, 3)},
+                     clk_pins=[9])
+    board = FakeBoardCommands.bind(model, ic_definition)
+    board.set_power(True)
+    board.reset_stats()
+    return (PeeperSession(ic_definition, board, check_hiz=check_hiz, power_delay=0), board)
+
+_VECTORS: list[str] = [
+    'set I1=1 I2=1',
+    'expect O12=1 IO13=1 IO14=0',
+    'clock 9',
+    'expect IO14=1',
+    'set I2=0',
+    'expect O12=0',
+    'set I3=1',
+    'expect IO13=Z',
+    'clock 9',
+    'expect IO14=0'
+]
+
+def test_run_batched(ic_definition_PAL16L8):
+    session, board = _session(ic_definition_PAL16L8)
+    results = list(VectorRunner(session).run(VectorFile(ic_definition_PAL16L8).parse(_VECTORS)))
+
+    # Without the Hi-Z check, IO13 reads back the level written on it, and execution stops there
+    assert [result.step.line_no for result in results] == list(range(1, 9))
+    assert [result.mismatch for result in results if result.step.action == VectorAction.EXPECT] == [0, 0, 0, ICDefinition.pins_to_mask([13])]
+    assert results[2].written == ICDefinition.pins_to_mask([1, 2])
+
+    # Everything up to the failure went out as a single batch
+    assert board.stats[board.STAT_ROUND_TRIPS] == 1
+
+    line: str = VectorRunner.format_result(results[-1], ic_definition_PAL16L8)
+    assert line.split()[:2] == ['8', 'expect'] and line.endswith('FAIL IO13')
+
+def test_run_checked(ic_definition_PAL16L8):
+    session, _ = _session(ic_definition_PAL16L8, check_hiz=True)
+    results = list(VectorRunner(session).run(VectorFile(ic_definition_PAL16L8).parse(_VECTORS + ['powercycle', 'expect IO14=1'])))
+
+    assert [result.step.line_no for result in results] == list(range(1, 13))
+    assert [result.mismatch for result in results if result.step.action == VectorAction.EXPECT] == [0, 0, 0, 0, 0, ICDefinition.pins_to_mask([14])]
+    assert results[7].state.hiz & ICDefinition.pins_to_mask([13])
+
+@pytest.mark.parametrize('check_hiz', [False, True])
+def test_clock_burst(ic_definition_PAL16L8, check_hiz: bool):
+    vector_file = VectorFile(ic_definition_PAL16L8)
+    assert vector_file.parse_line(1, 'clock 9 3') == VectorStep(1, VectorAction.CLOCK, pin=9, pulses=3)
+    for line in ['clock 9 0', 'clock 9 x', 'clock 9 2 1']:
+        with pytest.raises(ValueError):
+            vector_file.parse_line(1, line)
+
+    session, board = _session(ic_definition_PAL16L8, check_hiz=check_hiz)
+    results = list(VectorRunner(session, capture=True).run(vector_file.parse(['clock 9 5', 'expect IO14=1'])))
+
+    # IO14 toggles at every pulse, only the last state is checked
+    assert [(read >> 13) & 1 for read in results[0].pulses] == [1, 0, 1, 0, 1]
+    assert results[1].mismatch == 0
+    assert len(VectorRunner.format_pulses(results[0], ic_definition_PAL16L8)) == 5
+    assert board.stats[board.STAT_ROUND_TRIPS] <= (2 if check_hiz else 1)